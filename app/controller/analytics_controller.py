@@ -1,9 +1,13 @@
-from typing import Dict, List
+from datetime import datetime
+from typing import Dict, List, Literal, Optional
 
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, Header, Request
+from fastapi.responses import ORJSONResponse
 
+from app.models.click_event import ClickCounts, ClickTimeseries
 from app.models.url import URLResponse
 from app.services.analytics_service import AnalyticsService
+from app.services.redirect_snapshot import CLICKS_TOKEN_HEADER
 
 router = APIRouter()
 
@@ -12,22 +16,69 @@ router = APIRouter()
 async def get_most_clicked_urls(
     request: Request,
     limit: int = 10,
+    include_pending: bool = False,
     analytics_service: AnalyticsService = Depends(),
-) -> List[URLResponse]:
+) -> ORJSONResponse:
     """
-    Get the most clicked URLs, ordered by number of clicks (descending)
+    Get the most clicked URLs, ordered by number of clicks (descending).
+    Set include_pending to add clicks that have not been flushed yet.
     """
-    return await analytics_service.get_most_clicked_urls(request, limit)
+    return ORJSONResponse(
+        await analytics_service.get_most_clicked_urls(request, limit, include_pending)
+    )
 
 
 @router.get("/summary", response_model=Dict[str, int])
 async def get_analytics_summary(
+    include_pending: bool = False,
     analytics_service: AnalyticsService = Depends(),
 ) -> Dict[str, int]:
     """
     Get a summary of analytics data:
     - Total URLs
-    - Total clicks
+    - Total clicks (optionally including clicks that have not been flushed)
     - Total custom URLs
     """
-    return await analytics_service.get_analytics_summary()
+    return await analytics_service.get_analytics_summary(include_pending)
+
+
+@router.post("/counters/recompute", response_model=Dict[str, int])
+async def recompute_analytics_counters(
+    analytics_service: AnalyticsService = Depends(),
+) -> Dict[str, int]:
+    """
+    Admin operation: recompute the maintained summary counters from the urls
+    table to repair any drift
+    """
+    return await analytics_service.recompute_counters()
+
+
+@router.post("/clicks", response_model=Dict[str, int])
+async def record_forwarded_clicks(
+    counts: ClickCounts,
+    clicks_token: Optional[str] = Header(None, alias=CLICKS_TOKEN_HEADER),
+    analytics_service: AnalyticsService = Depends(),
+) -> Dict[str, int]:
+    """
+    Record clicks served by redirect-only nodes from a redirect snapshot.
+    Requires the shared REDIRECT_SNAPSHOT_CLICKS_TOKEN in the X-Clicks-Token
+    header; clicks on unknown short codes are not recorded.
+    """
+    return {"recorded": await analytics_service.record_clicks(counts, clicks_token)}
+
+
+@router.get("/{short_code}/timeseries", response_model=ClickTimeseries)
+async def get_click_timeseries(
+    short_code: str,
+    granularity: Literal["hour", "day"] = "hour",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    analytics_service: AnalyticsService = Depends(),
+) -> ClickTimeseries:
+    """
+    Get clicks per hour or day for a short URL between start and end
+    (defaults: the last 7 days by hour, the last 30 days by day)
+    """
+    return await analytics_service.get_click_timeseries(
+        short_code, granularity, start, end
+    )
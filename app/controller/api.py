@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.controller import analytics_controller, url_controller
+from app.controller import analytics_controller, metrics_controller, url_controller
 
 api_router = APIRouter()
 
@@ -9,3 +9,6 @@ api_router.include_router(url_controller.router, prefix="/urls", tags=["urls"])
 api_router.include_router(
     analytics_controller.router, prefix="/analytics", tags=["analytics"]
 )
+api_router.include_router(
+    metrics_controller.router, prefix="/metrics", tags=["metrics"]
+)
@@ -0,0 +1,117 @@
+from typing import Any, Dict
+
+from fastapi import APIRouter
+
+from app.database.read_routing import recent_writes
+from app.services.admission_control import admission_controller, shorten_rate_limiter
+from app.services.click_buffer import click_buffer
+from app.services.click_events import click_events
+from app.services.leaderboard import leaderboard
+from app.services.redirect_cache import redirect_cache
+from app.services.redirect_snapshot import click_forwarder, redirect_snapshot
+from app.services.short_code_filter import short_code_filter
+from app.services.sql_profiler import sql_profiler
+from app.services.url_compaction import url_compactor
+from app.services.url_expiry import url_reaper
+
+router = APIRouter()
+
+
+@router.get("/cache", response_model=Dict[str, int])
+async def get_redirect_cache_stats() -> Dict[str, int]:
+    """
+    Get redirect cache statistics (size, hits, misses, evictions)
+    """
+    return redirect_cache.stats()
+
+
+@router.get("/clicks", response_model=Dict[str, int])
+async def get_click_buffer_stats() -> Dict[str, int]:
+    """
+    Get write-behind click buffer statistics (pending and flushed clicks), or
+    those of the click forwarder on redirect-only nodes
+    """
+    if redirect_snapshot.enabled:
+        return click_forwarder.stats()
+    return click_buffer.stats()
+
+
+@router.get("/snapshot", response_model=Dict[str, float])
+async def get_redirect_snapshot_stats() -> Dict[str, float]:
+    """
+    Get redirect snapshot statistics (entries, age, hits, misses, reloads)
+    """
+    return redirect_snapshot.stats()
+
+
+@router.get("/click-events", response_model=Dict[str, int])
+async def get_click_event_stats() -> Dict[str, int]:
+    """
+    Get click event ingestion statistics (queued, ingested, dropped, pruned)
+    """
+    return click_events.stats()
+
+
+@router.get("/leaderboard", response_model=Dict[str, int])
+async def get_leaderboard_stats() -> Dict[str, int]:
+    """
+    Get most-clicked leaderboard statistics (size, reads, reloads)
+    """
+    return leaderboard.stats()
+
+
+@router.get("/compaction", response_model=Dict[str, int])
+async def get_compaction_stats() -> Dict[str, int]:
+    """
+    Get soft-delete compaction statistics (runs, batches, archived URLs)
+    """
+    return url_compactor.stats()
+
+
+@router.get("/expiry", response_model=Dict[str, int])
+async def get_expiry_stats() -> Dict[str, int]:
+    """
+    Get expired URL reaping statistics (runs, batches, deleted URLs)
+    """
+    return url_reaper.stats()
+
+
+@router.get("/short-code-filter", response_model=Dict[str, float])
+async def get_short_code_filter_stats() -> Dict[str, float]:
+    """
+    Get negative-lookup filter statistics (size, estimated and observed false
+    positive rates, short-circuited lookups)
+    """
+    return short_code_filter.stats()
+
+
+@router.get("/sql", response_model=Dict[str, Any])
+async def get_sql_profile() -> Dict[str, Any]:
+    """
+    Get SQL profiling results (per repository method totals and recent slow
+    queries, parameters redacted); empty unless SQL_PROFILING is enabled
+    """
+    return sql_profiler.stats()
+
+
+@router.get("/read-routing", response_model=Dict[str, int])
+async def get_read_routing_stats() -> Dict[str, int]:
+    """
+    Get read-your-writes statistics (keys pinned to the primary, pinned reads)
+    """
+    return recent_writes.stats()
+
+
+@router.get("/admission", response_model=Dict[str, int])
+async def get_admission_stats() -> Dict[str, int]:
+    """
+    Get admission control statistics (in-flight, queued, admitted and rejected
+    requests per route class, shorten rate limit buckets)
+    """
+    return {
+        **admission_controller.stats(),
+        **{
+            f"shorten_rate_{name}": value
+            for name, value in shorten_rate_limiter.stats().items()
+        },
+    }
@@ -1,8 +1,35 @@
-from fastapi import APIRouter, Depends, Request
+import os
+import re
+import time
+from typing import Optional, Tuple, Union
+from urllib.parse import quote
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.responses import RedirectResponse
+from sqlalchemy import bindparam, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
 
+from app.database import db
+from app.database.read_routing import recent_writes
+from app.database.sharding import shard_index
+from app.models.url import URL
+from app.services.click_buffer import click_buffer
+from app.services.click_events import click_events
+from app.services.http_caching import (
+    REDIRECT_CACHE_CONTROL,
+    RedirectTarget,
+    redirect_target,
+)
+from app.services.metrics import observe_db
+from app.services.redirect_cache import redirect_cache
+from app.services.redirect_snapshot import click_forwarder, redirect_snapshot
+from app.services.short_code_filter import short_code_filter
+from app.services.sql_profiler import current_operation
 from app.services.url_service import URLService
 
+REDIRECT_FAST_PATH = os.getenv("REDIRECT_FAST_PATH", "true").lower() == "true"
+
 router = APIRouter()
 
 
@@ -13,5 +40,189 @@ async def redirect_to_url(
     """
     Root-level redirect for shortened URLs
     """
-    original_url = await url_service.get_original_url(short_code, request)
-    return RedirectResponse(url=original_url)
+    if redirect_snapshot.enabled:
+        target = _snapshot_redirect(short_code)
+        if target is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="URL not found"
+            )
+        if target.is_expired():
+            raise HTTPException(status_code=status.HTTP_410_GONE, detail="URL expired")
+    else:
+        target = await url_service.get_original_url(short_code, request)
+    return RedirectResponse(
+        url=target.original_url,
+        status_code=target.status_code,
+        headers={"Cache-Control": REDIRECT_CACHE_CONTROL},
+    )
+
+
+# Built once: SQLAlchemy compiles it on first use per dialect and reuses the
+# compiled form from its statement cache afterwards
+LOOKUP_REDIRECT = (
+    select(URL.original_url, URL.redirect_status, URL.expires_at)
+    .where(URL.short_code == bindparam("short_code"))
+    .where(URL.is_deleted == False)  # noqa: E712
+)
+LOOKUP_OPERATION = "RedirectFastPath.lookup"
+
+# Codes the fast path serves; anything else takes the regular route
+SHORT_CODE_PATH = re.compile(r"/([A-Za-z0-9_-]+)")
+# Same characters as RedirectResponse leaves unquoted in the Location header
+LOCATION_SAFE_CHARACTERS = ":/%#?=@[]!$&'()*+,;"
+NOT_FOUND_BODY = b'{"detail":"URL not found"}'
+GONE_BODY = b'{"detail":"URL expired"}'
+CACHE_CONTROL_HEADER = REDIRECT_CACHE_CONTROL.encode()
+
+
+def _lookup_engine(short_code: str) -> Tuple[Union[Engine, AsyncEngine], str]:
+    """Engine holding a short code, and the kind of round trip for metrics"""
+    if db.shard_engines:
+        return db.shard_engines[shard_index(short_code, len(db.shard_engines))], "query"
+    replica = not recent_writes.is_recent(short_code)
+    if db.async_engine is not None:
+        if replica and db.async_read_engine is not None:
+            return db.async_read_engine, "replica"
+        return db.async_engine, "query"
+    if replica and db.read_engine is not None:
+        return db.read_engine, "replica"
+    return db.engine, "query"
+
+
+async def _fetch_redirect(short_code: str) -> Optional[RedirectTarget]:
+    engine, kind = _lookup_engine(short_code)
+    token = current_operation.set(LOOKUP_OPERATION)
+    start = time.perf_counter()
+    try:
+        if isinstance(engine, AsyncEngine):
+            async with engine.connect() as connection:
+                result = await connection.execute(
+                    LOOKUP_REDIRECT, {"short_code": short_code}
+                )
+                row = result.first()
+        else:
+            with engine.connect() as connection:
+                row = connection.execute(
+                    LOOKUP_REDIRECT, {"short_code": short_code}
+                ).first()
+        return redirect_target(*row) if row is not None else None
+    finally:
+        observe_db(LOOKUP_OPERATION, kind, start)
+        current_operation.reset(token)
+
+
+async def _load_redirect(short_code: str) -> Optional[RedirectTarget]:
+    # Same lookup order as URLService._load_original_url
+    if not short_code_filter.might_exist(short_code):
+        return None
+    target = await _fetch_redirect(short_code)
+    if target is None:
+        short_code_filter.record_false_positive(short_code)
+    return target
+
+
+def _snapshot_redirect(short_code: str) -> Optional[RedirectTarget]:
+    # Redirect-only nodes: no cache, filter or database, clicks are forwarded
+    target = redirect_snapshot.lookup(short_code)
+    if target is not None and not target.is_expired():
+        click_forwarder.record(short_code)
+    return target
+
+
+class RedirectFastPathMiddleware:
+    """
+    Serves ``GET /{short_code}`` before routing, dependency injection and the
+    CORS middleware.
+
+    Lookups go through the same redirect cache, short code filter and click
+    buffers as URLService.get_original_url (or the same snapshot on
+    redirect-only nodes), and cache misses run one
+    precompiled statement on a pooled connection instead of building a
+    Session, a URLRepository and a URLService. Responses match the regular
+    route: the link's redirect status with Location and Cache-Control
+    headers, or 404 (410 for expired links) with the same JSON body.
+    Cross-origin requests and paths of other single-segment routes (/docs,
+    /metrics, ...) are passed on to the application.
+    """
+
+    def __init__(self, app, router):
+        self.app = app
+        self.router = router
+        self._reserved_paths = None
+        self._redirect_route = None
+
+    def _load_routes(self) -> None:
+        self._reserved_paths = {
+            route.path for route in self.router.routes if "{" not in route.path
+        }
+        self._redirect_route = next(
+            route
+            for route in self.router.routes
+            if getattr(route, "endpoint", None) is redirect_to_url
+        )
+
+    async def __call__(self, scope, receive, send):
+        if (
+            not REDIRECT_FAST_PATH
+            or scope["type"] != "http"
+            or scope["method"] != "GET"
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        match = SHORT_CODE_PATH.fullmatch(scope["path"])
+        if self._reserved_paths is None:
+            self._load_routes()
+        if (
+            match is None
+            or scope["path"] in self._reserved_paths
+            or any(name == b"origin" for name, _ in scope["headers"])
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        # Lets the metrics middleware label the request with the route template
+        scope["route"] = self._redirect_route
+        short_code = match.group(1)
+        if redirect_snapshot.enabled:
+            target = _snapshot_redirect(short_code)
+        else:
+            target = await redirect_cache.get_or_load(
+                short_code, lambda: _load_redirect(short_code)
+            )
+            if target is not None and not target.is_expired():
+                click_buffer.record(short_code)
+                click_events.record(short_code)
+                if click_buffer.is_flush_due():
+                    await click_buffer.flush()
+
+        if target is None or target.is_expired():
+            status_code, body = (
+                (404, NOT_FOUND_BODY) if target is None else (410, GONE_BODY)
+            )
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": status_code,
+                    "headers": [
+                        (b"content-length", str(len(body)).encode()),
+                        (b"content-type", b"application/json"),
+                    ],
+                }
+            )
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        location = quote(target.original_url, safe=LOCATION_SAFE_CHARACTERS)
+        await send(
+            {
+                "type": "http.response.start",
+                "status": target.status_code,
+                "headers": [
+                    (b"cache-control", CACHE_CONTROL_HEADER),
+                    (b"content-length", b"0"),
+                    (b"location", location.encode("latin-1")),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": b""})
@@ -1,8 +1,10 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, Request, status
+from fastapi import APIRouter, Depends, Request, Response, status
+from fastapi.responses import ORJSONResponse
 
-from app.models.url import URLCreate, URLResponse, URLUpdate
+from app.models.url import URLBatchResult, URLCreate, URLResponse, URLUpdate
+from app.services.http_caching import is_not_modified, url_validators
 from app.services.url_service import URLService
 
 router = APIRouter()
@@ -13,9 +15,18 @@ async def get_all_urls(
     request: Request,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     url_service: URLService = Depends(),
-) -> List[URLResponse]:
-    return await url_service.get_all_urls(request, skip, limit)
+) -> ORJSONResponse:
+    """
+    List URLs ordered by id. Pass the X-Next-Cursor header of a page as
+    cursor to fetch the next one; skip is kept for offset pagination.
+    """
+    urls, next_cursor = await url_service.get_all_urls(request, skip, limit, cursor)
+    # Returning a response skips the response_model validation: the payloads
+    # are built from the selected columns and encoded as they are
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return ORJSONResponse(urls, headers=headers)
 
 
 @router.post(
@@ -30,11 +41,38 @@ async def create_short_url(
     return await url_service.create_short_url(url_create, request)
 
 
-@router.get("/{short_code}", response_model=URLResponse)
+@router.post("/shorten/batch", response_model=List[URLBatchResult])
+async def create_short_urls(
+    url_creates: List[URLCreate], request: Request, url_service: URLService = Depends()
+) -> List[URLBatchResult]:
+    """
+    Create many shortened URLs in one request. Results are returned in input
+    order with a status of created, existing, conflict or invalid.
+    """
+    return await url_service.create_short_urls(url_creates, request)
+
+
+@router.get(
+    "/{short_code}",
+    response_model=URLResponse,
+    responses={status.HTTP_304_NOT_MODIFIED: {"description": "Not Modified"}},
+)
 async def get_short_url(
-    short_code: str, request: Request, url_service: URLService = Depends()
+    short_code: str,
+    request: Request,
+    response: Response,
+    url_service: URLService = Depends(),
 ) -> URLResponse:
-    return await url_service.get_short_url(short_code, request)
+    """
+    Get a shortened URL. Responses carry an ETag; a request with a matching
+    If-None-Match gets 304.
+    """
+    url = await url_service.get_short_url(short_code, request)
+    validators = url_validators(url)
+    if is_not_modified(request.headers, url):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=validators)
+    response.headers.update(validators)
+    return url
 
 
 @router.put("/{short_code}", response_model=URLResponse)
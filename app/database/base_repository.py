@@ -0,0 +1,85 @@
+import sys
+import time
+from contextlib import contextmanager
+from typing import Optional, Union
+
+from fastapi import Depends
+from sqlmodel import Session, SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.database.db import get_db, get_read_db
+from app.services.metrics import observe_db
+from app.services.sql_profiler import current_operation
+
+
+class BaseRepository:
+    """
+    Session helpers shared by the repositories: they run on either a sync
+    Session or an AsyncSession, depending on DB_ASYNC and on get_session
+    overrides. Queries marked ``replica=True`` go to the read replica session
+    when one is configured.
+    """
+
+    def __init__(
+        self,
+        db: Union[Session, AsyncSession] = Depends(get_db),
+        read_db: Optional[Union[Session, AsyncSession]] = Depends(get_read_db),
+    ):
+        self.db = db
+        # Repositories built by hand (e.g. in background jobs) get the
+        # unresolved Depends marker here and read from the primary
+        self.read_db = read_db if isinstance(read_db, (Session, AsyncSession)) else None
+
+    @property
+    def dialect_name(self) -> str:
+        return self.db.get_bind().dialect.name
+
+    def _operation(self) -> str:
+        """
+        Name the repository method a round trip is made for, skipping private
+        helpers such as _save so the time is charged to create/update/delete
+        """
+        frame = sys._getframe(1)
+        while frame.f_back is not None and frame.f_code.co_name.startswith("_"):
+            frame = frame.f_back
+        return f"{type(self).__name__}.{frame.f_code.co_name}"
+
+    @contextmanager
+    def _round_trip(self, kind: str):
+        # Times the round trip for /metrics and tags the statements it emits
+        # (including flushes on commit) for the SQL profiler
+        operation = self._operation()
+        token = current_operation.set(operation)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            observe_db(operation, kind, start)
+            current_operation.reset(token)
+
+    async def _exec(self, statement, replica: bool = False):
+        session = self.read_db if replica and self.read_db is not None else self.db
+        with self._round_trip("replica" if session is not self.db else "query"):
+            if isinstance(session, AsyncSession):
+                return await session.exec(statement)
+            return session.exec(statement)
+
+    async def _commit(self) -> None:
+        with self._round_trip("commit"):
+            if isinstance(self.db, AsyncSession):
+                await self.db.commit()
+            else:
+                self.db.commit()
+
+    async def rollback(self) -> None:
+        if isinstance(self.db, AsyncSession):
+            await self.db.rollback()
+        else:
+            self.db.rollback()
+
+    async def _refresh(self, instance: SQLModel) -> None:
+        with self._round_trip("query"):
+            if isinstance(self.db, AsyncSession):
+                await self.db.refresh(instance)
+            else:
+                self.db.refresh(instance)
@@ -0,0 +1,97 @@
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Sequence, Tuple, Type, Union
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import delete, insert, select
+
+from app.database.base_repository import BaseRepository
+from app.models.click_event import ClickEvent, ClickRollupDaily, ClickRollupHourly
+
+Rollup = Union[Type[ClickRollupHourly], Type[ClickRollupDaily]]
+
+
+def hour_bucket(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def day_bucket(moment: datetime) -> datetime:
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class ClickEventRepository(BaseRepository):
+    async def ingest(
+        self, events: Sequence[Tuple[str, datetime, int]], batch_size: int = 1000
+    ) -> None:
+        """
+        Store raw click events (short code, time, number of clicks) and add
+        them to the hourly and daily rollups, all in one transaction
+        """
+        for start in range(0, len(events), batch_size):
+            rows = [
+                {"short_code": short_code, "occurred_at": occurred_at, "clicks": clicks}
+                for short_code, occurred_at, clicks in events[
+                    start : start + batch_size
+                ]
+            ]
+            await self._exec(insert(ClickEvent).values(rows))
+
+        hourly: Counter = Counter()
+        daily: Counter = Counter()
+        for code, moment, clicks in events:
+            hourly[code, hour_bucket(moment)] += clicks
+            daily[code, day_bucket(moment)] += clicks
+        await self._add_to_rollup(ClickRollupHourly, hourly)
+        await self._add_to_rollup(ClickRollupDaily, daily)
+        await self._commit()
+
+    async def _add_to_rollup(
+        self, rollup: Rollup, counts: Dict[Tuple[str, datetime], int]
+    ) -> None:
+        if not counts:
+            return
+        rows = [
+            {"short_code": short_code, "bucket_start": bucket_start, "clicks": clicks}
+            for (short_code, bucket_start), clicks in counts.items()
+        ]
+
+        # INSERT ... ON CONFLICT DO UPDATE, in its PostgreSQL or SQLite flavour
+        dialect = postgresql if self.dialect_name == "postgresql" else sqlite
+        statement = dialect.insert(rollup).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=["short_code", "bucket_start"],
+            set_={"clicks": rollup.clicks + statement.excluded.clicks},
+        )
+        await self._exec(statement)
+
+    async def get_rollup(
+        self, rollup: Rollup, short_code: str, start: datetime, end: datetime
+    ) -> List[Tuple[datetime, int]]:
+        statement = (
+            select(rollup.bucket_start, rollup.clicks)
+            .where(rollup.short_code == short_code)
+            .where(rollup.bucket_start >= start)
+            .where(rollup.bucket_start < end)
+            .order_by(rollup.bucket_start)
+        )
+        result = await self._exec(statement, replica=True)
+        return list(result.all())
+
+    async def prune_events(self, older_than: datetime, batch_size: int = 5000) -> int:
+        """
+        Delete raw events older than the cutoff in bounded batches, committing
+        after each one so no single transaction holds locks for long
+        """
+        pruned = 0
+        while True:
+            batch = (
+                select(ClickEvent.id)
+                .where(ClickEvent.occurred_at < older_than)
+                .limit(batch_size)
+            )
+            statement = delete(ClickEvent).where(ClickEvent.id.in_(batch))
+            result = await self._exec(statement)
+            await self._commit()
+            pruned += result.rowcount
+            if result.rowcount < batch_size:
+                return pruned
@@ -1,7 +1,16 @@
 import os
+import time
+from contextlib import asynccontextmanager
+from typing import List, Union
 
 from dotenv import load_dotenv
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from sqlmodel import Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.services.metrics import DB_POOL_CHECKOUT_WAIT
 
 load_dotenv()
 
@@ -15,15 +24,139 @@ DATABASE_URL = (
     f"postgresql+psycopg2://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
 )
 
-engine = create_engine(DATABASE_URL)
+# Set DB_ASYNC=true to serve requests through an async engine (asyncpg by
+# default, or e.g. sqlite+aiosqlite:///./local.db via ASYNC_DATABASE_URL)
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() == "true"
+ASYNC_DATABASE_URL = os.getenv(
+    "ASYNC_DATABASE_URL",
+    f"postgresql+asyncpg://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}",
+)
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool recording how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start)
+
+
+class TimedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool, TimedQueuePool):
+    pass
+
+
+# Optional read replica serving the read-only repository methods; with
+# neither set every query goes to the primary
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL")
+ASYNC_READ_DATABASE_URL = os.getenv("ASYNC_READ_DATABASE_URL")
+
+engine = create_engine(DATABASE_URL, poolclass=TimedQueuePool)
+async_engine = (
+    create_async_engine(ASYNC_DATABASE_URL, poolclass=TimedAsyncAdaptedQueuePool)
+    if DB_ASYNC
+    else None
+)
+read_engine = (
+    create_engine(READ_DATABASE_URL, poolclass=TimedQueuePool)
+    if READ_DATABASE_URL and not DB_ASYNC
+    else None
+)
+async_read_engine = (
+    create_async_engine(ASYNC_READ_DATABASE_URL, poolclass=TimedAsyncAdaptedQueuePool)
+    if ASYNC_READ_DATABASE_URL and DB_ASYNC
+    else None
+)
+
+# Optional hash partitioning of the urls table across several databases (see
+# app/database/sharding.py). The main database keeps every other table, such
+# as the id counters and the click events. Each shard URL may use a sync or
+# an async driver, e.g. sqlite:///./shard0.db or postgresql+asyncpg://...
+SHARD_DATABASE_URLS = [
+    url.strip()
+    for url in os.getenv("SHARD_DATABASE_URLS", "").split(",")
+    if url.strip()
+]
 
 
-def get_db():
-    db = Session(engine)
+def create_shard_engine(url: str) -> Union[Engine, AsyncEngine]:
+    if make_url(url).get_dialect().is_async:
+        return create_async_engine(url, poolclass=TimedAsyncAdaptedQueuePool)
+    return create_engine(url, poolclass=TimedQueuePool)
+
+
+shard_engines: List[Union[Engine, AsyncEngine]] = [
+    create_shard_engine(url) for url in SHARD_DATABASE_URLS
+]
+
+
+async def get_db():
+    if async_engine is not None:
+        async with AsyncSession(async_engine, expire_on_commit=False) as db:
+            yield db
+    else:
+        db = Session(engine)
+        try:
+            yield db
+        finally:
+            db.close()
+
+
+async def get_read_db():
+    """Session on the read replica, or None when no replica is configured"""
+    if async_read_engine is not None:
+        async with AsyncSession(async_read_engine, expire_on_commit=False) as db:
+            yield db
+    elif read_engine is not None:
+        db = Session(read_engine)
+        try:
+            yield db
+        finally:
+            db.close()
+    else:
+        yield None
+
+
+def open_shard_sessions() -> List[Union[Session, AsyncSession]]:
+    # Sessions only check out a connection when first used
+    return [
+        (
+            AsyncSession(shard_engine, expire_on_commit=False)
+            if isinstance(shard_engine, AsyncEngine)
+            else Session(shard_engine)
+        )
+        for shard_engine in shard_engines
+    ]
+
+
+async def close_sessions(sessions: List[Union[Session, AsyncSession]]) -> None:
+    for session in sessions:
+        if isinstance(session, AsyncSession):
+            await session.close()
+        else:
+            session.close()
+
+
+async def get_shard_dbs():
+    """Sessions on every shard database, or an empty list without sharding"""
+    sessions = open_shard_sessions()
     try:
-        yield db
+        yield sessions
     finally:
-        db.close()
+        await close_sessions(sessions)
+
+
+@asynccontextmanager
+async def session_scope():
+    """Open a session outside of a request, e.g. for background jobs"""
+    if async_engine is not None:
+        async with AsyncSession(async_engine, expire_on_commit=False) as db:
+            yield db
+    else:
+        with Session(engine) as db:
+            yield db
 
 
 # Create an alias for get_db to make tests clearer
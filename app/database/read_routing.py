@@ -0,0 +1,133 @@
+import math
+import os
+import time
+from contextvars import ContextVar
+from http.cookies import CookieError, SimpleCookie
+from typing import Dict, List, Optional
+
+READ_YOUR_WRITES_WINDOW = float(os.getenv("READ_YOUR_WRITES_WINDOW", "5.0"))
+READ_YOUR_WRITES_COOKIE = "last_write"
+RECENT_WRITES_MAX_SIZE = 100000
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# Wall-clock time of the current client's last write, from its cookie
+_client_last_write: ContextVar[Optional[float]] = ContextVar(
+    "client_last_write", default=None
+)
+
+
+class RecentWrites:
+    """
+    Short codes written by this process within the last ``window`` seconds,
+    plus the requests of clients that wrote within the window.
+
+    Reads of these keys go to the primary instead of the replica, so a client
+    reads its own create, update or delete even while the replica lags. The
+    per-key pins only exist in the worker that wrote; clients are also pinned
+    by the time of their last write, which ReadYourWritesMiddleware keeps in
+    a cookie, so the guarantee holds whichever worker (or host) serves the
+    read.
+    """
+
+    def __init__(self, window: float = READ_YOUR_WRITES_WINDOW):
+        self.window = window
+        # short_code -> monotonic time until which reads are pinned
+        self._pinned: Dict[str, float] = {}
+        self.pinned_reads = 0
+
+    def mark(self, short_code: str) -> None:
+        now = time.monotonic()
+        if len(self._pinned) >= RECENT_WRITES_MAX_SIZE:
+            self._prune(now)
+        # Re-insert so the dict stays ordered by expiry
+        self._pinned.pop(short_code, None)
+        self._pinned[short_code] = now + self.window
+
+    def is_recent(self, short_code: str) -> bool:
+        until = self._pinned.get(short_code)
+        if until is not None and until <= time.monotonic():
+            del self._pinned[short_code]
+            until = None
+        if until is None and not self.client_wrote_recently():
+            return False
+        self.pinned_reads += 1
+        return True
+
+    def client_wrote_recently(self) -> bool:
+        """Whether the current request comes from a client that wrote lately"""
+        written_at = _client_last_write.get()
+        # Times in the future are not trusted: they would pin reads forever
+        return written_at is not None and 0 <= time.time() - written_at < self.window
+
+    def _prune(self, now: float) -> None:
+        for short_code, until in list(self._pinned.items()):
+            if until > now:
+                break
+            del self._pinned[short_code]
+        # Under a write burst larger than the bound, forget the oldest keys
+        while len(self._pinned) >= RECENT_WRITES_MAX_SIZE:
+            del self._pinned[next(iter(self._pinned))]
+
+    def clear(self) -> None:
+        self._pinned.clear()
+        self.pinned_reads = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"pinned_keys": len(self._pinned), "pinned_reads": self.pinned_reads}
+
+
+recent_writes = RecentWrites()
+
+
+def _last_write(headers: List) -> Optional[float]:
+    for name, value in headers:
+        if name != b"cookie":
+            continue
+        try:
+            morsel = SimpleCookie(value.decode("latin-1")).get(READ_YOUR_WRITES_COOKIE)
+            if morsel is not None:
+                return float(morsel.value)
+        except (CookieError, ValueError):
+            return None
+    return None
+
+
+class ReadYourWritesMiddleware:
+    """
+    Pure ASGI middleware carrying read-your-writes across workers: successful
+    writes set a cookie with the write time, and requests bearing a recent one
+    read short codes from the primary and do not trust a short code filter
+    miss.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or recent_writes.window <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        is_write = scope["method"] not in READ_METHODS
+
+        async def send_wrapper(message):
+            if (
+                is_write
+                and message["type"] == "http.response.start"
+                and message["status"] < 400
+            ):
+                cookie = (
+                    f"{READ_YOUR_WRITES_COOKIE}={time.time():.3f}; "
+                    f"Max-Age={math.ceil(recent_writes.window)}; Path=/; "
+                    "HttpOnly; SameSite=Lax"
+                )
+                headers = list(message.get("headers", []))
+                headers.append((b"set-cookie", cookie.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = _client_last_write.set(_last_write(scope["headers"]))
+        try:
+            await self.app(scope, receive, send_wrapper if is_write else send)
+        finally:
+            _client_last_write.reset(token)
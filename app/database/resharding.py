@@ -0,0 +1,274 @@
+import argparse
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, List, Sequence, Tuple
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.engine import Engine, make_url
+from sqlmodel import Session, create_engine
+
+from app.database import db
+from app.database.sharded_url_repository import URL_ID_COUNTER
+from app.database.sharding import shard_index
+from app.database.url_repository import URLRepository
+from app.models.short_code_counter import ShortCodeCounter
+from app.models.url import URL
+
+RESHARD_BATCH_SIZE = 1000
+RESHARD_BATCH_PAUSE = 0.1
+
+logger = logging.getLogger(__name__)
+
+urls = URL.__table__
+
+
+def _same_database(a: Engine, b: Engine) -> bool:
+    return a.url.render_as_string(hide_password=False) == b.url.render_as_string(
+        hide_password=False
+    )
+
+
+class Resharder:
+    """
+    Moves URLs into the shard they map to in a new shard layout, in batches.
+
+    Resharding runs in two passes so every short code stays readable:
+
+    1. ``copy`` upserts each row of the old databases into its shard in the
+       new layout, leaving the original in place. Run it again right before
+       switching to pick up rows written in the meantime.
+    2. Restart the workers with SHARD_DATABASE_URLS set to the new layout.
+    3. ``prune`` deletes from each shard the rows that map to another one
+       (only once that shard holds them) and recomputes every shard's
+       analytics counters.
+
+    Clicks and updates written to the old location between the last copy and
+    the restart are lost. Archived URLs stay where they are. A row whose short
+    code is held by another live row in its new shard (e.g. an alias created
+    there directly) is not copied: it is logged and listed in ``clashes`` and
+    stays in place for ``prune``.
+    """
+
+    def __init__(
+        self,
+        targets: Sequence[Engine],
+        batch_size: int = RESHARD_BATCH_SIZE,
+        batch_pause: float = RESHARD_BATCH_PAUSE,
+    ):
+        self.targets = list(targets)
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.copied = 0
+        self.pruned = 0
+        self.batches = 0
+        # (id, short_code) of the rows copy skipped
+        self.clashes: List[Tuple[int, str]] = []
+
+    def _target_index(self, short_code: str) -> int:
+        return shard_index(short_code, len(self.targets))
+
+    async def copy(self, source: Engine) -> int:
+        """Upsert every row of ``source`` into its target shard"""
+        copied = 0
+        after_id = 0
+        while True:
+            with source.connect() as connection:
+                rows = (
+                    connection.execute(
+                        select(urls)
+                        .where(urls.c.id > after_id)
+                        .order_by(urls.c.id)
+                        .limit(self.batch_size)
+                    )
+                    .mappings()
+                    .all()
+                )
+            if not rows:
+                break
+            after_id = rows[-1]["id"]
+
+            by_target: Dict[int, List[dict]] = defaultdict(list)
+            for row in rows:
+                index = self._target_index(row["short_code"])
+                if not _same_database(self.targets[index], source):
+                    by_target[index].append(dict(row))
+            for index, target_rows in by_target.items():
+                with self.targets[index].begin() as connection:
+                    ids = [row["id"] for row in target_rows]
+                    connection.execute(delete(urls).where(urls.c.id.in_(ids)))
+                    taken = set(
+                        connection.execute(
+                            select(urls.c.short_code)
+                            .where(
+                                urls.c.short_code.in_(
+                                    [row["short_code"] for row in target_rows]
+                                )
+                            )
+                            .where(urls.c.is_deleted == False)  # noqa: E712
+                        ).scalars()
+                    )
+                    clashing = [
+                        row
+                        for row in target_rows
+                        if not row["is_deleted"] and row["short_code"] in taken
+                    ]
+                    if clashing:
+                        logger.warning(
+                            "Skipping %d rows whose short code is taken on shard "
+                            "%d: %s",
+                            len(clashing),
+                            index,
+                            ", ".join(row["short_code"] for row in clashing),
+                        )
+                        self.clashes.extend(
+                            (row["id"], row["short_code"]) for row in clashing
+                        )
+                        skipped = {row["id"] for row in clashing}
+                        target_rows = [
+                            row for row in target_rows if row["id"] not in skipped
+                        ]
+                    if target_rows:
+                        connection.execute(insert(urls), target_rows)
+                copied += len(target_rows)
+
+            self.batches += 1
+            if len(rows) < self.batch_size:
+                break
+            await asyncio.sleep(self.batch_pause)
+        self.copied += copied
+        return copied
+
+    async def prune(self) -> int:
+        """
+        Delete the rows each shard holds for another shard, then recompute
+        the analytics counters of every shard
+        """
+        pruned = 0
+        for index, target in enumerate(self.targets):
+            after_id = 0
+            while True:
+                with target.connect() as connection:
+                    rows = connection.execute(
+                        select(urls.c.id, urls.c.short_code)
+                        .where(urls.c.id > after_id)
+                        .order_by(urls.c.id)
+                        .limit(self.batch_size)
+                    ).all()
+                if not rows:
+                    break
+                after_id = rows[-1].id
+
+                misplaced: Dict[int, List[int]] = defaultdict(list)
+                for url_id, short_code in rows:
+                    owner = self._target_index(short_code)
+                    if owner != index:
+                        misplaced[owner].append(url_id)
+                for owner, ids in misplaced.items():
+                    with self.targets[owner].connect() as connection:
+                        copied = set(
+                            connection.execute(
+                                select(urls.c.id).where(urls.c.id.in_(ids))
+                            ).scalars()
+                        )
+                    if len(copied) < len(ids):
+                        logger.warning(
+                            "Keeping %d rows missing from shard %d, run copy first",
+                            len(ids) - len(copied),
+                            owner,
+                        )
+                    if copied:
+                        with target.begin() as connection:
+                            connection.execute(
+                                delete(urls).where(urls.c.id.in_(copied))
+                            )
+                        pruned += len(copied)
+
+                self.batches += 1
+                if len(rows) < self.batch_size:
+                    break
+                await asyncio.sleep(self.batch_pause)
+
+        for target in self.targets:
+            with Session(target) as session:
+                await URLRepository(session).recompute_counters()
+        self.pruned += pruned
+        return pruned
+
+    def raise_id_counter(self, main: Engine) -> None:
+        """
+        Move the url_id counter on the main database past every existing id,
+        e.g. after copying the rows of an unsharded database
+        """
+        max_id = 0
+        for target in self.targets:
+            with target.connect() as connection:
+                max_id = max(
+                    max_id,
+                    connection.execute(select(func.max(urls.c.id))).scalar() or 0,
+                )
+        counters = ShortCodeCounter.__table__
+        with main.begin() as connection:
+            exists = connection.execute(
+                select(counters.c.name).where(counters.c.name == URL_ID_COUNTER)
+            ).first()
+            if exists is None:
+                connection.execute(
+                    insert(counters).values(name=URL_ID_COUNTER, next_value=max_id)
+                )
+            else:
+                connection.execute(
+                    update(counters)
+                    .where(counters.c.name == URL_ID_COUNTER)
+                    .where(counters.c.next_value < max_id)
+                    .values(next_value=max_id)
+                )
+
+
+def _engines(urls_argument: str) -> List[Engine]:
+    engines = []
+    for url in urls_argument.split(","):
+        if make_url(url).get_dialect().is_async:
+            raise SystemExit(f"Use a synchronous driver URL for resharding: {url}")
+        engines.append(create_engine(url))
+    return engines
+
+
+if __name__ == "__main__":
+    # python -m app.database.resharding copy --target URL1,URL2,URL3
+    # python -m app.database.resharding prune --target URL1,URL2,URL3
+    parser = argparse.ArgumentParser(description="Move URLs to a new shard layout")
+    parser.add_argument("command", choices=["copy", "prune"])
+    parser.add_argument(
+        "--target", required=True, help="comma-separated shard URLs, in order"
+    )
+    parser.add_argument(
+        "--source",
+        default=",".join(db.SHARD_DATABASE_URLS) or db.DATABASE_URL,
+        help="comma-separated URLs to copy from (default: the current shards, "
+        "or the main database when unsharded)",
+    )
+    parser.add_argument(
+        "--main",
+        default=db.DATABASE_URL,
+        help="main database holding the url_id counter",
+    )
+    parser.add_argument("--batch-size", type=int, default=RESHARD_BATCH_SIZE)
+    parser.add_argument("--batch-pause", type=float, default=RESHARD_BATCH_PAUSE)
+    args = parser.parse_args()
+
+    resharder = Resharder(_engines(args.target), args.batch_size, args.batch_pause)
+    if args.command == "copy":
+        for source in _engines(args.source):
+            asyncio.run(resharder.copy(source))
+        resharder.raise_id_counter(create_engine(args.main))
+        print(f"Copied {resharder.copied} URLs in {resharder.batches} batches")
+        if resharder.clashes:
+            print(
+                f"Skipped {len(resharder.clashes)} URLs whose short code is taken "
+                "on their new shard: "
+                + ", ".join(short_code for _, short_code in resharder.clashes)
+            )
+    else:
+        asyncio.run(resharder.prune())
+        print(f"Pruned {resharder.pruned} URLs in {resharder.batches} batches")
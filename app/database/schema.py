@@ -0,0 +1,99 @@
+import ast
+import os
+import re
+from pathlib import Path
+from typing import Set, Union
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import SQLModel
+
+from app.database import db
+
+# What the startup hook does with the database schema:
+#   create  create missing tables with SQLModel.metadata.create_all (local
+#           development and tests; one inspection query per table)
+#   verify  check with one query per database that Alembic migrated it to
+#           the head revision, and refuse to start otherwise
+#   skip    trust the deployment to have migrated; no query at all
+DB_SCHEMA_CHECK_MODES = ("create", "verify", "skip")
+DB_SCHEMA_CHECK = os.getenv("DB_SCHEMA_CHECK", "create").lower()
+
+if DB_SCHEMA_CHECK not in DB_SCHEMA_CHECK_MODES:
+    raise ValueError(
+        f"DB_SCHEMA_CHECK must be one of {DB_SCHEMA_CHECK_MODES}, "
+        f"got {DB_SCHEMA_CHECK!r}"
+    )
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations" / "versions"
+
+_ASSIGNMENT = re.compile(
+    r"^(revision|down_revision)\s*(?::[^=]+)?=\s*(.+)$", re.MULTILINE
+)
+
+
+def migration_heads(versions_dir: Path = MIGRATIONS_DIR) -> Set[str]:
+    """
+    Head revisions of the migration scripts, read from their ``revision``
+    and ``down_revision`` assignments. Importing Alembic and the scripts
+    would cost more than the rest of the startup hook.
+    """
+    revisions: Set[str] = set()
+    parents: Set[str] = set()
+    for path in versions_dir.glob("*.py"):
+        assignments = dict(_ASSIGNMENT.findall(path.read_text()))
+        if "revision" not in assignments:
+            continue
+        revisions.add(ast.literal_eval(assignments["revision"]))
+        down_revision = ast.literal_eval(assignments.get("down_revision", "None"))
+        if isinstance(down_revision, str):
+            parents.add(down_revision)
+        elif down_revision:
+            parents.update(down_revision)
+    return revisions - parents
+
+
+async def _database_revisions(engine: Union[Engine, AsyncEngine]) -> Set[str]:
+    statement = text("SELECT version_num FROM alembic_version")
+    try:
+        if isinstance(engine, AsyncEngine):
+            async with engine.connect() as connection:
+                return set((await connection.execute(statement)).scalars())
+        with engine.connect() as connection:
+            return set(connection.execute(statement).scalars())
+    except DBAPIError as exc:
+        raise RuntimeError(
+            f"Could not read the Alembic revision of {engine.url!r}: "
+            "run alembic upgrade head"
+        ) from exc
+
+
+async def _create_all(engine: Union[Engine, AsyncEngine]) -> None:
+    if isinstance(engine, AsyncEngine):
+        async with engine.begin() as connection:
+            await connection.run_sync(SQLModel.metadata.create_all)
+    else:
+        SQLModel.metadata.create_all(engine)
+
+
+async def prepare_schema() -> None:
+    """Create or verify the schema of the main and shard databases"""
+    if DB_SCHEMA_CHECK == "skip":
+        return
+    engines = [db.async_engine or db.engine, *db.shard_engines]
+    if DB_SCHEMA_CHECK == "create":
+        for engine in engines:
+            await _create_all(engine)
+        return
+
+    heads = migration_heads()
+    for engine in engines:
+        revisions = await _database_revisions(engine)
+        if revisions != heads:
+            raise RuntimeError(
+                f"Database {engine.url!r} is at revision "
+                f"{', '.join(sorted(revisions)) or 'none'}, expected "
+                f"{', '.join(sorted(heads))}: run alembic upgrade head"
+            )
@@ -0,0 +1,300 @@
+import asyncio
+import heapq
+import logging
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    TypeVar,
+    Union,
+)
+
+from fastapi import Depends
+from sqlalchemy.engine import Row
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.database import db
+from app.database.db import get_db, get_read_db, get_shard_dbs
+from app.database.sharding import shard_index
+from app.database.url_repository import URLRepository
+from app.models.url import URL
+
+URL_ID_COUNTER = "url_id"
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ShardedURLRepository(URLRepository):
+    """
+    URLRepository over URLs hash-partitioned by short code across the shard
+    databases.
+
+    Reads and writes of one short code go to the single shard that holds it.
+    Listings, rankings, counts and the analytics counters fan out to every
+    shard and merge or sum the results. Multi-shard writes (batch creates,
+    click flushes) run on every shard first and are committed only once all
+    of them succeeded.
+
+    Ids are unique across shards: they are reserved from the url_id counter
+    on the main database, which also keeps the short code counters. Inherited
+    methods that are not overridden run there.
+    """
+
+    def __init__(
+        self,
+        db: Union[Session, AsyncSession] = Depends(get_db),
+        read_db: Optional[Union[Session, AsyncSession]] = Depends(get_read_db),
+        shard_dbs: List[Union[Session, AsyncSession]] = Depends(get_shard_dbs),
+    ):
+        super().__init__(db, read_db)
+        # Replicas are not routed per shard: shards are read from directly
+        self.shards = [URLRepository(session) for session in shard_dbs]
+
+    def _shard(self, short_code: str) -> URLRepository:
+        return self.shards[shard_index(short_code, len(self.shards))]
+
+    def _group(self, short_codes: Iterable[str]) -> Dict[URLRepository, List[str]]:
+        groups: Dict[URLRepository, List[str]] = defaultdict(list)
+        for short_code in short_codes:
+            groups[self._shard(short_code)].append(short_code)
+        return groups
+
+    async def _fan_out(self, call: Callable[[URLRepository], Awaitable[T]]) -> List[T]:
+        # Queries on async shards overlap; sync sessions run one after another
+        return await asyncio.gather(*(call(shard) for shard in self.shards))
+
+    async def _reserve_url_ids(self, count: int) -> List[int]:
+        start = await self.reserve_ids(URL_ID_COUNTER, count)
+        # Counters start at 0, ids at 1
+        return list(range(start + 1, start + 1 + count))
+
+    async def get_all(
+        self, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+    ) -> List[Row]:
+        if after_id is not None:
+            pages = await self._fan_out(
+                lambda shard: shard.get_all(limit=limit, after_id=after_id)
+            )
+            skip = 0
+        else:
+            # Offsets cannot be split across shards: read every shard up to
+            # skip + limit rows and skip after merging
+            pages = await self._fan_out(
+                lambda shard: shard.get_all(skip=0, limit=skip + limit)
+            )
+        merged = heapq.merge(*pages, key=lambda row: row.id)
+        return list(merged)[skip : skip + limit]
+
+    async def get_short_codes(self, after_id: int, limit: int) -> List[Any]:
+        pages = await self._fan_out(
+            lambda shard: shard.get_short_codes(after_id, limit)
+        )
+        return list(heapq.merge(*pages, key=lambda row: row[0]))[:limit]
+
+    async def get_short_codes_created_since(
+        self, since: datetime, after_id: int, limit: int
+    ) -> List[Any]:
+        pages = await self._fan_out(
+            lambda shard: shard.get_short_codes_created_since(since, after_id, limit)
+        )
+        return list(heapq.merge(*pages, key=lambda row: row[0]))[:limit]
+
+    async def get_redirects(self, after_id: int, limit: int) -> List[Any]:
+        pages = await self._fan_out(lambda shard: shard.get_redirects(after_id, limit))
+        return list(heapq.merge(*pages, key=lambda row: row[0]))[:limit]
+
+    async def get_by_short_code(
+        self, short_code: str, replica: bool = False
+    ) -> Optional[URL]:
+        return await self._shard(short_code).get_by_short_code(
+            short_code, replica=replica
+        )
+
+    async def get_by_original_url(
+        self,
+        original_url: str,
+        redirect_status: Optional[int] = None,
+        expires_at: Optional[datetime] = None,
+    ) -> Optional[URL]:
+        # URLs are placed by short code, so any shard may already hold it
+        for url in await self._fan_out(
+            lambda shard: shard.get_by_original_url(
+                original_url, redirect_status, expires_at
+            )
+        ):
+            if url is not None:
+                return url
+        return None
+
+    async def get_for_batch(
+        self, original_urls: Iterable[str], short_codes: Iterable[str]
+    ) -> List[URL]:
+        original_urls, short_codes = list(original_urls), list(short_codes)
+        results = await self._fan_out(
+            lambda shard: shard.get_for_batch(original_urls, short_codes)
+        )
+        return [url for urls in results for url in urls]
+
+    async def get_taken_short_codes(self, short_codes: Iterable[str]) -> Set[str]:
+        taken: Set[str] = set()
+        for shard, codes in self._group(short_codes).items():
+            taken |= await shard.get_taken_short_codes(codes)
+        return taken
+
+    async def create(self, url: URL) -> URL:
+        (url.id,) = await self._reserve_url_ids(1)
+        return await self._shard(url.short_code).create(url)
+
+    async def create_many(
+        self, rows: List[Dict[str, Any]], batch_size: int = 1000
+    ) -> Dict[str, int]:
+        """
+        Insert the rows on every shard, and commit only once every shard
+        accepted its rows: constraint violations (e.g. a taken short code)
+        roll back the whole batch.
+
+        This is not a two-phase commit. When a commit fails after other
+        shards committed, the remaining shards are rolled back and only the
+        ids of the committed rows are returned; the caller reports the other
+        rows as not saved. A retry then finds the committed ones as existing
+        links instead of creating them twice.
+        """
+        url_ids = await self._reserve_url_ids(len(rows))
+        by_shard: Dict[URLRepository, List[Dict[str, Any]]] = defaultdict(list)
+        for row, url_id in zip(rows, url_ids):
+            by_shard[self._shard(row["short_code"])].append({**row, "id": url_id})
+
+        shard_ids: Dict[URLRepository, Dict[str, int]] = {}
+        for shard, shard_rows in by_shard.items():
+            shard_ids[shard] = await shard._insert_many(shard_rows, batch_size)
+
+        committed: List[URLRepository] = []
+        for shard in shard_ids:
+            try:
+                await shard._commit()
+            except Exception:
+                if not committed:
+                    raise
+                logger.exception(
+                    "Failed to commit a batch on a shard after %d others committed",
+                    len(committed),
+                )
+                for uncommitted in shard_ids:
+                    if uncommitted not in committed:
+                        await uncommitted.rollback()
+                break
+            committed.append(shard)
+        return {
+            short_code: url_id
+            for shard in committed
+            for short_code, url_id in shard_ids[shard].items()
+        }
+
+    async def update(self, url: URL) -> URL:
+        return await self._shard(url.short_code).update(url)
+
+    async def delete(self, url: URL) -> URL:
+        return await self._shard(url.short_code).delete(url)
+
+    async def add_clicks(
+        self, deltas: Dict[str, int], batch_size: int = 500
+    ) -> List[URL]:
+        updated: List[URL] = []
+        groups = self._group(deltas)
+        for shard, short_codes in groups.items():
+            shard_deltas = {code: deltas[code] for code in short_codes}
+            updated.extend(await shard._apply_clicks(shard_deltas, batch_size))
+        for shard in groups:
+            await shard._commit()
+        return updated
+
+    async def archive_deleted(self, older_than: datetime, batch_size: int) -> int:
+        moved = await self._fan_out(
+            lambda shard: shard.archive_deleted(older_than, batch_size)
+        )
+        return sum(moved)
+
+    async def expire_due(self, now: datetime, batch_size: int) -> List[str]:
+        expired = await self._fan_out(lambda shard: shard.expire_due(now, batch_size))
+        return [short_code for short_codes in expired for short_code in short_codes]
+
+    async def get_most_clicked(self, limit: int = 10) -> List[URL]:
+        # Top-N merge: the global top N is within the union of every shard's
+        # top N, each already in (clicks, id) descending order
+        rankings = await self._fan_out(lambda shard: shard.get_most_clicked(limit))
+        merged = heapq.merge(
+            *rankings, key=lambda url: (url.clicks, url.id), reverse=True
+        )
+        return list(merged)[:limit]
+
+    async def count_urls(self, replica: bool = True) -> int:
+        return sum(await self._fan_out(lambda shard: shard.count_urls(replica)))
+
+    async def count_total_clicks(self, replica: bool = True) -> int:
+        return sum(await self._fan_out(lambda shard: shard.count_total_clicks(replica)))
+
+    async def count_custom_urls(self, replica: bool = True) -> int:
+        return sum(await self._fan_out(lambda shard: shard.count_custom_urls(replica)))
+
+    async def count_expired(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        return _sum_counters(
+            await self._fan_out(lambda shard: shard.count_expired(now))
+        )
+
+    async def get_counters(self) -> Dict[str, int]:
+        # Every shard maintains the counters of its own rows
+        return _sum_counters(await self._fan_out(lambda shard: shard.get_counters()))
+
+    async def recompute_counters(self) -> Dict[str, int]:
+        return _sum_counters(
+            await self._fan_out(lambda shard: shard.recompute_counters())
+        )
+
+    async def rollback(self) -> None:
+        await super().rollback()
+        for shard in self.shards:
+            await shard.rollback()
+
+
+def _sum_counters(per_shard: List[Dict[str, int]]) -> Dict[str, int]:
+    totals: Dict[str, int] = defaultdict(int)
+    for counters in per_shard:
+        for name, value in counters.items():
+            totals[name] += value
+    return dict(totals)
+
+
+def get_url_repository(
+    db: Union[Session, AsyncSession] = Depends(get_db),
+    read_db: Optional[Union[Session, AsyncSession]] = Depends(get_read_db),
+    shard_dbs: List[Union[Session, AsyncSession]] = Depends(get_shard_dbs),
+) -> URLRepository:
+    """URL repository of a request, sharded when SHARD_DATABASE_URLS is set"""
+    if shard_dbs:
+        return ShardedURLRepository(db, read_db, shard_dbs)
+    return URLRepository(db, read_db)
+
+
+@asynccontextmanager
+async def url_repository_scope():
+    """URL repository outside of a request, e.g. for background jobs"""
+    async with db.session_scope() as session:
+        if not db.shard_engines:
+            yield URLRepository(session)
+            return
+        shard_sessions = db.open_shard_sessions()
+        try:
+            yield ShardedURLRepository(session, shard_dbs=shard_sessions)
+        finally:
+            await db.close_sessions(shard_sessions)
@@ -0,0 +1,34 @@
+import hashlib
+
+_JUMP_MULTIPLIER = 2862933555777941757
+_UINT64_MASK = (1 << 64) - 1
+
+
+def shard_key(short_code: str) -> int:
+    """Stable unsigned 64-bit hash of a short code"""
+    digest = hashlib.blake2b(short_code.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def jump_hash(key: int, buckets: int) -> int:
+    """
+    Jump consistent hash (Lamping & Veach): maps a key to one of ``buckets``
+    buckets so that going from n to n + 1 buckets only moves about 1/(n + 1)
+    of the keys, all of them into the new bucket
+    """
+    bucket, jump = -1, 0
+    while jump < buckets:
+        bucket = jump
+        key = (key * _JUMP_MULTIPLIER + 1) & _UINT64_MASK
+        jump = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+
+def shard_index(short_code: str, shard_count: int) -> int:
+    """
+    Shard holding a short code. The shard is a function of the code alone,
+    so every lookup by code (redirects, reads, updates, custom aliases) is a
+    single-shard query without a directory. Shards must only ever be
+    appended to SHARD_DATABASE_URLS, never reordered.
+    """
+    return jump_hash(shard_key(short_code), shard_count)
@@ -0,0 +1,28 @@
+import hashlib
+from urllib.parse import urlsplit, urlunsplit
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form used for hashing: lowercase scheme and host, no default
+    port and "/" for an empty path. Query and fragment are kept as they are.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port is not None and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    userinfo = parts.netloc.rpartition("@")[0]
+    netloc = f"{userinfo}@{host}" if userinfo else host
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, parts.fragment))
+
+
+def url_hash(url: str) -> int:
+    """
+    Signed 64-bit prefix of the SHA-256 of the normalized URL, stored in the
+    indexed original_url_hash column instead of indexing the full URL text
+    """
+    digest = hashlib.sha256(normalize_url(url).encode()).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
@@ -1,97 +1,475 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
-from fastapi import Depends
-from sqlmodel import Session, func, select
+from sqlalchemy import literal
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import and_, case, delete, func, insert, or_, select, update
 
-from app.database.db import get_db
-from app.models.url import URL
+from app.database.base_repository import BaseRepository
+from app.database.read_routing import recent_writes
+from app.database.url_hash import normalize_url, url_hash
+from app.models.analytics_counter import (
+    COUNTER_NAMES,
+    TOTAL_CLICKS,
+    TOTAL_CUSTOM_URLS,
+    TOTAL_URLS,
+    AnalyticsCounter,
+)
+from app.models.short_code_counter import ShortCodeCounter
+from app.models.url import URL, ArchivedURL
 
+# Columns behind URLResponse, read as plain rows by the listing queries
+URL_RESPONSE_COLUMNS = (
+    URL.id,
+    URL.original_url,
+    URL.short_code,
+    URL.is_custom,
+    URL.clicks,
+    URL.created_at,
+    URL.updated_at,
+    URL.redirect_status,
+    URL.expires_at,
+)
 
-class URLRepository:
-    def __init__(self, db: Session = Depends(get_db)):
-        self.db = db
 
-    def get_all(self, skip: int = 0, limit: int = 100) -> List[URL]:
-        statement = select(URL).offset(skip).limit(limit).where(URL.is_deleted == False)  # noqa: E712
-        result = self.db.exec(statement)
+def not_expired(now: Optional[datetime] = None):
+    """
+    Condition excluding expired links. Expired links stay live until the
+    reaper soft-deletes them: redirects answer 410 for them, and short code
+    lookups and uniqueness still see them.
+    """
+    return or_(URL.expires_at.is_(None), URL.expires_at > (now or datetime.utcnow()))
+
+
+class URLRepository(BaseRepository):
+    async def _save(self, url: URL) -> URL:
+        url.original_url_hash = url_hash(url.original_url)
+        self.db.add(url)
+        await self._commit()
+        await self._refresh(url)
+        return url
+
+    async def get_all(
+        self, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+    ) -> List[Row]:
+        """
+        Get the URL_RESPONSE_COLUMNS of URLs ordered by id. With ``after_id``
+        the page starts right after that id (a primary key index seek) instead
+        of skipping ``skip`` rows.
+        """
+        statement = (
+            select(*URL_RESPONSE_COLUMNS)
+            .where(URL.is_deleted == False)  # noqa: E712
+            .where(not_expired())
+            .order_by(URL.id)
+            .limit(limit)
+        )
+        if after_id is not None:
+            statement = statement.where(URL.id > after_id)
+        else:
+            statement = statement.offset(skip)
+        result = await self._exec(statement, replica=True)
         return result.all()
 
-    def get_by_short_code(self, short_code: str) -> Optional[URL]:
+    async def get_short_codes(self, after_id: int, limit: int) -> List[Tuple[int, str]]:
+        """
+        Get (id, short_code) of live URLs with an id above ``after_id``, in id
+        order
+        """
+        statement = (
+            select(URL.id, URL.short_code)
+            .where(URL.id > after_id)
+            .where(URL.is_deleted == False)  # noqa: E712
+            .order_by(URL.id)
+            .limit(limit)
+        )
+        result = await self._exec(statement)
+        return result.all()
+
+    async def get_short_codes_created_since(
+        self, since: datetime, after_id: int, limit: int
+    ) -> List[Tuple[int, str]]:
+        """
+        Get (id, short_code) of live URLs created at or after ``since`` with an
+        id above ``after_id``, in id order
+        """
+        statement = (
+            select(URL.id, URL.short_code)
+            .where(URL.created_at >= since)
+            .where(URL.id > after_id)
+            .where(URL.is_deleted == False)  # noqa: E712
+            .order_by(URL.id)
+            .limit(limit)
+        )
+        result = await self._exec(statement)
+        return result.all()
+
+    async def get_redirects(
+        self, after_id: int, limit: int
+    ) -> List[Tuple[int, str, str, Optional[int], Optional[datetime]]]:
+        """
+        Get (id, short_code, original_url, redirect_status, expires_at) of live
+        URLs with an id above ``after_id``, in id order
+        """
+        statement = (
+            select(
+                URL.id,
+                URL.short_code,
+                URL.original_url,
+                URL.redirect_status,
+                URL.expires_at,
+            )
+            .where(URL.id > after_id)
+            .where(URL.is_deleted == False)  # noqa: E712
+            .order_by(URL.id)
+            .limit(limit)
+        )
+        result = await self._exec(statement)
+        return result.all()
+
+    async def get_by_short_code(
+        self, short_code: str, replica: bool = False
+    ) -> Optional[URL]:
+        """
+        Get the live URL holding a short code. Pass ``replica=True`` for
+        lookups whose result is not written back; they read from the replica
+        unless this process wrote the code within the read-your-writes window.
+        """
         statement = (
             select(URL)
             .where(URL.short_code == short_code)
             .where(URL.is_deleted == False)  # noqa: E712
         )
-        result = self.db.exec(statement)
+        replica = replica and not recent_writes.is_recent(short_code)
+        result = await self._exec(statement, replica=replica)
         return result.first()
 
-    def get_by_original_url(self, original_url: str) -> Optional[URL]:
+    async def get_by_original_url(
+        self,
+        original_url: str,
+        redirect_status: Optional[int] = None,
+        expires_at: Optional[datetime] = None,
+    ) -> Optional[URL]:
+        # Seek on the fixed-width hash index, then compare the normalized URLs
+        # to rule out hash collisions: spellings that only differ in what
+        # normalize_url canonicalizes are the same link
         statement = (
             select(URL)
-            .where(URL.original_url == original_url)
+            .where(URL.original_url_hash == url_hash(original_url))
+            .where(URL.redirect_status == redirect_status)
+            .where(URL.expires_at == expires_at)
             .where(URL.is_deleted == False)
+            .where(not_expired())
         )  # noqa: E712
-        result = self.db.exec(statement)
-        return result.first()
+        result = await self._exec(statement)
+        normalized = normalize_url(original_url)
+        for url in result.all():
+            if normalize_url(url.original_url) == normalized:
+                return url
+        return None
 
-    def create(self, url: URL) -> URL:
-        self.db.add(url)
-        self.db.commit()
-        self.db.refresh(url)
-        return url
+    async def get_for_batch(
+        self, original_urls: Iterable[str], short_codes: Iterable[str]
+    ) -> List[URL]:
+        """
+        Get unexpired live URLs matching any of the original URLs once
+        normalized, and live URLs already holding one of the short codes, in
+        one query
+        """
+        original_urls = list(original_urls)
+        short_codes = list(short_codes)
+        statement = (
+            select(URL)
+            .where(
+                or_(
+                    and_(
+                        URL.original_url_hash.in_(
+                            {url_hash(url) for url in original_urls}
+                        ),
+                        not_expired(),
+                    ),
+                    URL.short_code.in_(short_codes),
+                )
+            )
+            .where(URL.is_deleted == False)  # noqa: E712
+        )
+        result = await self._exec(statement)
+        # Drop hash collisions
+        normalized = {normalize_url(url) for url in original_urls}
+        taken = set(short_codes)
+        return [
+            url
+            for url in result.all()
+            if url.short_code in taken or normalize_url(url.original_url) in normalized
+        ]
 
-    def update(self, url: URL) -> URL:
+    async def get_taken_short_codes(self, short_codes: Iterable[str]) -> Set[str]:
+        statement = (
+            select(URL.short_code)
+            .where(URL.short_code.in_(list(short_codes)))
+            .where(URL.is_deleted == False)  # noqa: E712
+        )
+        result = await self._exec(statement)
+        return set(result.all())
+
+    async def create(self, url: URL) -> URL:
+        await self._bump_counters(
+            {TOTAL_URLS: 1, TOTAL_CUSTOM_URLS: 1 if url.is_custom else 0}
+        )
+        recent_writes.mark(url.short_code)
+        return await self._save(url)
+
+    async def create_many(
+        self, rows: List[Dict[str, Any]], batch_size: int = 1000
+    ) -> Dict[str, int]:
+        """
+        Insert rows with multi-row INSERT statements in a single transaction
+        and return the new ids by short code. Rows are split into statements
+        of ``batch_size`` to stay below the drivers' bind parameter limits.
+        """
+        ids = await self._insert_many(rows, batch_size)
+        await self._commit()
+        return ids
+
+    async def _insert_many(
+        self, rows: List[Dict[str, Any]], batch_size: int
+    ) -> Dict[str, int]:
+        # create_many without the commit, so a caller can commit several
+        # sessions only once every insert succeeded
+        ids = {}
+        rows = [
+            {**row, "original_url_hash": url_hash(row["original_url"])} for row in rows
+        ]
+        for start in range(0, len(rows), batch_size):
+            statement = (
+                insert(URL)
+                .values(rows[start : start + batch_size])
+                .returning(URL.id, URL.short_code)
+            )
+            result = await self._exec(statement)
+            ids.update({short_code: url_id for url_id, short_code in result.all()})
+        for short_code in ids:
+            recent_writes.mark(short_code)
+        await self._bump_counters(
+            {
+                TOTAL_URLS: len(rows),
+                TOTAL_CUSTOM_URLS: sum(1 for row in rows if row["is_custom"]),
+            }
+        )
+        return ids
+
+    async def update(self, url: URL) -> URL:
         url.updated_at = datetime.utcnow()
-        self.db.add(url)
-        self.db.commit()
-        self.db.refresh(url)
-        return url
+        recent_writes.mark(url.short_code)
+        return await self._save(url)
 
-    def delete(self, url: URL) -> URL:
+    async def delete(self, url: URL) -> URL:
+        # Read the click total in SQL: clicks flushed since the row was loaded
+        # are not reflected in url.clicks
+        clicks = select(URL.clicks).where(URL.id == url.id).scalar_subquery()
+        await self._bump_counters(
+            {
+                TOTAL_URLS: -1,
+                TOTAL_CUSTOM_URLS: -1 if url.is_custom else 0,
+                TOTAL_CLICKS: -clicks,
+            }
+        )
         url.is_deleted = True
         url.updated_at = datetime.utcnow()
-        self.db.add(url)
-        self.db.commit()
-        self.db.refresh(url)
-        return url
+        recent_writes.mark(url.short_code)
+        return await self._save(url)
+
+    async def add_clicks(
+        self, deltas: Dict[str, int], batch_size: int = 500
+    ) -> List[URL]:
+        """
+        Apply click increments as one UPDATE ... SET clicks = clicks + n
+        statement per batch of short codes and return the updated rows
+        """
+        updated = await self._apply_clicks(deltas, batch_size)
+        await self._commit()
+        return updated
+
+    async def _apply_clicks(self, deltas: Dict[str, int], batch_size: int) -> List[URL]:
+        # add_clicks without the commit
+        updated = []
+        short_codes = list(deltas)
+        for start in range(0, len(short_codes), batch_size):
+            batch = {
+                code: deltas[code] for code in short_codes[start : start + batch_size]
+            }
+            statement = (
+                update(URL)
+                .where(URL.short_code.in_(batch))
+                .where(URL.is_deleted == False)  # noqa: E712
+                .values(clicks=URL.clicks + case(batch, value=URL.short_code, else_=0))
+                .returning(*URL.__table__.columns)
+                .execution_options(synchronize_session=False)
+            )
+            result = await self._exec(statement)
+            rows = [URL.model_validate(dict(row._mapping)) for row in result.all()]
+            # Clicks on URLs deleted before the flush are dropped
+            applied = sum(batch[url.short_code] for url in rows)
+            await self._bump_counters({TOTAL_CLICKS: applied})
+            updated.extend(rows)
+        return updated
 
-    def exists_by_short_code(self, short_code: str) -> bool:
-        result = self.get_by_short_code(short_code)
+    async def reserve_ids(self, counter_name: str, count: int) -> int:
+        """
+        Atomically reserve ``count`` ids from a named counter and return the
+        first one
+        """
+        statement = (
+            update(ShortCodeCounter)
+            .where(ShortCodeCounter.name == counter_name)
+            .values(next_value=ShortCodeCounter.next_value + count)
+            .returning(ShortCodeCounter.next_value)
+        )
+        while True:
+            next_value = (await self._exec(statement)).scalar()
+            if next_value is not None:
+                await self._commit()
+                return next_value - count
+
+            # First reservation: create the counter, unless another worker
+            # beat us to it, in which case the UPDATE is retried
+            self.db.add(ShortCodeCounter(name=counter_name, next_value=count))
+            try:
+                await self._commit()
+                return 0
+            except IntegrityError:
+                await self.rollback()
+
+    async def exists_by_short_code(self, short_code: str) -> bool:
+        result = await self.get_by_short_code(short_code)
         return result is not None
 
+    async def archive_deleted(self, older_than: datetime, batch_size: int) -> int:
+        """
+        Move up to ``batch_size`` URLs soft-deleted before ``older_than`` into
+        urls_archive in one short transaction and return how many were moved
+        """
+        ids_statement = (
+            select(URL.id)
+            .where(URL.is_deleted == True)  # noqa: E712
+            .where(URL.updated_at < older_than)
+            .order_by(URL.updated_at)
+            .limit(batch_size)
+            # Rows locked by a concurrent compaction run are left to it
+            .with_for_update(skip_locked=True)
+        )
+        ids = list((await self._exec(ids_statement)).all())
+        if not ids:
+            return 0
+
+        columns = [
+            "id",
+            "original_url",
+            "original_url_hash",
+            "short_code",
+            "is_custom",
+            "clicks",
+            "created_at",
+            "updated_at",
+            "redirect_status",
+            "expires_at",
+        ]
+        archived_at = literal(datetime.utcnow(), ArchivedURL.archived_at.type)
+        await self._exec(
+            insert(ArchivedURL).from_select(
+                [*columns, "archived_at"],
+                select(*(URL.__table__.c[name] for name in columns), archived_at).where(
+                    URL.id.in_(ids)
+                ),
+            )
+        )
+        await self._exec(
+            delete(URL)
+            .where(URL.id.in_(ids))
+            .execution_options(synchronize_session=False)
+        )
+        await self._commit()
+        return len(ids)
+
+    async def expire_due(self, now: datetime, batch_size: int) -> List[str]:
+        """
+        Soft-delete up to ``batch_size`` live URLs that expired before ``now``
+        in one short transaction, read in expiry order from the partial
+        ix_urls_live_expires_at index, and return their short codes
+        """
+        rows_statement = (
+            select(URL.id, URL.short_code, URL.is_custom, URL.clicks)
+            .where(URL.is_deleted == False)  # noqa: E712
+            .where(URL.expires_at <= now)
+            .order_by(URL.expires_at)
+            .limit(batch_size)
+            # Rows locked by a concurrent reaper run are left to it
+            .with_for_update(skip_locked=True)
+        )
+        rows = list((await self._exec(rows_statement)).all())
+        if not rows:
+            return []
+
+        # The clicks were read under the row locks, so they include every flush
+        await self._bump_counters(
+            {
+                TOTAL_URLS: -len(rows),
+                TOTAL_CUSTOM_URLS: -sum(1 for row in rows if row.is_custom),
+                TOTAL_CLICKS: -sum(row.clicks for row in rows),
+            }
+        )
+        await self._exec(
+            update(URL)
+            .where(URL.id.in_([row.id for row in rows]))
+            .values(is_deleted=True, updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        await self._commit()
+        short_codes = [row.short_code for row in rows]
+        for short_code in short_codes:
+            recent_writes.mark(short_code)
+        return short_codes
+
     # Analytics methods
 
-    def get_most_clicked(self, limit: int = 10) -> List[URL]:
+    async def get_most_clicked(self, limit: int = 10) -> List[URL]:
         """
-        Get URLs ordered by click count (descending)
+        Get URLs ordered by click count (descending), read in order from the
+        partial ix_urls_live_clicks index
         """
         statement = (
             select(URL)
-            .order_by(URL.clicks.desc())
+            .order_by(URL.clicks.desc(), URL.id.desc())
             .limit(limit)
             .where(URL.is_deleted == False)  # noqa: E712
+            .where(not_expired())
         )
-        result = self.db.exec(statement)
+        result = await self._exec(statement, replica=True)
         return result.all()
 
-    def count_urls(self) -> int:
+    async def count_urls(self, replica: bool = True) -> int:
         """
-        Count total number of URLs
+        Count total number of URLs, including expired ones not reaped yet (as
+        the maintained counters do)
         """
-        statement = select(func.count(URL.id)).where(URL.is_deleted == False)  # noqa: E712
-        result = self.db.exec(statement)
+        statement = select(func.count(URL.id)).where(
+            URL.is_deleted == False
+        )  # noqa: E712
+        result = await self._exec(statement, replica=replica)
         return result.first() or 0
 
-    def count_total_clicks(self) -> int:
+    async def count_total_clicks(self, replica: bool = True) -> int:
         """
         Count total number of clicks across all URLs
         """
-        statement = select(func.sum(URL.clicks)).where(URL.is_deleted == False)  # noqa: E712
-        result = self.db.exec(statement)
+        statement = select(func.sum(URL.clicks)).where(
+            URL.is_deleted == False
+        )  # noqa: E712
+        result = await self._exec(statement, replica=replica)
         return result.first() or 0
 
-    def count_custom_urls(self) -> int:
+    async def count_custom_urls(self, replica: bool = True) -> int:
         """
         Count number of custom URLs
         """
@@ -100,5 +478,79 @@ class URLRepository:
             .where(URL.is_custom == True)
             .where(URL.is_deleted == False)
         )  # noqa: E712
-        result = self.db.exec(statement)
+        result = await self._exec(statement, replica=replica)
         return result.first() or 0
+
+    async def count_expired(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Count the expired URLs the reaper has not deleted yet, their clicks and
+        the custom ones among them, read from the partial
+        ix_urls_live_expires_at index
+        """
+        statement = (
+            select(
+                func.count(URL.id),
+                func.coalesce(func.sum(URL.clicks), 0),
+                func.coalesce(func.sum(case((URL.is_custom == True, 1), else_=0)), 0),
+            )
+            .where(URL.is_deleted == False)  # noqa: E712
+            .where(URL.expires_at <= (now or datetime.utcnow()))
+        )
+        urls, clicks, custom_urls = (await self._exec(statement)).one()
+        return {TOTAL_URLS: urls, TOTAL_CLICKS: clicks, TOTAL_CUSTOM_URLS: custom_urls}
+
+    # Maintained counters
+
+    async def _bump_counters(self, deltas: Dict[str, Any]) -> None:
+        """
+        Add deltas to the maintained analytics counters in the caller's
+        transaction. Counters that were never initialised are left alone;
+        get_counters computes them from scratch on first read.
+        """
+        for name, delta in deltas.items():
+            if isinstance(delta, int) and delta == 0:
+                continue
+            statement = (
+                update(AnalyticsCounter)
+                .where(AnalyticsCounter.name == name)
+                .values(value=AnalyticsCounter.value + delta)
+            )
+            await self._exec(statement)
+
+    async def get_counters(self) -> Dict[str, int]:
+        """
+        Get the maintained analytics counters (a single small-table read)
+        """
+        result = await self._exec(select(AnalyticsCounter))
+        counters = {counter.name: counter.value for counter in result.all()}
+        if any(name not in counters for name in COUNTER_NAMES):
+            return await self.recompute_counters()
+        return counters
+
+    async def recompute_counters(self) -> Dict[str, int]:
+        """
+        Recompute the analytics counters from the urls table, repairing drift
+        """
+        # Expired links are counted until the reaper soft-deletes them, as in
+        # the maintained counters; the summary subtracts count_expired
+        counters = {
+            # Read from the primary: a lagging replica would write stale totals
+            TOTAL_URLS: await self.count_urls(replica=False),
+            TOTAL_CLICKS: await self.count_total_clicks(replica=False),
+            TOTAL_CUSTOM_URLS: await self.count_custom_urls(replica=False),
+        }
+        for name, value in counters.items():
+            statement = (
+                update(AnalyticsCounter)
+                .where(AnalyticsCounter.name == name)
+                .values(value=value)
+            )
+            result = await self._exec(statement)
+            if result.rowcount == 0:
+                self.db.add(AnalyticsCounter(name=name, value=value))
+        try:
+            await self._commit()
+        except IntegrityError:
+            # Another worker initialised the counters concurrently
+            await self.rollback()
+        return counters
@@ -1,10 +1,21 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlmodel import SQLModel
+from sqlalchemy.ext.asyncio import AsyncEngine
 
 from app.controller import redirect_controller
 from app.controller.api import api_router
-from app.database.db import engine
+from app.database import db
+from app.database.read_routing import ReadYourWritesMiddleware
+from app.database.schema import prepare_schema
+from app.services.admission_control import AdmissionControlMiddleware
+from app.services.click_buffer import click_buffer
+from app.services.click_events import click_events
+from app.services.metrics import PrometheusMiddleware, render_metrics
+from app.services.redirect_snapshot import click_forwarder, redirect_snapshot
+from app.services.short_code_filter import short_code_filter
+from app.services.sql_profiler import SQLProfilingMiddleware, sql_profiler
+from app.services.url_compaction import url_compactor
+from app.services.url_expiry import url_reaper
 
 app = FastAPI(
     title="URL Shortener",
@@ -18,7 +29,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-DB-Query-Count", "X-DB-Operations"],
 )
+app.add_middleware(redirect_controller.RedirectFastPathMiddleware, router=app.router)
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(SQLProfilingMiddleware)
+app.add_middleware(AdmissionControlMiddleware)
+app.add_middleware(PrometheusMiddleware)
 
 
 @app.get("/")
@@ -26,9 +43,50 @@ async def root():
     return {"message": "Welcome to the URL Shortener application"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    # Registered before the redirect route, which would otherwise match it
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
 @app.on_event("startup")
-def on_startup():
-    SQLModel.metadata.create_all(engine)
+async def on_startup():
+    if redirect_snapshot.enabled:
+        # Redirect-only node: serves the snapshot without a database
+        redirect_snapshot.start()
+        click_forwarder.start()
+        return
+    await prepare_schema()
+    if sql_profiler.enabled:
+        for engine in (db.engine, db.read_engine):
+            if engine is not None:
+                sql_profiler.instrument(engine)
+        for engine in (db.async_engine, db.async_read_engine):
+            if engine is not None:
+                sql_profiler.instrument(engine.sync_engine)
+        for engine in db.shard_engines:
+            sql_profiler.instrument(
+                engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+            )
+    click_buffer.start()
+    click_events.start()
+    url_compactor.start()
+    url_reaper.start()
+    short_code_filter.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    if redirect_snapshot.enabled:
+        await redirect_snapshot.stop()
+        await click_forwarder.stop()
+        return
+    await click_buffer.stop()
+    await click_events.stop()
+    await url_compactor.stop()
+    await url_reaper.stop()
+    await short_code_filter.stop()
 
 
 # Include controllers
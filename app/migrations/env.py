@@ -25,6 +25,12 @@ database_url = (
 )
 
 
+# Migrate another database, e.g. each shard of SHARD_DATABASE_URLS, with
+# alembic -x database_url=postgresql+psycopg2://... upgrade head
+database_url = context.get_x_argument(as_dictionary=True).get(
+    "database_url", database_url
+)
+
 config.set_main_option("sqlalchemy.url", database_url)
 
 # Interpret the config file for Python logging.
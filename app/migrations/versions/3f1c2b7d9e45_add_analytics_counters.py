@@ -0,0 +1,41 @@
+"""add_analytics_counters
+
+Revision ID: 3f1c2b7d9e45
+Revises: 8d6b977aa00c
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3f1c2b7d9e45"
+down_revision = "8d6b977aa00c"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "analytics_counters",
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("value", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+    # Seed the counters from the current contents of the urls table
+    op.execute("""
+        INSERT INTO analytics_counters (name, value)
+        SELECT 'total_urls', COUNT(*) FROM urls WHERE is_deleted = false
+        UNION ALL
+        SELECT 'total_clicks', COALESCE(SUM(clicks), 0) FROM urls
+        WHERE is_deleted = false
+        UNION ALL
+        SELECT 'total_custom_urls', COUNT(*) FROM urls
+        WHERE is_deleted = false AND is_custom = true
+        """)
+
+
+def downgrade() -> None:
+    op.drop_table("analytics_counters")
@@ -0,0 +1,33 @@
+"""add_live_clicks_index
+
+Revision ID: 5b8e0f3a6c21
+Revises: 3f1c2b7d9e45
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5b8e0f3a6c21"
+down_revision = "3f1c2b7d9e45"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Lets ORDER BY clicks DESC, id DESC LIMIT n read the top rows in index
+    # order instead of sorting every live row
+    op.create_index(
+        "ix_urls_live_clicks",
+        "urls",
+        ["clicks", "id"],
+        unique=False,
+        postgresql_where=sa.text("is_deleted = false"),
+        sqlite_where=sa.text("is_deleted = false"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_urls_live_clicks", table_name="urls")
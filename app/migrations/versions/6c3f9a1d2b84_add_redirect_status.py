@@ -0,0 +1,30 @@
+"""add_redirect_status
+
+Revision ID: 6c3f9a1d2b84
+Revises: a2d5c8e1f047
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "6c3f9a1d2b84"
+down_revision = "a2d5c8e1f047"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Nullable without a default: existing links keep following the global
+    # REDIRECT_STATUS_CODE and the column is added without a table rewrite
+    op.add_column("urls", sa.Column("redirect_status", sa.Integer(), nullable=True))
+    op.add_column(
+        "urls_archive", sa.Column("redirect_status", sa.Integer(), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("urls_archive", "redirect_status")
+    op.drop_column("urls", "redirect_status")
@@ -0,0 +1,30 @@
+"""add_short_code_counters
+
+Revision ID: 8d6b977aa00c
+Revises: 98f76ab254e2
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "8d6b977aa00c"
+down_revision = "98f76ab254e2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Counters hand out id ranges that are base62-encoded into short codes
+    op.create_table(
+        "short_code_counters",
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("next_value", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("short_code_counters")
@@ -0,0 +1,85 @@
+"""add_live_partial_indexes_and_archive
+
+Revision ID: a2d5c8e1f047
+Revises: e7a90c4d1f36
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "a2d5c8e1f047"
+down_revision = "e7a90c4d1f36"
+branch_labels = None
+depends_on = None
+
+LIVE = sa.text("is_deleted = false")
+DELETED = sa.text("is_deleted = true")
+
+
+def upgrade() -> None:
+    # Every lookup filters on is_deleted = false, so index only the live rows
+    # and drop the full-table indexes (including the low-selectivity one on
+    # is_deleted itself)
+    op.create_index(
+        "ix_urls_live_short_code",
+        "urls",
+        ["short_code"],
+        unique=True,
+        postgresql_where=LIVE,
+        sqlite_where=LIVE,
+    )
+    op.create_index(
+        "ix_urls_live_original_url_hash",
+        "urls",
+        ["original_url_hash"],
+        unique=False,
+        postgresql_where=LIVE,
+        sqlite_where=LIVE,
+    )
+    op.create_index(
+        "ix_urls_deleted_updated_at",
+        "urls",
+        ["updated_at"],
+        unique=False,
+        postgresql_where=DELETED,
+        sqlite_where=DELETED,
+    )
+    op.drop_index(op.f("ix_urls_short_code"), table_name="urls")
+    op.drop_index(op.f("ix_urls_original_url_hash"), table_name="urls")
+    op.drop_index(op.f("ix_urls_is_deleted"), table_name="urls")
+
+    op.create_table(
+        "urls_archive",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("original_url", sa.String(), nullable=False),
+        sa.Column("original_url_hash", sa.BigInteger(), nullable=True),
+        sa.Column("short_code", sa.String(), nullable=False),
+        sa.Column("is_custom", sa.Boolean(), nullable=False),
+        sa.Column("clicks", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.Column("archived_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_urls_archive_short_code"), "urls_archive", ["short_code"], unique=False
+    )
+
+
+def downgrade() -> None:
+    # Archived rows are not moved back; restoring the global unique index
+    # fails if a deleted short code has been reused by a live row
+    op.drop_index(op.f("ix_urls_archive_short_code"), table_name="urls_archive")
+    op.drop_table("urls_archive")
+
+    op.create_index(op.f("ix_urls_is_deleted"), "urls", ["is_deleted"], unique=False)
+    op.create_index(
+        op.f("ix_urls_original_url_hash"), "urls", ["original_url_hash"], unique=False
+    )
+    op.create_index(op.f("ix_urls_short_code"), "urls", ["short_code"], unique=True)
+    op.drop_index("ix_urls_deleted_updated_at", table_name="urls")
+    op.drop_index("ix_urls_live_original_url_hash", table_name="urls")
+    op.drop_index("ix_urls_live_short_code", table_name="urls")
@@ -0,0 +1,40 @@
+"""add_url_expiry
+
+Revision ID: b7e4d2a91c53
+Revises: 6c3f9a1d2b84
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b7e4d2a91c53"
+down_revision = "6c3f9a1d2b84"
+branch_labels = None
+depends_on = None
+
+LIVE_EXPIRING = sa.text("is_deleted = false AND expires_at IS NOT NULL")
+
+
+def upgrade() -> None:
+    # Nullable without a default: existing links never expire and the column
+    # is added without a table rewrite
+    op.add_column("urls", sa.Column("expires_at", sa.DateTime(), nullable=True))
+    op.add_column("urls_archive", sa.Column("expires_at", sa.DateTime(), nullable=True))
+    # The reaper's batches read the live expiring links in expiry order
+    op.create_index(
+        "ix_urls_live_expires_at",
+        "urls",
+        ["expires_at"],
+        unique=False,
+        postgresql_where=LIVE_EXPIRING,
+        sqlite_where=LIVE_EXPIRING,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_urls_live_expires_at", table_name="urls")
+    op.drop_column("urls_archive", "expires_at")
+    op.drop_column("urls", "expires_at")
@@ -0,0 +1,52 @@
+"""add_click_events_and_rollups
+
+Revision ID: c41d7e2a9b10
+Revises: 5b8e0f3a6c21
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c41d7e2a9b10"
+down_revision = "5b8e0f3a6c21"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "click_events",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("short_code", sa.String(), nullable=False),
+        sa.Column("occurred_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_click_events_short_code"), "click_events", ["short_code"], unique=False
+    )
+    op.create_index(
+        op.f("ix_click_events_occurred_at"),
+        "click_events",
+        ["occurred_at"],
+        unique=False,
+    )
+
+    for table_name in ("click_rollups_hourly", "click_rollups_daily"):
+        op.create_table(
+            table_name,
+            sa.Column("short_code", sa.String(), nullable=False),
+            sa.Column("bucket_start", sa.DateTime(), nullable=False),
+            sa.Column("clicks", sa.BigInteger(), nullable=False, server_default="0"),
+            sa.PrimaryKeyConstraint("short_code", "bucket_start"),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("click_rollups_daily")
+    op.drop_table("click_rollups_hourly")
+    op.drop_index(op.f("ix_click_events_occurred_at"), table_name="click_events")
+    op.drop_index(op.f("ix_click_events_short_code"), table_name="click_events")
+    op.drop_table("click_events")
@@ -0,0 +1,28 @@
+"""add_click_event_clicks
+
+Revision ID: d58c3e7f1a26
+Revises: b7e4d2a91c53
+Create Date: 2026-10-18 23:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "d58c3e7f1a26"
+down_revision = "b7e4d2a91c53"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing rows are single clicks
+    op.add_column(
+        "click_events",
+        sa.Column("clicks", sa.Integer(), nullable=False, server_default="1"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("click_events", "clicks")
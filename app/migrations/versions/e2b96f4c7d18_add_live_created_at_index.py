@@ -0,0 +1,34 @@
+"""add_live_created_at_index
+
+Revision ID: e2b96f4c7d18
+Revises: d58c3e7f1a26
+Create Date: 2026-10-18 23:30:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e2b96f4c7d18"
+down_revision = "d58c3e7f1a26"
+branch_labels = None
+depends_on = None
+
+LIVE = sa.text("is_deleted = false")
+
+
+def upgrade() -> None:
+    # The short code filter reads the codes created in the last few seconds
+    op.create_index(
+        "ix_urls_live_created_at",
+        "urls",
+        ["created_at"],
+        unique=False,
+        postgresql_where=LIVE,
+        sqlite_where=LIVE,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_urls_live_created_at", table_name="urls")
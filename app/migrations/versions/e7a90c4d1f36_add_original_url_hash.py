@@ -0,0 +1,72 @@
+"""add_original_url_hash
+
+Revision ID: e7a90c4d1f36
+Revises: c41d7e2a9b10
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+from app.database.url_hash import url_hash
+
+# revision identifiers, used by Alembic.
+revision = "e7a90c4d1f36"
+down_revision = "c41d7e2a9b10"
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 10000
+
+
+def upgrade() -> None:
+    op.add_column(
+        "urls", sa.Column("original_url_hash", sa.BigInteger(), nullable=True)
+    )
+
+    # Backfill outside the migration transaction, committing every batch, so
+    # a large table is never locked for the whole run
+    urls = sa.table(
+        "urls",
+        sa.column("id", sa.Integer()),
+        sa.column("original_url", sa.String()),
+        sa.column("original_url_hash", sa.BigInteger()),
+    )
+    with op.get_context().autocommit_block():
+        connection = op.get_bind()
+        last_id = 0
+        while True:
+            rows = connection.execute(
+                sa.select(urls.c.id, urls.c.original_url)
+                .where(urls.c.id > last_id)
+                .where(urls.c.original_url_hash.is_(None))
+                .order_by(urls.c.id)
+                .limit(BACKFILL_BATCH_SIZE)
+            ).all()
+            if not rows:
+                break
+            connection.execute(
+                urls.update()
+                .where(urls.c.id == sa.bindparam("row_id"))
+                .values(original_url_hash=sa.bindparam("row_hash")),
+                [
+                    {"row_id": row_id, "row_hash": url_hash(original_url)}
+                    for row_id, original_url in rows
+                ],
+            )
+            last_id = rows[-1][0]
+
+    op.create_index(
+        op.f("ix_urls_original_url_hash"), "urls", ["original_url_hash"], unique=False
+    )
+    # The hash index replaces the B-tree on the full URL text
+    op.drop_index(op.f("ix_urls_original_url"), table_name="urls")
+
+
+def downgrade() -> None:
+    op.create_index(
+        op.f("ix_urls_original_url"), "urls", ["original_url"], unique=False
+    )
+    op.drop_index(op.f("ix_urls_original_url_hash"), table_name="urls")
+    op.drop_column("urls", "original_url_hash")
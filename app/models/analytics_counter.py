@@ -0,0 +1,17 @@
+from sqlalchemy import BigInteger
+from sqlmodel import Field, SQLModel
+
+TOTAL_URLS = "total_urls"
+TOTAL_CLICKS = "total_clicks"
+TOTAL_CUSTOM_URLS = "total_custom_urls"
+
+COUNTER_NAMES = (TOTAL_URLS, TOTAL_CLICKS, TOTAL_CUSTOM_URLS)
+
+
+class AnalyticsCounter(SQLModel, table=True):
+    """Running total kept up to date by the writes that change it"""
+
+    __tablename__ = "analytics_counters"
+
+    name: str = Field(primary_key=True)
+    value: int = Field(default=0, sa_type=BigInteger)
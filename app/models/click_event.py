@@ -0,0 +1,60 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pydantic import PositiveInt
+from sqlalchemy import BigInteger
+from sqlmodel import Field, SQLModel
+
+
+class ClickEvent(SQLModel, table=True):
+    """
+    Raw redirect clicks, kept for the retention window only. Forwarded counts
+    are stored as one event with the number of clicks.
+    """
+
+    __tablename__ = "click_events"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    short_code: str = Field(index=True)
+    occurred_at: datetime = Field(index=True)
+    clicks: int = Field(default=1)
+
+
+class ClickRollupHourly(SQLModel, table=True):
+    """Clicks per short code and hour"""
+
+    __tablename__ = "click_rollups_hourly"
+
+    short_code: str = Field(primary_key=True)
+    bucket_start: datetime = Field(primary_key=True)
+    clicks: int = Field(default=0, sa_type=BigInteger)
+
+
+class ClickRollupDaily(SQLModel, table=True):
+    """Clicks per short code and day"""
+
+    __tablename__ = "click_rollups_daily"
+
+    short_code: str = Field(primary_key=True)
+    bucket_start: datetime = Field(primary_key=True)
+    clicks: int = Field(default=0, sa_type=BigInteger)
+
+
+# DTOs
+class ClickTimeseriesPoint(SQLModel):
+    bucket_start: datetime
+    clicks: int
+
+
+class ClickTimeseries(SQLModel):
+    short_code: str
+    granularity: str
+    start: datetime
+    end: datetime
+    points: List[ClickTimeseriesPoint]
+
+
+class ClickCounts(SQLModel):
+    """Clicks per short code, as forwarded by redirect-only nodes"""
+
+    clicks: Dict[str, PositiveInt]
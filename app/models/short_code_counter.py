@@ -0,0 +1,11 @@
+from sqlalchemy import BigInteger
+from sqlmodel import Field, SQLModel
+
+
+class ShortCodeCounter(SQLModel, table=True):
+    """Named counter that hands out ranges of ids for short code generation"""
+
+    __tablename__ = "short_code_counters"
+
+    name: str = Field(primary_key=True)
+    next_value: int = Field(default=0, sa_type=BigInteger)
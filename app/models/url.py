@@ -1,7 +1,8 @@
-from datetime import datetime
-from typing import Optional
+from datetime import datetime, timezone
+from typing import Literal, Optional
 
-from pydantic import HttpUrl
+from pydantic import HttpUrl, field_validator
+from sqlalchemy import BigInteger, Index, text
 from sqlmodel import Field, SQLModel
 
 
@@ -9,25 +10,125 @@ class URL(SQLModel, table=True):
     """URL model for database"""
 
     __tablename__ = "urls"
+    __table_args__ = (
+        # Lookups only ever read live rows, so the short code and URL hash
+        # indexes leave soft-deleted rows out. A short code is unique among
+        # live rows and becomes reusable once its row is deleted.
+        Index(
+            "ix_urls_live_short_code",
+            "short_code",
+            unique=True,
+            postgresql_where=text("is_deleted = false"),
+            sqlite_where=text("is_deleted = false"),
+        ),
+        Index(
+            "ix_urls_live_original_url_hash",
+            "original_url_hash",
+            postgresql_where=text("is_deleted = false"),
+            sqlite_where=text("is_deleted = false"),
+        ),
+        # Finds the deleted rows due for archiving
+        Index(
+            "ix_urls_deleted_updated_at",
+            "updated_at",
+            postgresql_where=text("is_deleted = true"),
+            sqlite_where=text("is_deleted = true"),
+        ),
+        # Serves the most-clicked ranking without sorting the table
+        Index(
+            "ix_urls_live_clicks",
+            "clicks",
+            "id",
+            postgresql_where=text("is_deleted = false"),
+            sqlite_where=text("is_deleted = false"),
+        ),
+        # Serves the short code filter's catch-up reads of recent rows
+        Index(
+            "ix_urls_live_created_at",
+            "created_at",
+            postgresql_where=text("is_deleted = false"),
+            sqlite_where=text("is_deleted = false"),
+        ),
+        # Finds the live links due for expiry; links that never expire are
+        # left out
+        Index(
+            "ix_urls_live_expires_at",
+            "expires_at",
+            postgresql_where=text("is_deleted = false AND expires_at IS NOT NULL"),
+            sqlite_where=text("is_deleted = false AND expires_at IS NOT NULL"),
+        ),
+    )
 
     id: int = Field(default=None, primary_key=True)
-    original_url: str = Field(index=True)
-    short_code: str = Field(unique=True, index=True)
+    original_url: str
+    original_url_hash: Optional[int] = Field(default=None, sa_type=BigInteger)
+    short_code: str
     is_custom: bool = Field(default=False)
     clicks: int = Field(default=0)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: Optional[datetime] = Field(default=None)
     is_deleted: bool = Field(default=False)
+    # HTTP status of the redirect; None follows REDIRECT_STATUS_CODE
+    redirect_status: Optional[int] = Field(default=None)
+    # Redirects answer 410 from then on; None never expires
+    expires_at: Optional[datetime] = Field(default=None)
+
+
+class ArchivedURL(SQLModel, table=True):
+    """Soft-deleted URL moved out of the urls table by the compaction job"""
+
+    __tablename__ = "urls_archive"
+
+    id: int = Field(primary_key=True, sa_column_kwargs={"autoincrement": False})
+    original_url: str
+    original_url_hash: Optional[int] = Field(default=None, sa_type=BigInteger)
+    short_code: str = Field(index=True)
+    is_custom: bool = Field(default=False)
+    clicks: int = Field(default=0)
+    created_at: datetime
+    updated_at: Optional[datetime] = Field(default=None)
+    redirect_status: Optional[int] = Field(default=None)
+    expires_at: Optional[datetime] = Field(default=None)
+    archived_at: datetime = Field(default_factory=datetime.utcnow)
 
 
 # DTOs
+RedirectStatus = Literal[301, 302, 307]
+
+
+def _as_naive_utc(moment: Optional[datetime]) -> Optional[datetime]:
+    # Stored like every other timestamp; naive input is taken as UTC
+    if moment is not None and moment.tzinfo is not None:
+        return moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
 class URLCreate(SQLModel):
     original_url: HttpUrl
     custom_alias: Optional[str] = None
+    redirect_status: Optional[RedirectStatus] = None
+    expires_at: Optional[datetime] = None
+
+    @field_validator("expires_at")
+    @classmethod
+    def _expires_in_the_future(cls, expires_at: Optional[datetime]):
+        expires_at = _as_naive_utc(expires_at)
+        if expires_at is not None and expires_at <= datetime.utcnow():
+            raise ValueError("expires_at must be in the future")
+        return expires_at
 
 
 class URLUpdate(SQLModel):
     original_url: Optional[HttpUrl] = None
+    # Set to null to go back to the default status
+    redirect_status: Optional[RedirectStatus] = None
+    # Set to null for a link that never expires; a past time expires it now
+    expires_at: Optional[datetime] = None
+
+    @field_validator("expires_at")
+    @classmethod
+    def _expires_at_utc(cls, expires_at: Optional[datetime]):
+        return _as_naive_utc(expires_at)
 
 
 class URLResponse(SQLModel):
@@ -39,3 +140,12 @@ class URLResponse(SQLModel):
     clicks: int
     created_at: datetime
     updated_at: Optional[datetime] = None
+    redirect_status: Optional[int] = None
+    expires_at: Optional[datetime] = None
+
+
+class URLBatchResult(SQLModel):
+    index: int
+    status: str
+    url: Optional[URLResponse] = None
+    detail: Optional[str] = None
@@ -0,0 +1,371 @@
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional, Tuple
+
+from app.services.metrics import (
+    ADMISSION_IN_FLIGHT,
+    ADMISSION_QUEUE_WAIT,
+    ADMISSION_QUEUED,
+    ADMISSION_REJECTED,
+)
+
+# Route classes in admission order: redirects are admitted before the other
+# API calls, which are admitted before listings and analytics
+ROUTE_CLASS_PRIORITIES = {
+    "redirect": 0,
+    "urls": 1,
+    "shorten": 1,
+    "listing": 2,
+    "analytics": 2,
+}
+# Static per-worker limits, not adapted to load: size them to the connection
+# pool before enabling admission control. The other classes together stay
+# below the global limit of 32, so half of the slots are always left to
+# redirects
+DEFAULT_ROUTE_LIMITS = "redirect=32,urls=8,shorten=4,listing=2,analytics=2"
+
+ADMISSION_CONTROL_ENABLED = (
+    os.getenv("ADMISSION_CONTROL_ENABLED", "false").lower() == "true"
+)
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "32"))
+ADMISSION_ROUTE_LIMITS = os.getenv("ADMISSION_ROUTE_LIMITS", DEFAULT_ROUTE_LIMITS)
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "1.0"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+# Off by default: behind a proxy every client shares the proxy's bucket unless
+# RATE_LIMIT_CLIENT_HEADER is set
+SHORTEN_RATE_LIMIT = float(os.getenv("SHORTEN_RATE_LIMIT", "0"))
+SHORTEN_RATE_BURST = int(os.getenv("SHORTEN_RATE_BURST", "20"))
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "10000"))
+RATE_LIMIT_CLIENT_HEADER = os.getenv("RATE_LIMIT_CLIENT_HEADER", "").lower()
+
+# Paths that stay reachable under load: monitoring and documentation
+UNLIMITED_PATHS = {"/", "/metrics", "/docs", "/docs/oauth2-redirect", "/redoc"}
+UNLIMITED_PREFIXES = ("/api/metrics", "/openapi.json")
+
+OVERLOADED_BODY = b'{"detail":"Service overloaded, retry later"}'
+RATE_LIMITED_BODY = b'{"detail":"Rate limit exceeded, retry later"}'
+
+
+def parse_route_limits(value: str) -> Dict[str, int]:
+    """Read ``class=limit`` pairs over the default limits"""
+    limits: Dict[str, int] = {}
+    for pair in DEFAULT_ROUTE_LIMITS.split(","):
+        name, _, limit = pair.partition("=")
+        limits[name] = int(limit)
+    for pair in filter(None, (pair.strip() for pair in value.split(","))):
+        name, _, limit = pair.partition("=")
+        name = name.strip()
+        if name not in ROUTE_CLASS_PRIORITIES or not limit.strip().isdigit():
+            raise ValueError(
+                f"ADMISSION_ROUTE_LIMITS entries must be <class>=<limit> with a "
+                f"class in {tuple(ROUTE_CLASS_PRIORITIES)}, got {pair!r}"
+            )
+        limits[name] = int(limit)
+    return limits
+
+
+ROUTE_LIMITS = parse_route_limits(ADMISSION_ROUTE_LIMITS)
+if ADMISSION_CONTROL_ENABLED and (
+    sum(limit for name, limit in ROUTE_LIMITS.items() if name != "redirect")
+    >= ADMISSION_MAX_CONCURRENCY
+):
+    raise ValueError(
+        "The ADMISSION_ROUTE_LIMITS of the classes other than redirect must add "
+        "up to less than ADMISSION_MAX_CONCURRENCY, leaving slots for redirects"
+    )
+
+
+def classify(method: str, path: str) -> Optional[str]:
+    """Route class of a request, or None for requests that are not limited"""
+    if path in UNLIMITED_PATHS or path.startswith(UNLIMITED_PREFIXES):
+        return None
+    if path.startswith("/api/urls"):
+        rest = path[len("/api/urls") :]
+        if rest in ("", "/"):
+            return "listing" if method == "GET" else "urls"
+        if rest.startswith("/shorten"):
+            return "shorten" if method == "POST" else "urls"
+        return "urls"
+    if path.startswith("/api/analytics"):
+        return "analytics"
+    if path.count("/") == 1:
+        return "redirect"
+    return None
+
+
+class RouteClass:
+    """Concurrency limit, in-flight count and wait queue of one route class"""
+
+    def __init__(self, name: str, priority: int, limit: int):
+        self.name = name
+        self.priority = priority
+        self.limit = limit
+        self.active = 0
+        self.queue: Deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.queue_full = 0
+        self.timeouts = 0
+
+
+class AdmissionController:
+    """
+    Per-worker admission control in front of the database pool.
+
+    Each route class has a concurrency limit, and all classes together share
+    ``max_concurrency``. Requests over a limit wait in a bounded queue of their
+    class; freed slots go to the waiting requests of the highest priority
+    class first, so redirects keep flowing while listings and analytics queue
+    up. Requests that find the queue full, or are still waiting after
+    ``queue_timeout`` seconds, are rejected at once instead of piling onto
+    the pool.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = ADMISSION_CONTROL_ENABLED,
+        max_concurrency: int = ADMISSION_MAX_CONCURRENCY,
+        route_limits: Optional[Dict[str, int]] = None,
+        max_queue: int = ADMISSION_MAX_QUEUE,
+        queue_timeout: float = ADMISSION_QUEUE_TIMEOUT,
+        retry_after: int = ADMISSION_RETRY_AFTER,
+    ):
+        self.enabled = enabled
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        limits = {**ROUTE_LIMITS, **(route_limits or {})}
+        self._classes = {
+            name: RouteClass(name, priority, limits[name])
+            for name, priority in ROUTE_CLASS_PRIORITIES.items()
+        }
+        self._by_priority = sorted(
+            self._classes.values(), key=lambda route_class: route_class.priority
+        )
+        self.active = 0
+
+    def _has_capacity(self, route_class: RouteClass) -> bool:
+        return (
+            self.active < self.max_concurrency
+            and route_class.active < route_class.limit
+        )
+
+    def _waiters_ahead(self, route_class: RouteClass) -> bool:
+        # Waiting requests that a free slot would go to before this one
+        return any(
+            other.queue and other.active < other.limit
+            for other in self._by_priority
+            if other.priority <= route_class.priority
+        )
+
+    def _admit(self, route_class: RouteClass) -> None:
+        self.active += 1
+        route_class.active += 1
+        route_class.admitted += 1
+        ADMISSION_IN_FLIGHT.labels(route_class.name).inc()
+
+    def _wake(self) -> None:
+        for route_class in self._by_priority:
+            while route_class.queue and self._has_capacity(route_class):
+                self._admit(route_class)
+                route_class.queue.popleft().set_result(None)
+
+    async def acquire(self, name: str) -> Optional[str]:
+        """
+        Wait for a slot of the route class. Returns None once admitted, or the
+        reason (``queue_full`` or ``timeout``) the request was rejected for.
+        """
+        route_class = self._classes[name]
+        if self._has_capacity(route_class) and not self._waiters_ahead(route_class):
+            self._admit(route_class)
+            return None
+        if len(route_class.queue) >= self.max_queue:
+            route_class.queue_full += 1
+            ADMISSION_REJECTED.labels(name, "queue_full").inc()
+            return "queue_full"
+
+        future = asyncio.get_running_loop().create_future()
+        route_class.queue.append(future)
+        ADMISSION_QUEUED.labels(name).inc()
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+            return None
+        except asyncio.TimeoutError:
+            if future.done():
+                # Admitted just as the wait timed out
+                return None
+            route_class.queue.remove(future)
+            route_class.timeouts += 1
+            ADMISSION_REJECTED.labels(name, "timeout").inc()
+            return "timeout"
+        except asyncio.CancelledError:
+            # The client went away; hand over a slot it was already given
+            if future.done():
+                self.release(name)
+            else:
+                route_class.queue.remove(future)
+            raise
+        finally:
+            ADMISSION_QUEUED.labels(name).dec()
+            ADMISSION_QUEUE_WAIT.labels(name).observe(time.perf_counter() - start)
+
+    def release(self, name: str) -> None:
+        route_class = self._classes[name]
+        self.active -= 1
+        route_class.active -= 1
+        ADMISSION_IN_FLIGHT.labels(name).dec()
+        self._wake()
+
+    def clear(self) -> None:
+        """Reset the counters; requests in flight keep their slots"""
+        for route_class in self._classes.values():
+            route_class.admitted = 0
+            route_class.queue_full = 0
+            route_class.timeouts = 0
+
+    def stats(self) -> Dict[str, int]:
+        stats = {"active": self.active, "max_concurrency": self.max_concurrency}
+        for name, route_class in self._classes.items():
+            stats[f"{name}_active"] = route_class.active
+            stats[f"{name}_limit"] = route_class.limit
+            stats[f"{name}_queued"] = len(route_class.queue)
+            stats[f"{name}_admitted"] = route_class.admitted
+            stats[f"{name}_rejected_queue_full"] = route_class.queue_full
+            stats[f"{name}_rejected_timeout"] = route_class.timeouts
+        return stats
+
+
+class TokenBucketLimiter:
+    """
+    Per-client token buckets of ``burst`` tokens refilled at ``rate`` tokens
+    per second, kept for the ``max_clients`` most recently seen clients.
+    Forgetting a client only gives it a full bucket again.
+    """
+
+    def __init__(
+        self,
+        rate: float = SHORTEN_RATE_LIMIT,
+        burst: int = SHORTEN_RATE_BURST,
+        max_clients: int = RATE_LIMIT_MAX_CLIENTS,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self.allowed = 0
+        self.limited = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def acquire(self, client: str) -> float:
+        """Take a token; returns 0, or the seconds until the client has one"""
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(client, (float(self.burst), now))
+        tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+        if tokens >= 1:
+            tokens -= 1
+            wait = 0.0
+            self.allowed += 1
+        else:
+            wait = (1 - tokens) / self.rate
+            self.limited += 1
+        self._buckets[client] = (tokens, now)
+        while len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self) -> None:
+        self._buckets.clear()
+        self.allowed = 0
+        self.limited = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "clients": len(self._buckets),
+            "allowed": self.allowed,
+            "limited": self.limited,
+        }
+
+
+def _client_key(scope) -> str:
+    if RATE_LIMIT_CLIENT_HEADER:
+        header = RATE_LIMIT_CLIENT_HEADER.encode()
+        for name, value in scope["headers"]:
+            if name == header:
+                # First address of X-Forwarded-For style lists
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else ""
+
+
+async def _reject(send, status: int, retry_after: float, body: bytes) -> None:
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-length", str(len(body)).encode()),
+                (b"content-type", b"application/json"),
+                (b"retry-after", str(max(math.ceil(retry_after), 1)).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionControlMiddleware:
+    """
+    Pure ASGI middleware applying admission control before a request reaches
+    the redirect fast path, routing or a database session:
+
+    - ``POST /api/urls/shorten*`` first takes a token from the client's
+      bucket, or gets 429
+    - every limited request then waits for a slot of its route class, or
+      gets 503 when its queue is full or the wait times out
+
+    Both responses carry ``Retry-After``. Monitoring and documentation paths
+    are never limited.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (
+            admission_controller.enabled or shorten_rate_limiter.enabled
+        ):
+            await self.app(scope, receive, send)
+            return
+        name = classify(scope["method"], scope["path"])
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        if name == "shorten" and shorten_rate_limiter.enabled:
+            wait = shorten_rate_limiter.acquire(_client_key(scope))
+            if wait:
+                ADMISSION_REJECTED.labels(name, "rate_limited").inc()
+                await _reject(send, 429, wait, RATE_LIMITED_BODY)
+                return
+
+        if not admission_controller.enabled:
+            await self.app(scope, receive, send)
+            return
+        if await admission_controller.acquire(name) is not None:
+            await _reject(send, 503, admission_controller.retry_after, OVERLOADED_BODY)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission_controller.release(name)
+
+
+admission_controller = AdmissionController()
+shorten_rate_limiter = TokenBucketLimiter()
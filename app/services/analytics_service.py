@@ -1,38 +1,171 @@
-import asyncio
-from typing import Dict, List
+import hmac
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
 
-from fastapi import Depends, Request
+from fastapi import Depends, HTTPException, Request, status
 
+from app.database.click_event_repository import (
+    ClickEventRepository,
+    day_bucket,
+    hour_bucket,
+)
+from app.database.sharded_url_repository import get_url_repository
 from app.database.url_repository import URLRepository
-from app.models.url import URLResponse
-from app.services.url_service import URLService
+from app.models.analytics_counter import COUNTER_NAMES, TOTAL_CLICKS
+from app.models.click_event import (
+    ClickCounts,
+    ClickRollupDaily,
+    ClickRollupHourly,
+    ClickTimeseries,
+    ClickTimeseriesPoint,
+)
+from app.services.click_buffer import click_buffer
+from app.services.click_events import click_events
+from app.services.leaderboard import leaderboard
+from app.services.redirect_snapshot import (
+    FORWARDED_CLICKS_MAX_AMOUNT,
+    FORWARDED_CLICKS_MAX_CODES,
+    REDIRECT_SNAPSHOT_CLICKS_TOKEN,
+)
+from app.services.url_service import url_payload
+
+TIMESERIES_MAX_POINTS = 10000
+
+# granularity -> (rollup table, bucket function, bucket width, default range)
+TIMESERIES_GRANULARITIES = {
+    "hour": (ClickRollupHourly, hour_bucket, timedelta(hours=1), timedelta(days=7)),
+    "day": (ClickRollupDaily, day_bucket, timedelta(days=1), timedelta(days=30)),
+}
 
 
 class AnalyticsService:
     def __init__(
         self,
-        url_repository: URLRepository = Depends(),
-        url_service: URLService = Depends(),
+        url_repository: URLRepository = Depends(get_url_repository),
+        click_event_repository: ClickEventRepository = Depends(),
     ):
         self.url_repository = url_repository
-        self.url_service = url_service
+        self.click_event_repository = click_event_repository
+        self.click_buffer = click_buffer
+        self.click_events = click_events
+        self.leaderboard = leaderboard
 
     async def get_most_clicked_urls(
-        self, request: Request, limit: int = 10
-    ) -> List[URLResponse]:
-        urls = self.url_repository.get_most_clicked(limit=limit)
+        self, request: Request, limit: int = 10, include_pending: bool = False
+    ) -> List[Dict[str, Any]]:
+        urls = self.leaderboard.top(limit)
+        if urls is None:
+            capacity = self.leaderboard.capacity
+            urls = await self.url_repository.get_most_clicked(
+                limit=max(limit, capacity)
+            )
+            self.leaderboard.load(urls[:capacity], exhaustive=len(urls) < capacity)
+            urls = urls[:limit]
         base_url = str(request.base_url)
-        return await asyncio.gather(
-            *[self.url_service._create_url_response(url, base_url) for url in urls]
+        responses = [url_payload(url, base_url) for url in urls]
+
+        if include_pending:
+            for response in responses:
+                response["clicks"] += self.click_buffer.pending(response["short_code"])
+            responses.sort(key=lambda response: response["clicks"], reverse=True)
+
+        return responses
+
+    async def get_analytics_summary(
+        self, include_pending: bool = False
+    ) -> Dict[str, int]:
+        # The counters include expired links until the reaper deletes them
+        # (and decrements the counters); read them first so a reaper run in
+        # between can only overcount briefly
+        counters = await self.url_repository.get_counters()
+        expired = await self.url_repository.count_expired()
+        summary = {name: counters[name] - expired[name] for name in COUNTER_NAMES}
+
+        if include_pending:
+            summary[TOTAL_CLICKS] += self.click_buffer.pending_total()
+
+        return summary
+
+    async def recompute_counters(self) -> Dict[str, int]:
+        counters = await self.url_repository.recompute_counters()
+        return {name: counters[name] for name in COUNTER_NAMES}
+
+    async def record_clicks(self, counts: ClickCounts, token: Optional[str]) -> int:
+        """
+        Add clicks served elsewhere (redirect-only nodes) to the click buffer
+        and the click events, as if they had been redirected here. Clicks on
+        short codes that do not exist are dropped.
+        """
+        expected = REDIRECT_SNAPSHOT_CLICKS_TOKEN
+        if expected is None or not hmac.compare_digest(
+            (token or "").encode(), expected.encode()
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Invalid clicks token",
+            )
+        if len(counts.clicks) > FORWARDED_CLICKS_MAX_CODES or any(
+            amount > FORWARDED_CLICKS_MAX_AMOUNT for amount in counts.clicks.values()
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"At most {FORWARDED_CLICKS_MAX_CODES} short codes and "
+                f"{FORWARDED_CLICKS_MAX_AMOUNT} clicks per short code",
+            )
+
+        recorded = 0
+        live = await self.url_repository.get_taken_short_codes(counts.clicks)
+        for short_code in live:
+            amount = counts.clicks[short_code]
+            self.click_buffer.record(short_code, amount)
+            self.click_events.record(short_code, clicks=amount)
+            recorded += amount
+        return recorded
+
+    async def get_click_timeseries(
+        self,
+        short_code: str,
+        granularity: str = "hour",
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> ClickTimeseries:
+        """
+        Clicks per hour or day for one short code, read from the rollups only.
+        Buckets without clicks are returned with zero clicks.
+        """
+        rollup, bucket, width, default_range = TIMESERIES_GRANULARITIES[granularity]
+        end = bucket(self._as_utc(end) or datetime.utcnow()) + width
+        start = bucket(self._as_utc(start) or end - default_range)
+
+        if start >= end or (end - start) / width > TIMESERIES_MAX_POINTS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Range must cover between 1 and {TIMESERIES_MAX_POINTS} buckets",
+            )
+
+        clicks = dict(
+            await self.click_event_repository.get_rollup(rollup, short_code, start, end)
         )
+        points = []
+        bucket_start = start
+        while bucket_start < end:
+            points.append(
+                ClickTimeseriesPoint(
+                    bucket_start=bucket_start, clicks=clicks.get(bucket_start, 0)
+                )
+            )
+            bucket_start += width
 
-    async def get_analytics_summary(self) -> Dict[str, int]:
-        total_urls = self.url_repository.count_urls()
-        total_clicks = self.url_repository.count_total_clicks()
-        total_custom_urls = self.url_repository.count_custom_urls()
+        return ClickTimeseries(
+            short_code=short_code,
+            granularity=granularity,
+            start=start,
+            end=end,
+            points=points,
+        )
 
-        return {
-            "total_urls": total_urls,
-            "total_clicks": total_clicks,
-            "total_custom_urls": total_custom_urls,
-        }
+    def _as_utc(self, moment: Optional[datetime]) -> Optional[datetime]:
+        # Rollups are stored as naive UTC, like every other timestamp
+        if moment is not None and moment.tzinfo is not None:
+            return moment.astimezone(timezone.utc).replace(tzinfo=None)
+        return moment
@@ -0,0 +1,113 @@
+import os
+import time
+from typing import Dict, List, Optional
+
+from app.database.sharded_url_repository import url_repository_scope
+from app.database.url_repository import URLRepository
+from app.models.url import URL
+from app.services.leaderboard import leaderboard
+from app.services.periodic import PeriodicJob
+
+CLICK_FLUSH_INTERVAL = float(os.getenv("CLICK_FLUSH_INTERVAL", "1.0"))
+CLICK_MAX_STALENESS = float(os.getenv("CLICK_MAX_STALENESS", "5.0"))
+CLICK_MAX_PENDING = int(os.getenv("CLICK_MAX_PENDING", "10000"))
+
+
+class ClickBuffer:
+    """
+    Write-behind accumulator for redirect clicks.
+
+    Increments are aggregated per short_code in memory and written as one
+    batched UPDATE, either by the periodic flush task or by the request that
+    notices the oldest pending click is older than ``max_staleness``.
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = CLICK_FLUSH_INTERVAL,
+        max_staleness: float = CLICK_MAX_STALENESS,
+        max_pending: int = CLICK_MAX_PENDING,
+    ):
+        self.flush_interval = flush_interval
+        self.max_staleness = max_staleness
+        self.max_pending = max_pending
+        self._pending: Dict[str, int] = {}
+        self._oldest: Optional[float] = None
+        self._job = PeriodicJob(self.flush, "flush click counts")
+        self.flushes = 0
+        self.flushed_clicks = 0
+        self.failed_flushes = 0
+
+    def record(self, short_code: str, amount: int = 1) -> None:
+        if self._oldest is None:
+            self._oldest = time.monotonic()
+        self._pending[short_code] = self._pending.get(short_code, 0) + amount
+
+    def pending(self, short_code: str) -> int:
+        return self._pending.get(short_code, 0)
+
+    def pending_total(self) -> int:
+        return sum(self._pending.values())
+
+    def is_flush_due(self) -> bool:
+        if self._oldest is None:
+            return False
+        return (
+            len(self._pending) >= self.max_pending
+            or time.monotonic() - self._oldest >= self.max_staleness
+        )
+
+    async def flush(self, url_repository: Optional[URLRepository] = None) -> int:
+        """
+        Write all pending increments and return the number of clicks flushed
+        """
+        if not self._pending:
+            return 0
+
+        # Swap the buffer before touching the DB so clicks recorded while the
+        # flush is in progress land in the next batch.
+        deltas, self._pending, self._oldest = self._pending, {}, None
+        try:
+            updated = await self._write(deltas, url_repository)
+        except Exception:
+            self.failed_flushes += 1
+            for short_code, amount in deltas.items():
+                self.record(short_code, amount)
+            raise
+
+        leaderboard.record_clicks(updated)
+        flushed = sum(deltas.values())
+        self.flushes += 1
+        self.flushed_clicks += flushed
+        return flushed
+
+    async def _write(
+        self, deltas: Dict[str, int], url_repository: Optional[URLRepository]
+    ) -> List[URL]:
+        if url_repository is not None:
+            return await url_repository.add_clicks(deltas)
+        async with url_repository_scope() as repository:
+            return await repository.add_clicks(deltas)
+
+    def start(self) -> None:
+        self._job.start(self.flush_interval)
+
+    async def stop(self) -> None:
+        await self._job.stop()
+        await self.flush()
+
+    def clear(self) -> None:
+        self._pending, self._oldest = {}, None
+        self.flushes = self.flushed_clicks = self.failed_flushes = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending_urls": len(self._pending),
+            "pending_clicks": self.pending_total(),
+            "flushes": self.flushes,
+            "flushed_clicks": self.flushed_clicks,
+            "failed_flushes": self.failed_flushes,
+        }
+
+
+click_buffer = ClickBuffer()
@@ -0,0 +1,124 @@
+import os
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Deque, Dict, Optional, Tuple
+
+from app.database import db
+from app.database.click_event_repository import ClickEventRepository
+from app.services.periodic import PeriodicJob
+
+CLICK_EVENTS_ENABLED = os.getenv("CLICK_EVENTS_ENABLED", "true").lower() == "true"
+CLICK_EVENT_FLUSH_INTERVAL = float(os.getenv("CLICK_EVENT_FLUSH_INTERVAL", "2.0"))
+CLICK_EVENT_BATCH_SIZE = int(os.getenv("CLICK_EVENT_BATCH_SIZE", "5000"))
+CLICK_EVENT_QUEUE_SIZE = int(os.getenv("CLICK_EVENT_QUEUE_SIZE", "100000"))
+CLICK_EVENT_RETENTION_DAYS = float(os.getenv("CLICK_EVENT_RETENTION_DAYS", "7"))
+CLICK_EVENT_PRUNE_INTERVAL = float(os.getenv("CLICK_EVENT_PRUNE_INTERVAL", "3600"))
+
+
+class ClickEventQueue:
+    """
+    In-process queue of click events, ingested in batches off the redirect path.
+
+    Each batch is stored as raw events and added to the hourly and daily
+    rollups. Raw events older than the retention window are pruned
+    periodically; the rollups are kept.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = CLICK_EVENTS_ENABLED,
+        flush_interval: float = CLICK_EVENT_FLUSH_INTERVAL,
+        batch_size: int = CLICK_EVENT_BATCH_SIZE,
+        max_size: int = CLICK_EVENT_QUEUE_SIZE,
+        retention_days: float = CLICK_EVENT_RETENTION_DAYS,
+        prune_interval: float = CLICK_EVENT_PRUNE_INTERVAL,
+    ):
+        self.enabled = enabled
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_size = max_size
+        self.retention_days = retention_days
+        self.prune_interval = prune_interval
+        self._events: Deque[Tuple[str, datetime, int]] = deque()
+        self._job = PeriodicJob(self._ingest, "ingest click events")
+        self._last_prune = time.monotonic()
+        self.ingested = 0
+        self.dropped = 0
+        self.pruned = 0
+
+    def record(
+        self,
+        short_code: str,
+        occurred_at: Optional[datetime] = None,
+        clicks: int = 1,
+    ) -> None:
+        """Queue ``clicks`` clicks on a short code as a single event"""
+        if not self.enabled:
+            return
+        if len(self._events) >= self.max_size:
+            # Shed events rather than grow without bound when ingestion lags
+            self.dropped += 1
+            return
+        self._events.append((short_code, occurred_at or datetime.utcnow(), clicks))
+
+    async def flush(self, repository: Optional[ClickEventRepository] = None) -> int:
+        """
+        Ingest all queued events in batches and return how many were stored
+        """
+        ingested = 0
+        while self._events:
+            count = min(self.batch_size, len(self._events))
+            batch = [self._events.popleft() for _ in range(count)]
+            try:
+                if repository is not None:
+                    await repository.ingest(batch)
+                else:
+                    async with db.session_scope() as session:
+                        await ClickEventRepository(session).ingest(batch)
+            except Exception:
+                self._events.extendleft(reversed(batch))
+                raise
+            ingested += count
+        self.ingested += ingested
+        return ingested
+
+    async def prune(self, repository: Optional[ClickEventRepository] = None) -> int:
+        """Delete raw events older than the retention window"""
+        cutoff = datetime.utcnow() - timedelta(days=self.retention_days)
+        if repository is not None:
+            pruned = await repository.prune_events(cutoff)
+        else:
+            async with db.session_scope() as session:
+                pruned = await ClickEventRepository(session).prune_events(cutoff)
+        self._last_prune = time.monotonic()
+        self.pruned += pruned
+        return pruned
+
+    async def _ingest(self) -> None:
+        await self.flush()
+        if time.monotonic() - self._last_prune >= self.prune_interval:
+            await self.prune()
+
+    def start(self) -> None:
+        if self.enabled:
+            self._job.start(self.flush_interval)
+
+    async def stop(self) -> None:
+        await self._job.stop()
+        await self.flush()
+
+    def clear(self) -> None:
+        self._events.clear()
+        self.ingested = self.dropped = self.pruned = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": len(self._events),
+            "ingested": self.ingested,
+            "dropped": self.dropped,
+            "pruned": self.pruned,
+        }
+
+
+click_events = ClickEventQueue()
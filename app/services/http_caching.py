@@ -0,0 +1,116 @@
+import hashlib
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, Mapping, NamedTuple, Optional
+
+from app.models.url import URLResponse
+
+REDIRECT_STATUS_CODES = (301, 302, 307)
+REDIRECT_STATUS_CODE = int(os.getenv("REDIRECT_STATUS_CODE", "307"))
+REDIRECT_CACHE_MAX_AGE = int(os.getenv("REDIRECT_CACHE_MAX_AGE", "0"))
+REDIRECT_TRACK_CLICKS = os.getenv("REDIRECT_TRACK_CLICKS", "true").lower() == "true"
+
+if REDIRECT_STATUS_CODE not in REDIRECT_STATUS_CODES:
+    raise ValueError(
+        f"REDIRECT_STATUS_CODE must be one of {REDIRECT_STATUS_CODES}, "
+        f"got {REDIRECT_STATUS_CODE}"
+    )
+
+# URL reads may be stored but must be revalidated with the validators below
+URL_CACHE_CONTROL = "no-cache"
+
+
+class RedirectTarget(NamedTuple):
+    """What a redirect cache entry holds for one short code"""
+
+    original_url: str
+    status_code: int
+    # Expiry of the link as a Unix timestamp; None never expires
+    expires_at: Optional[float] = None
+
+    def is_expired(self, now: Optional[float] = None) -> bool:
+        if self.expires_at is None:
+            return False
+        return self.expires_at <= (time.time() if now is None else now)
+
+
+def expiry_timestamp(expires_at: Optional[datetime]) -> Optional[float]:
+    """Unix timestamp of a stored (naive UTC) expiry"""
+    if expires_at is None:
+        return None
+    return expires_at.replace(tzinfo=timezone.utc).timestamp()
+
+
+def redirect_target(
+    original_url: str,
+    redirect_status: Optional[int],
+    expires_at: Optional[datetime] = None,
+) -> RedirectTarget:
+    return RedirectTarget(
+        original_url,
+        redirect_status or REDIRECT_STATUS_CODE,
+        expiry_timestamp(expires_at),
+    )
+
+
+def redirect_cache_control(
+    max_age: int = REDIRECT_CACHE_MAX_AGE, track_clicks: bool = REDIRECT_TRACK_CLICKS
+) -> str:
+    """
+    Cache-Control of redirect responses.
+
+    A redirect served from a cache never reaches the service, so its click is
+    not counted. With click tracking on, only the visitor's browser may reuse
+    a redirect (each visitor is then counted once per ``max_age``); CDNs and
+    other shared caches may only store it when tracking is off. Without a
+    max-age redirects are not stored at all, which also stops browsers from
+    caching a 301 indefinitely.
+    """
+    if max_age <= 0:
+        return "private, no-store"
+    scope = "private" if track_clicks else "public"
+    return f"{scope}, max-age={max_age}"
+
+
+REDIRECT_CACHE_CONTROL = redirect_cache_control()
+
+
+def url_validators(url: URLResponse) -> Dict[str, str]:
+    """
+    ETag and Cache-Control headers of a URL read.
+
+    Click flushes do not touch updated_at, so the ETag also covers the click
+    count. There is no timestamp of the last click, so no Last-Modified is
+    sent: one derived from updated_at would let If-Modified-Since revalidate
+    a body with a stale click count.
+    """
+    # Full precision: two updates within one second still change the ETag
+    modified = url.updated_at or url.created_at
+    version = f"{url.id}:{modified.isoformat()}:{url.clicks}"
+    digest = hashlib.blake2b(version.encode(), digest_size=8).hexdigest()
+    return {
+        # Weak: the body also depends on the host the short URL is built for
+        "ETag": f'W/"{digest}"',
+        "Cache-Control": URL_CACHE_CONTROL,
+    }
+
+
+def is_not_modified(headers: Mapping[str, str], url: URLResponse) -> bool:
+    """
+    Whether a conditional GET can be answered with 304 Not Modified.
+
+    Only If-None-Match is evaluated; If-Modified-Since is ignored as no
+    Last-Modified is sent (RFC 9110 13.1.3), so it always gets the full body.
+    """
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/ prefixes are ignored on both sides
+    etag = url_validators(url)["ETag"].removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(",")
+    )
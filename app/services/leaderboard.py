@@ -0,0 +1,124 @@
+import os
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from app.models.url import URL
+
+LEADERBOARD_SIZE = int(os.getenv("LEADERBOARD_SIZE", "100"))
+LEADERBOARD_REFRESH_INTERVAL = float(os.getenv("LEADERBOARD_REFRESH_INTERVAL", "30"))
+
+
+class Leaderboard:
+    """
+    In-process top-N of the most clicked live URLs.
+
+    The entries are always the exact top ``len(entries)`` URLs as seen by this
+    process: click totals only grow, so a URL can only enter by overtaking the
+    current minimum, which the click flush reports through UPDATE ... RETURNING.
+    Deleting a URL, or reading it after it expired, removes it and shrinks the
+    board until the next reload.
+    Clicks flushed and URLs deleted by other workers become visible when the
+    board is reloaded from the database, at most every ``refresh_interval``.
+    """
+
+    def __init__(
+        self,
+        capacity: int = LEADERBOARD_SIZE,
+        refresh_interval: float = LEADERBOARD_REFRESH_INTERVAL,
+    ):
+        self.capacity = capacity
+        self.refresh_interval = refresh_interval
+        self._entries: Dict[str, URL] = {}
+        # True when the board holds every live URL, so any URL may enter
+        self._exhaustive = False
+        self._loaded_at: Optional[float] = None
+        self.reads = 0
+        self.reloads = 0
+
+    def top(self, limit: int) -> Optional[List[URL]]:
+        """
+        Get the top ``limit`` URLs, or None when the board cannot answer and
+        must be reloaded from the database
+        """
+        now = datetime.utcnow()
+        for short_code, url in list(self._entries.items()):
+            if url.expires_at is not None and url.expires_at <= now:
+                del self._entries[short_code]
+        if (
+            self._loaded_at is None
+            or time.monotonic() - self._loaded_at >= self.refresh_interval
+            or (limit > len(self._entries) and not self._exhaustive)
+        ):
+            return None
+
+        self.reads += 1
+        ranked = sorted(
+            self._entries.values(), key=lambda url: (url.clicks, url.id), reverse=True
+        )
+        return ranked[:limit]
+
+    def load(self, urls: List[URL], exhaustive: bool) -> None:
+        """Replace the board with the top URLs read from the database"""
+        self._entries = {url.short_code: self._snapshot(url) for url in urls}
+        self._exhaustive = exhaustive
+        self._loaded_at = time.monotonic()
+        self.reloads += 1
+
+    def record_clicks(self, urls: Iterable[URL]) -> None:
+        """Apply the new click totals returned by a click flush"""
+        for url in urls:
+            entry = self._entries.get(url.short_code)
+            if entry is not None:
+                entry.clicks = url.clicks
+            elif self._loaded_at is not None and self._qualifies(url):
+                self._entries[url.short_code] = self._snapshot(url)
+        self._trim()
+
+    def add(self, url: URL) -> None:
+        """Track a newly created URL when the board holds every live URL"""
+        if self._loaded_at is not None and self._exhaustive:
+            self._entries[url.short_code] = self._snapshot(url)
+            self._trim()
+
+    def update(self, url: URL) -> None:
+        if url.short_code in self._entries:
+            self._entries[url.short_code] = self._snapshot(url)
+
+    def discard(self, short_code: str) -> None:
+        self._entries.pop(short_code, None)
+
+    def clear(self) -> None:
+        self._entries = {}
+        self._exhaustive = False
+        self._loaded_at = None
+        self.reads = self.reloads = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "capacity": self.capacity,
+            "reads": self.reads,
+            "reloads": self.reloads,
+        }
+
+    def _qualifies(self, url: URL) -> bool:
+        if self._exhaustive or not self._entries:
+            return self._exhaustive
+        lowest = min(self._entries.values(), key=lambda entry: (entry.clicks, entry.id))
+        return (url.clicks, url.id) > (lowest.clicks, lowest.id)
+
+    def _trim(self) -> None:
+        while len(self._entries) > self.capacity:
+            lowest = min(
+                self._entries.values(), key=lambda entry: (entry.clicks, entry.id)
+            )
+            del self._entries[lowest.short_code]
+            self._exhaustive = False
+
+    def _snapshot(self, url: URL) -> URL:
+        # Detached copy, so entries never refer to a closed session
+        return URL.model_validate(url.model_dump())
+
+
+leaderboard = Leaderboard()
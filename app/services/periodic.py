@@ -0,0 +1,144 @@
+import argparse
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.database.sharded_url_repository import url_repository_scope
+from app.database.url_repository import URLRepository
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicJob:
+    """
+    Background loop of one worker calling ``job`` every ``interval`` seconds.
+
+    Failures are logged and the loop carries on; ``run_first`` runs the job
+    once right away instead of after the first interval.
+    """
+
+    def __init__(
+        self,
+        job: Callable[[], Awaitable[Any]],
+        description: str,
+        run_first: bool = False,
+    ):
+        self.job = job
+        self.description = description
+        self.run_first = run_first
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self, interval: float) -> None:
+        if not self.run_first:
+            await asyncio.sleep(interval)
+        while True:
+            try:
+                await self.job()
+            except Exception:
+                logger.exception("Failed to %s", self.description)
+            await asyncio.sleep(interval)
+
+    def start(self, interval: float) -> None:
+        if interval > 0 and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run(interval))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+class BatchJob:
+    """
+    Periodic maintenance over the urls table in bounded batches.
+
+    ``batch`` processes at most ``batch_size`` rows in its own short
+    transaction and returns how many it processed; the run started at the
+    given time ends with the first batch that is not full. Batches are
+    separated by ``batch_pause`` seconds so a large backlog never holds many
+    row locks at once.
+    """
+
+    def __init__(
+        self,
+        batch: Callable[[URLRepository, datetime], Awaitable[int]],
+        description: str,
+        processed_name: str,
+        enabled: bool,
+        interval: float,
+        batch_size: int,
+        batch_pause: float,
+    ):
+        self.batch = batch
+        self.processed_name = processed_name
+        self.enabled = enabled
+        self.interval = interval
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self._job = PeriodicJob(self.run, description)
+        self.runs = 0
+        self.batches = 0
+        self.processed = 0
+
+    async def run(
+        self,
+        repository: Optional[URLRepository] = None,
+        max_batches: Optional[int] = None,
+    ) -> int:
+        """
+        Process every due row (or at most ``max_batches`` batches of them) and
+        return how many were processed
+        """
+        started = datetime.utcnow()
+        processed = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            if repository is not None:
+                count = await self.batch(repository, started)
+            else:
+                async with url_repository_scope() as scoped_repository:
+                    count = await self.batch(scoped_repository, started)
+            if count == 0:
+                break
+            processed += count
+            batches += 1
+            self.batches += 1
+            self.processed += count
+            if count < self.batch_size:
+                break
+            await asyncio.sleep(self.batch_pause)
+        self.runs += 1
+        return processed
+
+    def start(self) -> None:
+        if self.enabled:
+            self._job.start(self.interval)
+
+    async def stop(self) -> None:
+        await self._job.stop()
+
+    def clear(self) -> None:
+        self.runs = self.batches = self.processed = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "runs": self.runs,
+            "batches": self.batches,
+            self.processed_name: self.processed,
+        }
+
+
+def batch_job_arguments(
+    description: str, batch_size: int, batch_pause: float
+) -> argparse.ArgumentParser:
+    """Command line of a one-off batch job run, e.g. from cron"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--batch-size", type=int, default=batch_size)
+    parser.add_argument("--batch-pause", type=float, default=batch_pause)
+    parser.add_argument("--max-batches", type=int, default=None)
+    return parser
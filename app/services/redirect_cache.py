@@ -0,0 +1,131 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from app.services.http_caching import RedirectTarget
+
+REDIRECT_CACHE_SIZE = int(os.getenv("REDIRECT_CACHE_SIZE", "10000"))
+REDIRECT_CACHE_TTL = float(os.getenv("REDIRECT_CACHE_TTL", "300"))
+REDIRECT_SHARED_CACHE = os.getenv("REDIRECT_SHARED_CACHE", "false").lower() == "true"
+
+
+class RedirectCache:
+    """
+    Bounded LRU/TTL cache of short_code -> redirect target (URL and status).
+
+    Concurrent misses on the same short code are coalesced so that only one
+    loader call (and therefore one DB query) is in flight per key.
+    """
+
+    def __init__(
+        self, max_size: int = REDIRECT_CACHE_SIZE, ttl: float = REDIRECT_CACHE_TTL
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[RedirectTarget, float]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.coalesced = 0
+
+    def get(self, short_code: str) -> Optional[RedirectTarget]:
+        entry = self._entries.get(short_code)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        target, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[short_code]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(short_code)
+        self.hits += 1
+        return target
+
+    def set(self, short_code: str, target: RedirectTarget) -> None:
+        if self.max_size <= 0:
+            return
+        self._entries[short_code] = (target, time.monotonic() + self.ttl)
+        self._entries.move_to_end(short_code)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def generation(self) -> int:
+        """Counter bumped by every invalidation"""
+        return self._generation
+
+    def invalidate(self, short_code: str) -> None:
+        # Bumping the generation stops an in-flight load from re-populating
+        # the entry with the value it read before the write.
+        self._generation += 1
+        self.invalidations += 1
+        self._entries.pop(short_code, None)
+
+    async def get_or_load(
+        self,
+        short_code: str,
+        loader: Callable[[], Awaitable[Optional[RedirectTarget]]],
+    ) -> Optional[RedirectTarget]:
+        target = self.get(short_code)
+        if target is not None:
+            return target
+
+        inflight = self._inflight.get(short_code)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[short_code] = future
+        generation = self.generation()
+        try:
+            target = await loader()
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Mark the exception as retrieved when nobody else was waiting
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(short_code, None)
+
+        if target is not None and generation == self.generation():
+            self.set(short_code, target)
+        future.set_result(target)
+        return target
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._generation += 1
+        self.hits = self.misses = self.evictions = 0
+        self.expirations = self.invalidations = self.coalesced = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "coalesced": self.coalesced,
+        }
+
+
+if REDIRECT_SHARED_CACHE:
+    # Imported here: the shared cache subclasses RedirectCache
+    from app.services.shared_redirect_cache import SharedRedirectCache
+
+    redirect_cache: RedirectCache = SharedRedirectCache()
+else:
+    redirect_cache = RedirectCache()
@@ -0,0 +1,408 @@
+import argparse
+import asyncio
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import orjson
+
+from app.database.sharded_url_repository import url_repository_scope
+from app.database.url_repository import URLRepository
+from app.models.url import URL
+from app.services.click_buffer import ClickBuffer
+from app.services.periodic import PeriodicJob
+from app.services.http_caching import (
+    RedirectTarget,
+    expiry_timestamp,
+    redirect_target,
+)
+
+REDIRECT_SNAPSHOT_PATH = os.getenv("REDIRECT_SNAPSHOT_PATH") or None
+REDIRECT_SNAPSHOT_RELOAD_INTERVAL = float(
+    os.getenv("REDIRECT_SNAPSHOT_RELOAD_INTERVAL", "5.0")
+)
+REDIRECT_SNAPSHOT_CLICKS_URL = os.getenv("REDIRECT_SNAPSHOT_CLICKS_URL") or None
+REDIRECT_SNAPSHOT_CLICKS_TIMEOUT = float(
+    os.getenv("REDIRECT_SNAPSHOT_CLICKS_TIMEOUT", "5.0")
+)
+# Shared secret of the clicks endpoint: forwarded clicks are refused unless
+# both sides set the same value
+REDIRECT_SNAPSHOT_CLICKS_TOKEN = os.getenv("REDIRECT_SNAPSHOT_CLICKS_TOKEN") or None
+CLICKS_TOKEN_HEADER = "X-Clicks-Token"
+# Bounds of one forwarded batch; larger counts are split over several posts
+FORWARDED_CLICKS_MAX_CODES = int(os.getenv("FORWARDED_CLICKS_MAX_CODES", "10000"))
+FORWARDED_CLICKS_MAX_AMOUNT = int(os.getenv("FORWARDED_CLICKS_MAX_AMOUNT", "100000"))
+SNAPSHOT_EXPORT_BATCH_SIZE = 10000
+
+logger = logging.getLogger(__name__)
+
+# File layout, all integers little-endian:
+#   header    magic, format version, entry count, export time, highest URL id
+#   fan-out   256 cumulative entry counts by the first byte of the short code
+#   index     one fixed-size entry per short code, sorted by short code bytes
+#   data      short code bytes immediately followed by original URL bytes
+SNAPSHOT_MAGIC = b"URLSNAP\x00"
+SNAPSHOT_VERSION = 2
+HEADER = struct.Struct("<8sIIdQ")
+FAN_OUT = struct.Struct("<256I")
+FAN_OUT_COUNT = struct.Struct("<I")
+# data offset, URL length, short code length, redirect status (0 = default),
+# link expiry as a Unix timestamp (0 = never)
+ENTRY = struct.Struct("<QIHHd")
+INDEX_OFFSET = HEADER.size + FAN_OUT.size
+
+
+def write_snapshot(
+    path: str,
+    redirects: Iterable[Tuple[str, str, Optional[int], Optional[float]]],
+    max_url_id: int = 0,
+) -> int:
+    """
+    Write (short_code, original_url, redirect_status, expires_at) entries to
+    a snapshot file and return the number of entries. ``expires_at`` is a
+    Unix timestamp or None.
+
+    The file is written next to ``path`` and renamed over it, so readers
+    always see either the previous or the new snapshot in full.
+    """
+    entries = sorted(
+        (
+            short_code.encode(),
+            original_url.encode(),
+            redirect_status or 0,
+            expires_at or 0.0,
+        )
+        for short_code, original_url, redirect_status, expires_at in redirects
+    )
+    fan_out = [0] * 256
+    for key, _, _, _ in entries:
+        fan_out[key[0]] += 1
+    for byte in range(1, 256):
+        fan_out[byte] += fan_out[byte - 1]
+
+    index = bytearray()
+    offset = INDEX_OFFSET + len(entries) * ENTRY.size
+    for key, original_url, redirect_status, expires_at in entries:
+        index += ENTRY.pack(
+            offset, len(original_url), len(key), redirect_status, expires_at
+        )
+        offset += len(key) + len(original_url)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as output:
+            output.write(
+                HEADER.pack(
+                    SNAPSHOT_MAGIC,
+                    SNAPSHOT_VERSION,
+                    len(entries),
+                    time.time(),
+                    max_url_id,
+                )
+            )
+            output.write(FAN_OUT.pack(*fan_out))
+            output.write(index)
+            for key, original_url, _, _ in entries:
+                output.write(key)
+                output.write(original_url)
+            output.flush()
+            os.fsync(output.fileno())
+        os.chmod(temporary_path, 0o644)
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+    return len(entries)
+
+
+class RedirectSnapshot:
+    """
+    Read-only view of a snapshot file.
+
+    The file is memory-mapped, so opening it costs the same for any number of
+    entries and worker processes share its pages through the OS page cache.
+    Lookups binary-search the sorted index within the range the fan-out table
+    gives for the code's first byte; no per-entry Python objects are kept.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, count, generated_at, max_url_id = HEADER.unpack_from(
+                self._mmap
+            )
+        except struct.error:
+            magic, version, count = None, None, 0
+        if (
+            magic != SNAPSHOT_MAGIC
+            or version != SNAPSHOT_VERSION
+            or len(self._mmap) < INDEX_OFFSET + count * ENTRY.size
+        ):
+            self._mmap.close()
+            raise ValueError(
+                f"Not a version {SNAPSHOT_VERSION} redirect snapshot: {path}"
+            )
+        self.count = count
+        self.generated_at = generated_at
+        self.max_url_id = max_url_id
+
+    def __len__(self) -> int:
+        return self.count
+
+    def lookup(self, short_code: str) -> Optional[RedirectTarget]:
+        key = short_code.encode()
+        if not key:
+            return None
+        data = self._mmap
+        first = key[0]
+        low = (
+            FAN_OUT_COUNT.unpack_from(data, HEADER.size + (first - 1) * 4)[0]
+            if first
+            else 0
+        )
+        high = FAN_OUT_COUNT.unpack_from(data, HEADER.size + first * 4)[0]
+        while low < high:
+            middle = (low + high) // 2
+            offset, url_length, key_length, redirect_status, expires_at = (
+                ENTRY.unpack_from(data, INDEX_OFFSET + middle * ENTRY.size)
+            )
+            probe = data[offset : offset + key_length]
+            if probe < key:
+                low = middle + 1
+            elif probe > key:
+                high = middle
+            else:
+                start = offset + key_length
+                original_url = data[start : start + url_length].decode()
+                return redirect_target(original_url, redirect_status)._replace(
+                    expires_at=expires_at or None
+                )
+        return None
+
+    def close(self) -> None:
+        self._mmap.close()
+
+
+class RedirectSnapshotStore:
+    """
+    The snapshot a redirect-only node serves from.
+
+    The file is checked every ``reload_interval`` seconds; when it has been
+    replaced, the new snapshot is opened and swapped in with a single
+    reference assignment. Lookups are synchronous, so no request can be
+    reading the previous snapshot when it is closed.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = REDIRECT_SNAPSHOT_PATH,
+        reload_interval: float = REDIRECT_SNAPSHOT_RELOAD_INTERVAL,
+    ):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._snapshot: Optional[RedirectSnapshot] = None
+        self._file_version: Optional[Tuple[int, int, int]] = None
+        self._job = PeriodicJob(self._reload, "reload the redirect snapshot")
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.failed_reloads = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def load(self) -> bool:
+        """Open the snapshot file if it changed; return whether it was swapped"""
+        stat = os.stat(self.path)
+        file_version = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if file_version == self._file_version:
+            return False
+        snapshot = RedirectSnapshot(self.path)
+        previous, self._snapshot = self._snapshot, snapshot
+        self._file_version = file_version
+        if previous is not None:
+            previous.close()
+        self.reloads += 1
+        logger.info("Loaded redirect snapshot of %d URLs", len(snapshot))
+        return True
+
+    def lookup(self, short_code: str) -> Optional[RedirectTarget]:
+        snapshot = self._snapshot
+        target = snapshot.lookup(short_code) if snapshot is not None else None
+        if target is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return target
+
+    async def _reload(self) -> None:
+        try:
+            self.load()
+        except Exception:
+            self.failed_reloads += 1
+            raise
+
+    def start(self) -> None:
+        # The first load raises: a node without a readable snapshot cannot serve
+        self.load()
+        self._job.start(self.reload_interval)
+
+    async def stop(self) -> None:
+        await self._job.stop()
+
+    def clear(self) -> None:
+        if self._snapshot is not None:
+            self._snapshot.close()
+        self._snapshot, self._file_version = None, None
+        self.hits = self.misses = self.reloads = self.failed_reloads = 0
+
+    def stats(self) -> Dict[str, float]:
+        snapshot = self._snapshot
+        loaded = snapshot is not None
+        return {
+            "entries": len(snapshot) if loaded else 0,
+            "max_url_id": snapshot.max_url_id if loaded else 0,
+            "age_seconds": time.time() - snapshot.generated_at if loaded else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "reloads": self.reloads,
+            "failed_reloads": self.failed_reloads,
+        }
+
+
+class ClickForwarder(ClickBuffer):
+    """
+    Click buffer of a redirect-only node: each flush posts the aggregated
+    counts to the clicks endpoint of a service with database access instead
+    of writing them. Failed posts are kept for the next flush.
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = REDIRECT_SNAPSHOT_CLICKS_URL,
+        timeout: float = REDIRECT_SNAPSHOT_CLICKS_TIMEOUT,
+        token: Optional[str] = REDIRECT_SNAPSHOT_CLICKS_TOKEN,
+        max_codes: int = FORWARDED_CLICKS_MAX_CODES,
+        max_amount: int = FORWARDED_CLICKS_MAX_AMOUNT,
+    ):
+        super().__init__()
+        self.url = url
+        self.timeout = timeout
+        self.token = token
+        self.max_codes = max_codes
+        self.max_amount = max_amount
+
+    def record(self, short_code: str, amount: int = 1) -> None:
+        # Without an endpoint to forward to, clicks are not counted
+        if self.url is not None:
+            super().record(short_code, amount)
+
+    def batches(self, deltas: Dict[str, int]) -> List[Dict[str, int]]:
+        """
+        Split the counts into batches within the endpoint's bounds on short
+        codes and clicks per short code
+        """
+        batches: List[Dict[str, int]] = []
+        batch: Dict[str, int] = {}
+        for short_code, amount in deltas.items():
+            while amount > 0:
+                if short_code in batch or len(batch) >= self.max_codes:
+                    batches.append(batch)
+                    batch = {}
+                batch[short_code] = min(amount, self.max_amount)
+                amount -= batch[short_code]
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _post(self, deltas: Dict[str, int]) -> None:
+        # Only redirect-only nodes forward clicks: not imported on startup
+        import urllib.request
+
+        headers = {"Content-Type": "application/json"}
+        if self.token is not None:
+            headers[CLICKS_TOKEN_HEADER] = self.token
+        request = urllib.request.Request(
+            self.url,
+            data=orjson.dumps({"clicks": deltas}),
+            headers=headers,
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+    async def _write(
+        self, deltas: Dict[str, int], url_repository: Optional[URLRepository]
+    ) -> List[URL]:
+        # Off the event loop: redirects keep being served while posting
+        batches = self.batches(deltas)
+        for index, batch in enumerate(batches):
+            try:
+                await asyncio.to_thread(self._post, batch)
+            except Exception:
+                # The flush keeps what is left in deltas for the next one:
+                # only the batches that were not posted
+                deltas.clear()
+                for unposted in batches[index:]:
+                    for short_code, amount in unposted.items():
+                        deltas[short_code] = deltas.get(short_code, 0) + amount
+                raise
+        return []
+
+
+async def export_snapshot(
+    path: str,
+    url_repository: Optional[URLRepository] = None,
+    batch_size: int = SNAPSHOT_EXPORT_BATCH_SIZE,
+) -> int:
+    """
+    Write every live URL, including the expired ones the reaper has not
+    deleted yet (they are answered with 410), to a snapshot file and return
+    the number of URLs
+    """
+    if url_repository is None:
+        async with url_repository_scope() as repository:
+            return await export_snapshot(path, repository, batch_size)
+
+    redirects: List[Tuple[str, str, Optional[int], Optional[float]]] = []
+    after_id = 0
+    while True:
+        rows = await url_repository.get_redirects(after_id, batch_size)
+        redirects.extend(
+            (short_code, original_url, redirect_status, expiry_timestamp(expires_at))
+            for _, short_code, original_url, redirect_status, expires_at in rows
+        )
+        if rows:
+            after_id = rows[-1][0]
+        if len(rows) < batch_size:
+            break
+    return write_snapshot(path, redirects, max_url_id=after_id)
+
+
+redirect_snapshot = RedirectSnapshotStore()
+click_forwarder = ClickForwarder()
+
+
+if __name__ == "__main__":
+    # python -m app.services.redirect_snapshot --output /srv/redirects.snapshot
+    parser = argparse.ArgumentParser(
+        description="Export the live URLs to a redirect snapshot file"
+    )
+    parser.add_argument(
+        "--output",
+        default=REDIRECT_SNAPSHOT_PATH or "redirects.snapshot",
+        help="snapshot file to replace (default: REDIRECT_SNAPSHOT_PATH)",
+    )
+    parser.add_argument("--batch-size", type=int, default=SNAPSHOT_EXPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    exported = asyncio.run(export_snapshot(args.output, batch_size=args.batch_size))
+    print(f"Exported {exported} URLs to {args.output}")
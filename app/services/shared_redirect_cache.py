@@ -0,0 +1,286 @@
+import fcntl
+import os
+import struct
+import tempfile
+import time
+import zlib
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, Iterator, Optional
+
+from app.services.http_caching import RedirectTarget
+from app.services.redirect_cache import REDIRECT_CACHE_TTL, RedirectCache
+
+REDIRECT_SHARED_CACHE_NAME = os.getenv(
+    "REDIRECT_SHARED_CACHE_NAME", "url_shortener_redirects"
+)
+REDIRECT_SHARED_CACHE_SLOTS = int(os.getenv("REDIRECT_SHARED_CACHE_SLOTS", "65536"))
+REDIRECT_SHARED_CACHE_SLOT_SIZE = int(
+    os.getenv("REDIRECT_SHARED_CACHE_SLOT_SIZE", "512")
+)
+SHARED_CACHE_WAYS = 8
+SHARED_CACHE_VERSION = 2
+
+# Segment layout, all integers little-endian:
+#   header  invalidation generation, padded to 64 bytes
+#   slots   set-associative table: each short code hashes to one set of
+#           SHARED_CACHE_WAYS consecutive fixed-size slots
+GENERATION = struct.Struct("<Q")
+SLOTS_OFFSET = 64
+# sequence (odd while a writer changes the slot), short code length
+# (0 = empty), redirect status, URL length, entry expiry as wall clock time,
+# link expiry (0 = never)
+SLOT = struct.Struct("<IHHIdd")
+SEQUENCE = struct.Struct("<I")
+# Last read, for eviction; written by readers without the lock
+ACCESSED = struct.Struct("<d")
+ACCESSED_OFFSET = SLOT.size
+PAYLOAD_OFFSET = SLOT.size + ACCESSED.size
+SEQUENCE_MASK = 0xFFFFFFFF
+
+
+def _untrack(memory: shared_memory.SharedMemory) -> None:
+    # The segment outlives every worker: without this, the resource tracker
+    # of the first worker to exit unlinks it under the others (bpo-39959)
+    resource_tracker.unregister(memory._name, "shared_memory")
+
+
+class SharedRedirectCache(RedirectCache):
+    """
+    Redirect cache in a POSIX shared memory segment used by every worker
+    process on the host, so hot entries are stored and warmed once.
+
+    Memory is bounded by ``slots * slot_size``; entries that do not fit a
+    slot are not cached. Each set evicts an expired entry first, then the
+    least recently read one.
+
+    Reads take no lock. Writers serialize per set with a byte-range lock on
+    a lock file and bracket each change with an odd sequence number
+    (seqlock); a reader that sees an odd or changed sequence treats the
+    lookup as a miss. Invalidations clear the slot for all workers and bump
+    a shared generation, so a load already in flight in any worker does not
+    write back the value it read before the change.
+
+    Concurrent misses are coalesced per worker only.
+    """
+
+    def __init__(
+        self,
+        slots: int = REDIRECT_SHARED_CACHE_SLOTS,
+        slot_size: int = REDIRECT_SHARED_CACHE_SLOT_SIZE,
+        ttl: float = REDIRECT_CACHE_TTL,
+        name: str = REDIRECT_SHARED_CACHE_NAME,
+    ):
+        if slot_size <= PAYLOAD_OFFSET:
+            raise ValueError(f"slot_size must be larger than {PAYLOAD_OFFSET}")
+        self.sets = max(slots // SHARED_CACHE_WAYS, 1)
+        super().__init__(max_size=self.sets * SHARED_CACHE_WAYS, ttl=ttl)
+        self.slot_size = slot_size
+        # Workers configured with another layout use another segment
+        self.name = f"{name}_v{SHARED_CACHE_VERSION}_{self.max_size}x{slot_size}"
+        self._memory: Optional[shared_memory.SharedMemory] = None
+        self._buffer: Optional[memoryview] = None
+        self._lock_fd: Optional[int] = None
+        self.oversized = 0
+
+    @contextmanager
+    def _locked(self, index: int) -> Iterator[None]:
+        # Byte 0 of the lock file guards the header, byte n + 1 set n
+        fcntl.lockf(self._lock_fd, fcntl.LOCK_EX, 1, index)
+        try:
+            yield
+        finally:
+            fcntl.lockf(self._lock_fd, fcntl.LOCK_UN, 1, index)
+
+    def _attach(self) -> memoryview:
+        if self._buffer is None:
+            lock_path = os.path.join(tempfile.gettempdir(), f"{self.name}.lock")
+            self._lock_fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+            size = SLOTS_OFFSET + self.max_size * self.slot_size
+            # The first worker creates the (zero-filled) segment
+            with self._locked(0):
+                try:
+                    memory = shared_memory.SharedMemory(
+                        self.name, create=True, size=size
+                    )
+                except FileExistsError:
+                    memory = shared_memory.SharedMemory(self.name)
+                _untrack(memory)
+            self._memory, self._buffer = memory, memory.buf
+        return self._buffer
+
+    def _set_offset(self, key: bytes) -> int:
+        index = zlib.crc32(key) % self.sets
+        return SLOTS_OFFSET + index * SHARED_CACHE_WAYS * self.slot_size
+
+    def _set_index(self, offset: int) -> int:
+        return (offset - SLOTS_OFFSET) // (SHARED_CACHE_WAYS * self.slot_size)
+
+    def _slots(self, set_offset: int) -> range:
+        return range(
+            set_offset, set_offset + SHARED_CACHE_WAYS * self.slot_size, self.slot_size
+        )
+
+    def _write(
+        self,
+        buffer: memoryview,
+        offset: int,
+        key: bytes = b"",
+        original_url: bytes = b"",
+        status_code: int = 0,
+        expires_at: float = 0.0,
+        link_expires_at: float = 0.0,
+    ) -> None:
+        # Callers hold the set lock, so the sequence is even here
+        (sequence,) = SEQUENCE.unpack_from(buffer, offset)
+        SEQUENCE.pack_into(buffer, offset, (sequence + 1) & SEQUENCE_MASK)
+        payload = offset + PAYLOAD_OFFSET
+        buffer[payload : payload + len(key)] = key
+        payload += len(key)
+        buffer[payload : payload + len(original_url)] = original_url
+        SLOT.pack_into(
+            buffer,
+            offset,
+            (sequence + 1) & SEQUENCE_MASK,
+            len(key),
+            status_code,
+            len(original_url),
+            expires_at,
+            link_expires_at,
+        )
+        ACCESSED.pack_into(buffer, offset + ACCESSED_OFFSET, time.time())
+        SEQUENCE.pack_into(buffer, offset, (sequence + 2) & SEQUENCE_MASK)
+
+    def _find(self, buffer: memoryview, set_offset: int, key: bytes) -> Optional[int]:
+        for offset in self._slots(set_offset):
+            key_length = SLOT.unpack_from(buffer, offset)[1]
+            payload = offset + PAYLOAD_OFFSET
+            if key_length == len(key) and buffer[payload : payload + key_length] == key:
+                return offset
+        return None
+
+    def get(self, short_code: str) -> Optional[RedirectTarget]:
+        key = short_code.encode()
+        buffer = self._attach()
+        now = time.time()
+        for offset in self._slots(self._set_offset(key)):
+            (
+                sequence,
+                key_length,
+                status_code,
+                url_length,
+                expires_at,
+                link_expires_at,
+            ) = SLOT.unpack_from(buffer, offset)
+            if key_length != len(key) or sequence & 1:
+                continue
+            payload = offset + PAYLOAD_OFFSET
+            if buffer[payload : payload + key_length] != key:
+                continue
+            payload += key_length
+            original_url = bytes(buffer[payload : payload + url_length])
+            if SEQUENCE.unpack_from(buffer, offset)[0] != sequence:
+                break  # rewritten while being read
+            if expires_at <= now:
+                self.expirations += 1
+                break
+            ACCESSED.pack_into(buffer, offset + ACCESSED_OFFSET, now)
+            self.hits += 1
+            return RedirectTarget(
+                original_url.decode(), status_code, link_expires_at or None
+            )
+        self.misses += 1
+        return None
+
+    def set(self, short_code: str, target: RedirectTarget) -> None:
+        if self.max_size <= 0:
+            return
+        key = short_code.encode()
+        original_url = target.original_url.encode()
+        if PAYLOAD_OFFSET + len(key) + len(original_url) > self.slot_size:
+            self.oversized += 1
+            return
+
+        buffer = self._attach()
+        set_offset = self._set_offset(key)
+        now = time.time()
+        with self._locked(self._set_index(set_offset) + 1):
+            offset = self._find(buffer, set_offset, key)
+            if offset is None:
+                # Empty slots first, then expired ones, then the least recently read
+                def rank(slot_offset: int):
+                    _, key_length, _, _, expires_at, _ = SLOT.unpack_from(
+                        buffer, slot_offset
+                    )
+                    (accessed,) = ACCESSED.unpack_from(
+                        buffer, slot_offset + ACCESSED_OFFSET
+                    )
+                    return (key_length > 0, expires_at > now, accessed)
+
+                offset = min(self._slots(set_offset), key=rank)
+                if rank(offset)[:2] == (True, True):
+                    self.evictions += 1
+            self._write(
+                buffer,
+                offset,
+                key,
+                original_url,
+                target.status_code,
+                now + self.ttl,
+                target.expires_at or 0.0,
+            )
+
+    def generation(self) -> int:
+        return GENERATION.unpack_from(self._attach(), 0)[0]
+
+    def invalidate(self, short_code: str) -> None:
+        key = short_code.encode()
+        buffer = self._attach()
+        # Bumped first: loads that already read the old value must not store it
+        with self._locked(0):
+            GENERATION.pack_into(buffer, 0, self.generation() + 1)
+        set_offset = self._set_offset(key)
+        with self._locked(self._set_index(set_offset) + 1):
+            offset = self._find(buffer, set_offset, key)
+            if offset is not None:
+                self._write(buffer, offset)
+        self.invalidations += 1
+
+    def clear(self) -> None:
+        """Empty the cache for every worker and reset this worker's counters"""
+        buffer = self._attach()
+        with self._locked(0):
+            GENERATION.pack_into(buffer, 0, self.generation() + 1)
+        for index in range(self.sets):
+            set_offset = SLOTS_OFFSET + index * SHARED_CACHE_WAYS * self.slot_size
+            with self._locked(index + 1):
+                for offset in self._slots(set_offset):
+                    if SLOT.unpack_from(buffer, offset)[1]:
+                        self._write(buffer, offset)
+        super().clear()
+        self.oversized = 0
+
+    def close(self, unlink: bool = False) -> None:
+        """Detach from the segment, and remove it for all workers on unlink"""
+        if self._memory is None:
+            return
+        self._buffer.release()
+        self._memory.close()
+        if unlink:
+            # unlink() unregisters the segment from the resource tracker again
+            resource_tracker.register(self._memory._name, "shared_memory")
+            self._memory.unlink()
+            os.unlink(os.path.join(tempfile.gettempdir(), f"{self.name}.lock"))
+        os.close(self._lock_fd)
+        self._memory, self._buffer, self._lock_fd = None, None, None
+
+    def stats(self) -> Dict[str, int]:
+        buffer = self._attach()
+        now = time.time()
+        size = 0
+        for offset in range(
+            SLOTS_OFFSET, SLOTS_OFFSET + self.max_size * self.slot_size, self.slot_size
+        ):
+            _, key_length, _, _, expires_at, _ = SLOT.unpack_from(buffer, offset)
+            size += key_length > 0 and expires_at > now
+        return {**super().stats(), "size": size, "oversized": self.oversized}
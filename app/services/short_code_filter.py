@@ -0,0 +1,286 @@
+import asyncio
+import hashlib
+import math
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.database.read_routing import recent_writes
+from app.database.sharded_url_repository import url_repository_scope
+from app.database.url_repository import URLRepository
+from app.services.periodic import PeriodicJob
+
+SHORT_CODE_FILTER_ENABLED = (
+    os.getenv("SHORT_CODE_FILTER_ENABLED", "true").lower() == "true"
+)
+SHORT_CODE_FILTER_CAPACITY = int(os.getenv("SHORT_CODE_FILTER_CAPACITY", "1000000"))
+SHORT_CODE_FILTER_ERROR_RATE = float(os.getenv("SHORT_CODE_FILTER_ERROR_RATE", "0.001"))
+SHORT_CODE_FILTER_REBUILD_INTERVAL = float(
+    os.getenv("SHORT_CODE_FILTER_REBUILD_INTERVAL", "3600")
+)
+SHORT_CODE_FILTER_SYNC_INTERVAL = float(
+    os.getenv("SHORT_CODE_FILTER_SYNC_INTERVAL", "1.0")
+)
+SHORT_CODE_FILTER_MAX_STALENESS = float(
+    os.getenv("SHORT_CODE_FILTER_MAX_STALENESS", "5.0")
+)
+SHORT_CODE_FILTER_SYNC_OVERLAP = float(
+    os.getenv("SHORT_CODE_FILTER_SYNC_OVERLAP", "10.0")
+)
+SHORT_CODE_FILTER_LOAD_BATCH_SIZE = 10000
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter of strings using double hashing"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        self.num_bits = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> Iterable[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+    def estimated_error_rate(self) -> float:
+        return (
+            1 - math.exp(-self.num_hashes * self.count / self.num_bits)
+        ) ** self.num_hashes
+
+
+class ShortCodeFilter:
+    """
+    Bloom filter of the live short codes, so lookups of codes that were never
+    created are answered without a point query per code.
+
+    Codes created by this process are added at once; codes created by other
+    workers are picked up every ``sync_interval`` seconds by a catch-up read
+    of the rows created since shortly before the previous read, so a code
+    created elsewhere can be reported missing for about that long. The reads
+    go by creation time rather than id: rows are not committed in id order
+    (batches, sharded id reservations, concurrent workers), and the
+    ``sync_overlap`` window covers rows committed up to that many seconds
+    after their ``created_at`` and clock skew between workers.
+
+    A miss is only trusted while the last read is at most ``max_staleness``
+    seconds old, and not for clients that wrote within the read-your-writes
+    window (they may be looking up the code they just created on another
+    worker): those misses fall back to a point lookup.
+
+    Deleted codes stay in the filter (they only cost a query) until the next
+    full rebuild, which also resizes the filter to the number of live codes.
+    Until the first build completes every code is reported as possibly
+    present.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = SHORT_CODE_FILTER_ENABLED,
+        capacity: int = SHORT_CODE_FILTER_CAPACITY,
+        error_rate: float = SHORT_CODE_FILTER_ERROR_RATE,
+        rebuild_interval: float = SHORT_CODE_FILTER_REBUILD_INTERVAL,
+        sync_interval: float = SHORT_CODE_FILTER_SYNC_INTERVAL,
+        max_staleness: float = SHORT_CODE_FILTER_MAX_STALENESS,
+        sync_overlap: float = SHORT_CODE_FILTER_SYNC_OVERLAP,
+    ):
+        self.enabled = enabled
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.rebuild_interval = rebuild_interval
+        self.sync_interval = sync_interval
+        self.max_staleness = max_staleness
+        self.sync_overlap = sync_overlap
+        self._filter: Optional[BloomFilter] = None
+        # Codes added while a rebuild is reading the table
+        self._added_during_rebuild: Optional[Set[str]] = None
+        # Start of the last read, by the clock rows are created with and by
+        # the monotonic clock its staleness is measured with
+        self._read_since = datetime.min
+        self._read_started = 0.0
+        self._sync_lock = asyncio.Lock()
+        self._job = PeriodicJob(
+            self.rebuild, "rebuild the short code filter", run_first=True
+        )
+        self._sync_job = PeriodicJob(self.sync, "sync the short code filter")
+        self.lookups = 0
+        self.negatives = 0
+        self.fallbacks = 0
+        self.false_positives = 0
+        self.rebuilds = 0
+        self.syncs = 0
+
+    @property
+    def ready(self) -> bool:
+        return self.enabled and self._filter is not None
+
+    def add(self, short_code: str) -> None:
+        if self._added_during_rebuild is not None:
+            self._added_during_rebuild.add(short_code)
+        if self._filter is not None:
+            self._filter.add(short_code)
+
+    def might_contain(self, short_code: str) -> bool:
+        """
+        False when the code was not created by this process or found by the
+        last read; it may still have been created by another worker since
+        """
+        if not self.ready:
+            return True
+        return short_code in self._filter
+
+    def might_exist(self, short_code: str) -> bool:
+        """
+        Check a code for a lookup: False means the code does not exist, as of
+        the last catch-up read
+        """
+        self.lookups += 1
+        if self.might_contain(short_code):
+            return True
+        if (
+            time.monotonic() - self._read_started > self.max_staleness
+            or recent_writes.client_wrote_recently()
+        ):
+            # The filter cannot vouch for this miss: one point lookup decides
+            self.fallbacks += 1
+            return True
+        self.negatives += 1
+        return False
+
+    def record_false_positive(self, short_code: str) -> None:
+        """Count a code the filter let through that the database did not have"""
+        if self.ready and short_code in self._filter:
+            self.false_positives += 1
+
+    async def sync(self, url_repository: Optional[URLRepository] = None) -> None:
+        """Add the codes of rows created since shortly before the last read"""
+        async with self._sync_lock:
+            if self._filter is None:
+                return
+            read_since = datetime.utcnow()
+            read_started = time.monotonic()
+            since = self._read_since - timedelta(seconds=self.sync_overlap)
+            if url_repository is not None:
+                rows = await self._read_since_time(url_repository, since)
+            else:
+                async with url_repository_scope() as repository:
+                    rows = await self._read_since_time(repository, since)
+            for _, short_code in rows:
+                # Rows inside the overlap were mostly read before
+                if short_code not in self._filter:
+                    self._filter.add(short_code)
+            self._read_since = read_since
+            self._read_started = read_started
+            self.syncs += 1
+
+    async def rebuild(self, url_repository: Optional[URLRepository] = None) -> None:
+        """Build a new filter from every live short code and swap it in"""
+        if not self.enabled:
+            return
+        if url_repository is None:
+            async with url_repository_scope() as repository:
+                return await self.rebuild(repository)
+
+        live_codes = self._filter.count if self._filter is not None else 0
+        bloom = BloomFilter(max(self.capacity, 2 * live_codes), self.error_rate)
+        read_since = datetime.utcnow()
+        read_started = time.monotonic()
+        self._added_during_rebuild = set()
+        try:
+            await self._load(url_repository, bloom)
+            for short_code in self._added_during_rebuild:
+                bloom.add(short_code)
+        finally:
+            self._added_during_rebuild = None
+        self._filter = bloom
+        # The next catch-up read covers rows committed during the rebuild
+        self._read_since = read_since
+        self._read_started = read_started
+        self.rebuilds += 1
+
+    async def _load(self, url_repository: URLRepository, bloom: BloomFilter) -> None:
+        after_id = 0
+        while True:
+            rows = await url_repository.get_short_codes(
+                after_id, SHORT_CODE_FILTER_LOAD_BATCH_SIZE
+            )
+            for url_id, short_code in rows:
+                bloom.add(short_code)
+                after_id = url_id
+            if len(rows) < SHORT_CODE_FILTER_LOAD_BATCH_SIZE:
+                return
+
+    async def _read_since_time(
+        self, url_repository: URLRepository, since: datetime
+    ) -> List[Tuple[int, str]]:
+        rows: List[Tuple[int, str]] = []
+        after_id = 0
+        while True:
+            batch = await url_repository.get_short_codes_created_since(
+                since, after_id, SHORT_CODE_FILTER_LOAD_BATCH_SIZE
+            )
+            rows.extend(batch)
+            if len(batch) < SHORT_CODE_FILTER_LOAD_BATCH_SIZE:
+                return rows
+            after_id = batch[-1][0]
+
+    def start(self) -> None:
+        if self.enabled:
+            self._job.start(self.rebuild_interval)
+            self._sync_job.start(self.sync_interval)
+
+    async def stop(self) -> None:
+        await self._job.stop()
+        await self._sync_job.stop()
+
+    def clear(self) -> None:
+        self._filter = None
+        self._added_during_rebuild = None
+        self._read_since = datetime.min
+        self._read_started = 0.0
+        self._sync_lock = asyncio.Lock()
+        self.lookups = self.negatives = self.fallbacks = self.false_positives = 0
+        self.rebuilds = self.syncs = 0
+
+    def stats(self) -> Dict[str, float]:
+        bloom = self._filter
+        return {
+            "ready": int(self.ready),
+            "items": bloom.count if bloom else 0,
+            "size_bytes": len(bloom.bits) if bloom else 0,
+            "hashes": bloom.num_hashes if bloom else 0,
+            "estimated_false_positive_rate": (
+                bloom.estimated_error_rate() if bloom else 0.0
+            ),
+            "observed_false_positive_rate": (
+                self.false_positives / (self.false_positives + self.negatives)
+                if self.false_positives
+                else 0.0
+            ),
+            "lookups": self.lookups,
+            "negatives": self.negatives,
+            "fallbacks": self.fallbacks,
+            "false_positives": self.false_positives,
+            "rebuilds": self.rebuilds,
+            "syncs": self.syncs,
+        }
+
+
+short_code_filter = ShortCodeFilter()
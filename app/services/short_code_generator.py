@@ -0,0 +1,167 @@
+import asyncio
+import os
+import random
+import string
+import time
+from typing import Optional
+
+from app.database.url_repository import URLRepository
+
+SHORT_CODE_STRATEGY = os.getenv("SHORT_CODE_STRATEGY", "range")
+SHORT_CODE_MIN_LENGTH = int(os.getenv("SHORT_CODE_MIN_LENGTH", "6"))
+SHORT_CODE_RANGE_SIZE = int(os.getenv("SHORT_CODE_RANGE_SIZE", "1000"))
+SHORT_CODE_WORKER_ID = int(os.getenv("SHORT_CODE_WORKER_ID", str(os.getpid() % 1024)))
+
+BASE62_ALPHABET = string.digits + string.ascii_letters
+
+# Odd and not a multiple of 31, so it is invertible modulo every power of 62
+_SCRAMBLE_MULTIPLIER = 2654435761
+_SCRAMBLE_INCREMENT = 1013904223
+
+
+def base62_encode(value: int, length: int = 0) -> str:
+    chars = []
+    while value:
+        value, remainder = divmod(value, 62)
+        chars.append(BASE62_ALPHABET[remainder])
+    return "".join(reversed(chars)).rjust(length, BASE62_ALPHABET[0])
+
+
+def encode_id(value: int, min_length: int = SHORT_CODE_MIN_LENGTH) -> str:
+    """
+    Map a unique, sequential id to a unique short code.
+
+    Ids fill the keyspace of one code length before moving on to the next
+    (62^6 six-character codes, then 62^7 seven-character codes, ...), and are
+    spread over that keyspace with an affine bijection so consecutive ids do
+    not produce consecutive codes.
+    """
+    length = min_length
+    while value >= 62**length:
+        value -= 62**length
+        length += 1
+
+    keyspace = 62**length
+    scrambled = (value * _SCRAMBLE_MULTIPLIER + _SCRAMBLE_INCREMENT) % keyspace
+    return base62_encode(scrambled, length)
+
+
+class ShortCodeGenerator:
+    """Strategy for producing short codes for new URLs"""
+
+    # Whether codes can collide with each other, so the service checks each
+    # one against the filter and the database before using it
+    needs_existence_check = False
+
+    async def next_code(self, url_repository: URLRepository) -> str:
+        raise NotImplementedError
+
+    def reset(self) -> None:
+        pass
+
+
+class RandomShortCodeGenerator(ShortCodeGenerator):
+    """Random codes, which the service checks until an unused one is found"""
+
+    needs_existence_check = True
+
+    def __init__(self, code_length: int = SHORT_CODE_MIN_LENGTH):
+        self.code_length = code_length
+
+    async def next_code(self, url_repository: URLRepository) -> str:
+        chars = string.ascii_letters + string.digits
+        return "".join(random.choice(chars) for _ in range(self.code_length))
+
+
+class RangeShortCodeGenerator(ShortCodeGenerator):
+    """
+    Codes encoded from ids reserved in blocks from a database counter.
+
+    Each worker reserves ``range_size`` ids with a single UPDATE and hands them
+    out locally, so codes are unique by construction. A range size of 1 turns
+    this into a plain database sequence.
+    """
+
+    def __init__(
+        self,
+        range_size: int = SHORT_CODE_RANGE_SIZE,
+        min_length: int = SHORT_CODE_MIN_LENGTH,
+        counter_name: str = "short_code",
+    ):
+        self.range_size = range_size
+        self.min_length = min_length
+        self.counter_name = counter_name
+        self._next_id = 0
+        self._end_id = 0
+        self._lock = asyncio.Lock()
+
+    async def next_code(self, url_repository: URLRepository) -> str:
+        async with self._lock:
+            if self._next_id >= self._end_id:
+                start = await url_repository.reserve_ids(
+                    self.counter_name, self.range_size
+                )
+                self._next_id, self._end_id = start, start + self.range_size
+            value = self._next_id
+            self._next_id += 1
+        return encode_id(value, self.min_length)
+
+    def reset(self) -> None:
+        self._next_id = self._end_id = 0
+        self._lock = asyncio.Lock()
+
+
+class SnowflakeShortCodeGenerator(ShortCodeGenerator):
+    """
+    Codes encoded from Snowflake-style ids: 41 bits of milliseconds since
+    ``epoch_ms``, 10 bits of worker id and a 12 bit per-millisecond sequence.
+    Needs no database access, but SHORT_CODE_WORKER_ID must be unique per
+    worker.
+    """
+
+    epoch_ms = 1_704_067_200_000  # 2024-01-01T00:00:00Z
+
+    def __init__(self, worker_id: int = SHORT_CODE_WORKER_ID):
+        if not 0 <= worker_id < 1024:
+            raise ValueError("Snowflake worker id must be between 0 and 1023")
+        self.worker_id = worker_id
+        self._last_ms = -1
+        self._sequence = 0
+
+    def next_id(self) -> int:
+        now_ms = int(time.time() * 1000)
+        if now_ms < self._last_ms:
+            # The clock moved backwards: keep issuing ids from the last tick
+            now_ms = self._last_ms
+        if now_ms == self._last_ms:
+            self._sequence = (self._sequence + 1) & 0xFFF
+            if self._sequence == 0:
+                # Sequence exhausted for this millisecond, move to the next one
+                now_ms = self._last_ms + 1
+        else:
+            self._sequence = 0
+        self._last_ms = now_ms
+        return (
+            ((now_ms - self.epoch_ms) << 22) | (self.worker_id << 12) | self._sequence
+        )
+
+    async def next_code(self, url_repository: URLRepository) -> str:
+        return base62_encode(self.next_id())
+
+
+def create_short_code_generator(
+    strategy: Optional[str] = None,
+) -> ShortCodeGenerator:
+    strategy = strategy or SHORT_CODE_STRATEGY
+    if strategy == "random":
+        return RandomShortCodeGenerator()
+    if strategy == "sequence":
+        return RangeShortCodeGenerator(range_size=1)
+    if strategy == "range":
+        return RangeShortCodeGenerator()
+    if strategy == "snowflake":
+        return SnowflakeShortCodeGenerator()
+    raise ValueError(f"Unknown short code strategy: {strategy}")
+
+
+short_code_generator = create_short_code_generator()
@@ -0,0 +1,196 @@
+import logging
+import os
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SQL_PROFILING = os.getenv("SQL_PROFILING", "false").lower() == "true"
+SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "100"))
+SQL_SLOW_QUERY_HISTORY = 100
+SQL_STATEMENT_MAX_LENGTH = 1000
+
+logger = logging.getLogger(__name__)
+
+# Repository method the current statement is issued for (set by BaseRepository)
+current_operation: ContextVar[Optional[str]] = ContextVar(
+    "current_operation", default=None
+)
+
+
+class RequestProfile:
+    """Queries issued while serving one request"""
+
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0.0
+        self.operations: Dict[str, int] = {}
+
+    def record(self, operation: str, duration: float) -> None:
+        self.queries += 1
+        self.duration += duration
+        self.operations[operation] = self.operations.get(operation, 0) + 1
+
+
+_request_profile: ContextVar[Optional[RequestProfile]] = ContextVar(
+    "request_profile", default=None
+)
+
+
+def redact(statement: str, parameters: Any, executemany: bool) -> str:
+    """
+    Statement text for the logs: bound values are never printed, only how
+    many there were
+    """
+    if len(statement) > SQL_STATEMENT_MAX_LENGTH:
+        statement = statement[:SQL_STATEMENT_MAX_LENGTH] + "..."
+    if executemany:
+        detail = f"{len(parameters)} parameter sets"
+    else:
+        detail = f"{len(parameters or ())} parameters"
+    return f"{statement} [{detail} redacted]"
+
+
+class SQLProfiler:
+    """
+    Opt-in statement profiler hooked into the engine's cursor events.
+
+    Every statement is attributed to the repository method that issued it and
+    aggregated per method. Statements slower than ``slow_query_ms`` are logged
+    (with their bound parameters redacted) and kept in a short history.
+    """
+
+    def __init__(
+        self, enabled: bool = SQL_PROFILING, slow_query_ms: float = SQL_SLOW_QUERY_MS
+    ):
+        self.enabled = enabled
+        self.slow_query_ms = slow_query_ms
+        self._operations: Dict[str, Dict[str, float]] = {}
+        self._slow_queries: Deque[Dict[str, Any]] = deque(maxlen=SQL_SLOW_QUERY_HISTORY)
+
+    def instrument(self, engine: Engine) -> None:
+        if not event.contains(engine, "before_cursor_execute", self._before_execute):
+            event.listen(engine, "before_cursor_execute", self._before_execute)
+            event.listen(engine, "after_cursor_execute", self._after_execute)
+
+    def _before_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ) -> None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    def _after_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ) -> None:
+        duration = time.perf_counter() - conn.info["query_start"].pop()
+        if self.enabled:
+            self.record(statement, parameters, executemany, duration, cursor.rowcount)
+
+    def record(
+        self,
+        statement: str,
+        parameters: Any,
+        executemany: bool,
+        duration: float,
+        rowcount: int,
+    ) -> None:
+        operation = current_operation.get() or "<unknown>"
+        totals = self._operations.setdefault(
+            operation, {"queries": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0}
+        )
+        duration_ms = duration * 1000
+        totals["queries"] += 1
+        totals["total_ms"] += duration_ms
+        totals["max_ms"] = max(totals["max_ms"], duration_ms)
+        totals["rows"] += max(rowcount, 0)
+
+        profile = _request_profile.get()
+        if profile is not None:
+            profile.record(operation, duration)
+
+        if duration_ms >= self.slow_query_ms:
+            redacted = redact(statement, parameters, executemany)
+            logger.warning(
+                "Slow query in %s: %.1f ms, %d rows: %s",
+                operation,
+                duration_ms,
+                rowcount,
+                redacted,
+            )
+            self._slow_queries.append(
+                {
+                    "operation": operation,
+                    "duration_ms": round(duration_ms, 3),
+                    "rowcount": rowcount,
+                    "statement": redacted,
+                }
+            )
+
+    def clear(self) -> None:
+        self._operations.clear()
+        self._slow_queries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "slow_query_ms": self.slow_query_ms,
+            "operations": {
+                operation: dict(totals)
+                for operation, totals in sorted(self._operations.items())
+            },
+            "slow_queries": list(self._slow_queries),
+        }
+
+
+class SQLProfilingMiddleware:
+    """
+    Pure ASGI middleware adding a per-request query summary to the response
+    headers when profiling is on:
+
+    - ``X-DB-Query-Count``: statements issued while serving the request
+    - ``X-DB-Operations``: the same count per repository method
+    - ``Server-Timing``: total database time, shown by browser dev tools
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not sql_profiler.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers: List = list(message.get("headers", []))
+                headers.append((b"x-db-query-count", str(profile.queries).encode()))
+                headers.append(
+                    (
+                        b"x-db-operations",
+                        ", ".join(
+                            f"{operation}={count}"
+                            for operation, count in profile.operations.items()
+                        ).encode(),
+                    )
+                )
+                headers.append(
+                    (
+                        b"server-timing",
+                        f"db;dur={profile.duration * 1000:.3f}".encode(),
+                    )
+                )
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = _request_profile.set(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_profile.reset(token)
+
+
+sql_profiler = SQLProfiler()
@@ -0,0 +1,76 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from app.database.url_repository import URLRepository
+from app.services.periodic import BatchJob, batch_job_arguments
+
+URL_COMPACTION_ENABLED = os.getenv("URL_COMPACTION_ENABLED", "true").lower() == "true"
+URL_ARCHIVE_AFTER_DAYS = float(os.getenv("URL_ARCHIVE_AFTER_DAYS", "30"))
+URL_COMPACTION_INTERVAL = float(os.getenv("URL_COMPACTION_INTERVAL", "3600"))
+URL_COMPACTION_BATCH_SIZE = int(os.getenv("URL_COMPACTION_BATCH_SIZE", "1000"))
+URL_COMPACTION_BATCH_PAUSE = float(os.getenv("URL_COMPACTION_BATCH_PAUSE", "0.1"))
+
+
+class URLCompactor(BatchJob):
+    """
+    Moves soft-deleted URLs older than the archive age out of the urls table
+    into urls_archive, in bounded batches.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = URL_COMPACTION_ENABLED,
+        archive_after_days: float = URL_ARCHIVE_AFTER_DAYS,
+        interval: float = URL_COMPACTION_INTERVAL,
+        batch_size: int = URL_COMPACTION_BATCH_SIZE,
+        batch_pause: float = URL_COMPACTION_BATCH_PAUSE,
+    ):
+        super().__init__(
+            self._archive_batch,
+            "archive deleted URLs",
+            "archived",
+            enabled,
+            interval,
+            batch_size,
+            batch_pause,
+        )
+        self.archive_after_days = archive_after_days
+
+    async def _archive_batch(self, repository: URLRepository, started: datetime) -> int:
+        cutoff = started - timedelta(days=self.archive_after_days)
+        return await repository.archive_deleted(cutoff, self.batch_size)
+
+    async def compact(
+        self,
+        repository: Optional[URLRepository] = None,
+        max_batches: Optional[int] = None,
+    ) -> int:
+        """
+        Archive every URL deleted before the cutoff (or at most
+        ``max_batches`` batches of them) and return how many were moved
+        """
+        return await self.run(repository, max_batches)
+
+
+url_compactor = URLCompactor()
+
+
+if __name__ == "__main__":
+    # One-off run, e.g. from cron: python -m app.services.url_compaction
+    parser = batch_job_arguments(
+        "Archive soft-deleted URLs",
+        URL_COMPACTION_BATCH_SIZE,
+        URL_COMPACTION_BATCH_PAUSE,
+    )
+    parser.add_argument("--older-than-days", type=float, default=URL_ARCHIVE_AFTER_DAYS)
+    args = parser.parse_args()
+
+    compactor = URLCompactor(
+        archive_after_days=args.older_than_days,
+        batch_size=args.batch_size,
+        batch_pause=args.batch_pause,
+    )
+    archived = asyncio.run(compactor.compact(max_batches=args.max_batches))
+    print(f"Archived {archived} deleted URLs in {compactor.batches} batches")
@@ -0,0 +1,77 @@
+import asyncio
+import os
+from datetime import datetime
+from typing import Optional
+
+from app.database.url_repository import URLRepository
+from app.services.leaderboard import leaderboard
+from app.services.periodic import BatchJob, batch_job_arguments
+from app.services.redirect_cache import redirect_cache
+
+URL_EXPIRY_ENABLED = os.getenv("URL_EXPIRY_ENABLED", "true").lower() == "true"
+URL_EXPIRY_INTERVAL = float(os.getenv("URL_EXPIRY_INTERVAL", "60"))
+URL_EXPIRY_BATCH_SIZE = int(os.getenv("URL_EXPIRY_BATCH_SIZE", "1000"))
+URL_EXPIRY_BATCH_PAUSE = float(os.getenv("URL_EXPIRY_BATCH_PAUSE", "0.1"))
+
+
+class URLReaper(BatchJob):
+    """
+    Soft-deletes expired URLs, which the compaction job archives later like
+    any other deleted URL.
+
+    Until then expired URLs answer redirects with 410 and are left out of
+    listings, rankings, the summary and deduplication. Batches are read from
+    the partial index on expires_at.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = URL_EXPIRY_ENABLED,
+        interval: float = URL_EXPIRY_INTERVAL,
+        batch_size: int = URL_EXPIRY_BATCH_SIZE,
+        batch_pause: float = URL_EXPIRY_BATCH_PAUSE,
+    ):
+        super().__init__(
+            self._expire_batch,
+            "delete expired URLs",
+            "expired",
+            enabled,
+            interval,
+            batch_size,
+            batch_pause,
+        )
+
+    async def _expire_batch(self, repository: URLRepository, started: datetime) -> int:
+        short_codes = await repository.expire_due(started, self.batch_size)
+        # Deleted links answer 404 from now on, in this worker at least; other
+        # workers still answer 410 until their cache entry expires
+        for short_code in short_codes:
+            redirect_cache.invalidate(short_code)
+            leaderboard.discard(short_code)
+        return len(short_codes)
+
+    async def reap(
+        self,
+        repository: Optional[URLRepository] = None,
+        max_batches: Optional[int] = None,
+    ) -> int:
+        """
+        Soft-delete every URL expired by now (or at most ``max_batches``
+        batches of them) and return how many were deleted
+        """
+        return await self.run(repository, max_batches)
+
+
+url_reaper = URLReaper()
+
+
+if __name__ == "__main__":
+    # One-off run, e.g. from cron: python -m app.services.url_expiry
+    parser = batch_job_arguments(
+        "Delete expired URLs", URL_EXPIRY_BATCH_SIZE, URL_EXPIRY_BATCH_PAUSE
+    )
+    args = parser.parse_args()
+
+    reaper = URLReaper(batch_size=args.batch_size, batch_pause=args.batch_pause)
+    expired = asyncio.run(reaper.reap(max_batches=args.max_batches))
+    print(f"Deleted {expired} expired URLs in {reaper.batches} batches")
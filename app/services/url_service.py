@@ -1,35 +1,131 @@
-import asyncio
-import random
+import base64
+import binascii
+import json
+import os
 import re
-import string
 from datetime import datetime
-from typing import List
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
 from fastapi import Depends, HTTPException, Request, status
+from sqlalchemy.exc import IntegrityError
 
-from app.database.url_repository import URLRepository
-from app.models.url import URL, URLCreate, URLResponse, URLUpdate
+from app.database.sharded_url_repository import get_url_repository
+from app.database.url_hash import normalize_url
+from app.database.url_repository import URL_RESPONSE_COLUMNS, URLRepository
+from app.models.url import URL, URLBatchResult, URLCreate, URLResponse, URLUpdate
+from app.services.click_buffer import click_buffer
+from app.services.click_events import click_events
+from app.services.http_caching import RedirectTarget, redirect_target
+from app.services.leaderboard import leaderboard
+from app.services.redirect_cache import redirect_cache
+from app.services.short_code_filter import short_code_filter
+from app.services.short_code_generator import short_code_generator
+
+BATCH_SHORTEN_MAX_ITEMS = int(os.getenv("BATCH_SHORTEN_MAX_ITEMS", "10000"))
+
+INVALID_ALIAS_DETAIL = "Custom alias must be alphanumeric and between 4-20 characters"
+ALIAS_IN_USE_DETAIL = "Custom alias already in use"
+NOT_SAVED_DETAIL = "Not saved, retry this item"
+
+
+def url_payloads(rows: Iterable[Sequence[Any]], base_url: str) -> List[Dict[str, Any]]:
+    """
+    URLResponse fields of URL_RESPONSE_COLUMNS rows, built without validation
+    for the listing endpoints to encode directly. Rows are unpacked as tuples:
+    attribute access on a Row costs more than building the dict.
+    """
+    return [
+        {
+            "id": url_id,
+            "original_url": original_url,
+            "short_code": short_code,
+            "short_url": f"{base_url}{short_code}",
+            "is_custom": is_custom,
+            "clicks": clicks,
+            "created_at": created_at,
+            "updated_at": updated_at,
+            "redirect_status": redirect_status,
+            "expires_at": expires_at,
+        }
+        for (
+            url_id,
+            original_url,
+            short_code,
+            is_custom,
+            clicks,
+            created_at,
+            updated_at,
+            redirect_status,
+            expires_at,
+        ) in rows
+    ]
+
+
+def url_payload(url: URL, base_url: str) -> Dict[str, Any]:
+    """url_payloads of a single URL model, e.g. a leaderboard entry"""
+    (payload,) = url_payloads(
+        [[getattr(url, column.key) for column in URL_RESPONSE_COLUMNS]], base_url
+    )
+    return payload
 
 
 class URLService:
-    def __init__(self, url_repository: URLRepository = Depends()):
+    def __init__(self, url_repository: URLRepository = Depends(get_url_repository)):
         self.url_repository = url_repository
-        self.code_length = 6
+        self.redirect_cache = redirect_cache
+        self.click_buffer = click_buffer
+        self.click_events = click_events
+        self.leaderboard = leaderboard
+        self.short_code_generator = short_code_generator
+        self.short_code_filter = short_code_filter
+        self.max_code_attempts = 5
 
     async def get_all_urls(
-        self, request: Request, skip: int = 0, limit: int = 100
-    ) -> List[URLResponse]:
-        urls = self.url_repository.get_all(skip=skip, limit=limit)
+        self,
+        request: Request,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Get a page of URL payloads ordered by id, plus the cursor of the next
+        page (None when this page is the last one)
+        """
+        after_id = self._decode_cursor(cursor) if cursor else None
+        urls = await self.url_repository.get_all(
+            skip=skip, limit=limit, after_id=after_id
+        )
         base_url = str(request.base_url)
-        return await asyncio.gather(
-            *[self._create_url_response(url, base_url) for url in urls]
+        responses = url_payloads(urls, base_url)
+        next_cursor = (
+            self._encode_cursor(urls[-1].id) if urls and len(urls) == limit else None
         )
+        return responses, next_cursor
+
+    def _encode_cursor(self, last_id: int) -> str:
+        payload = json.dumps({"id": last_id}).encode()
+        return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+    def _decode_cursor(self, cursor: str) -> int:
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            last_id = json.loads(base64.urlsafe_b64decode(padded))["id"]
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            last_id = None
+        if not isinstance(last_id, int):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+            )
+        return last_id
 
     async def create_short_url(
         self, url_create: URLCreate, request: Request
     ) -> URLResponse:
-        existing_url = self.url_repository.get_by_original_url(
-            str(url_create.original_url)
+        # A link with another redirect status or expiry is a different link
+        existing_url = await self.url_repository.get_by_original_url(
+            str(url_create.original_url),
+            url_create.redirect_status,
+            url_create.expires_at,
         )
 
         if existing_url and not url_create.custom_alias:
@@ -40,14 +136,19 @@ class URLService:
             if not self._is_valid_custom_alias(url_create.custom_alias):
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Custom alias must be alphanumeric and between 4-20 characters",
+                    detail=INVALID_ALIAS_DETAIL,
                 )
 
-            exists = self.url_repository.exists_by_short_code(url_create.custom_alias)
+            # The unique index still backs up a stale negative from the filter
+            exists = self.short_code_filter.might_contain(
+                url_create.custom_alias
+            ) and await self.url_repository.exists_by_short_code(
+                url_create.custom_alias
+            )
             if exists:
                 raise HTTPException(
                     status_code=status.HTTP_409_CONFLICT,
-                    detail="Custom alias already in use",
+                    detail=ALIAS_IN_USE_DETAIL,
                 )
 
             short_code = url_create.custom_alias
@@ -56,20 +157,196 @@ class URLService:
             short_code = await self._generate_short_code()
             is_custom = False
 
-        url_db = URL.model_validate(
-            {
-                "original_url": str(url_create.original_url),
-                "short_code": short_code,
-                "is_custom": is_custom,
-                "created_at": datetime.utcnow(),
-            }
-        )
+        for attempt in range(1, self.max_code_attempts + 1):
+            url_db = URL.model_validate(
+                {
+                    "original_url": str(url_create.original_url),
+                    "short_code": short_code,
+                    "is_custom": is_custom,
+                    "created_at": datetime.utcnow(),
+                    "redirect_status": url_create.redirect_status,
+                    "expires_at": url_create.expires_at,
+                }
+            )
 
-        created_url = self.url_repository.create(url_db)
+            try:
+                created_url = await self.url_repository.create(url_db)
+                break
+            except IntegrityError:
+                # The unique index on short_code is the only collision check
+                # for generated codes: they can only clash with a custom alias
+                # (or a legacy random code) that already took the same value
+                await self.url_repository.rollback()
+                if is_custom:
+                    raise HTTPException(
+                        status_code=status.HTTP_409_CONFLICT,
+                        detail=ALIAS_IN_USE_DETAIL,
+                    )
+                if attempt == self.max_code_attempts:
+                    raise
+                short_code = await self._generate_short_code()
 
+        self.short_code_filter.add(created_url.short_code)
+        self.leaderboard.add(created_url)
         base_url = str(request.base_url)
         return await self._create_url_response(created_url, base_url)
 
+    async def create_short_urls(
+        self, url_creates: List[URLCreate], request: Request
+    ) -> List[URLBatchResult]:
+        """
+        Create many short URLs at once. Items are deduplicated within the batch
+        and against existing rows with a single lookup, inserted with multi-row
+        INSERTs in one transaction and reported in input order.
+        """
+        if len(url_creates) > BATCH_SHORTEN_MAX_ITEMS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"A batch can contain at most {BATCH_SHORTEN_MAX_ITEMS} URLs",
+            )
+
+        base_url = str(request.base_url)
+        results: List[Optional[URLBatchResult]] = [None] * len(url_creates)
+        original_urls = [str(item.original_url) for item in url_creates]
+
+        existing_urls = await self.url_repository.get_for_batch(
+            {
+                url
+                for url, item in zip(original_urls, url_creates)
+                if not item.custom_alias
+            },
+            {item.custom_alias for item in url_creates if item.custom_alias},
+        )
+        taken_codes = {url.short_code for url in existing_urls}
+        existing_by_original = {
+            (normalize_url(url.original_url), url.redirect_status, url.expires_at): url
+            for url in existing_urls
+        }
+
+        # short_code -> row to insert, and the input indexes it answers
+        pending: Dict[str, Dict[str, Any]] = {}
+        pending_indexes: Dict[str, List[int]] = {}
+        # (normalized original_url, redirect_status, expires_at) -> input
+        # indexes still waiting for a generated code
+        to_generate: Dict[Tuple[str, Optional[int], Optional[datetime]], List[int]] = {}
+
+        for index, item in enumerate(url_creates):
+            original_url = original_urls[index]
+            key = (normalize_url(original_url), item.redirect_status, item.expires_at)
+            alias = item.custom_alias
+            if alias:
+                if not self._is_valid_custom_alias(alias):
+                    results[index] = URLBatchResult(
+                        index=index, status="invalid", detail=INVALID_ALIAS_DETAIL
+                    )
+                elif alias in taken_codes or alias in pending:
+                    results[index] = URLBatchResult(
+                        index=index, status="conflict", detail=ALIAS_IN_USE_DETAIL
+                    )
+                else:
+                    pending[alias] = self._new_url_row(
+                        original_url,
+                        alias,
+                        True,
+                        item.redirect_status,
+                        item.expires_at,
+                    )
+                    pending_indexes[alias] = [index]
+            elif key in existing_by_original:
+                results[index] = URLBatchResult(
+                    index=index,
+                    status="existing",
+                    url=await self._create_url_response(
+                        existing_by_original[key], base_url
+                    ),
+                )
+            else:
+                to_generate.setdefault(key, []).append(index)
+
+        for (_, redirect_status, expires_at), indexes in to_generate.items():
+            short_code = await self._generate_short_code()
+            while short_code in taken_codes or short_code in pending:
+                short_code = await self._generate_short_code()
+            # The link keeps the spelling of the first item asking for it
+            pending[short_code] = self._new_url_row(
+                original_urls[indexes[0]],
+                short_code,
+                False,
+                redirect_status,
+                expires_at,
+            )
+            pending_indexes[short_code] = indexes
+
+        ids: Dict[str, int] = {}
+        for attempt in range(1, self.max_code_attempts + 1):
+            if not pending:
+                break
+            try:
+                ids = await self.url_repository.create_many(list(pending.values()))
+                break
+            except IntegrityError:
+                # A concurrent insert took one of the codes after the lookup
+                await self.url_repository.rollback()
+                if attempt == self.max_code_attempts:
+                    raise
+                clashes = await self.url_repository.get_taken_short_codes(pending)
+                for short_code in clashes:
+                    row = pending.pop(short_code)
+                    indexes = pending_indexes.pop(short_code)
+                    if row["is_custom"]:
+                        results[indexes[0]] = URLBatchResult(
+                            index=indexes[0],
+                            status="conflict",
+                            detail=ALIAS_IN_USE_DETAIL,
+                        )
+                        continue
+                    new_code = await self._generate_short_code()
+                    while new_code in clashes or new_code in pending:
+                        new_code = await self._generate_short_code()
+                    row["short_code"] = new_code
+                    pending[new_code] = row
+                    pending_indexes[new_code] = indexes
+
+        for short_code, row in pending.items():
+            if short_code not in ids:
+                # Lost with a shard whose commit failed after others committed
+                for index in pending_indexes[short_code]:
+                    results[index] = URLBatchResult(
+                        index=index, status="failed", detail=NOT_SAVED_DETAIL
+                    )
+                continue
+            url_db = URL.model_validate({**row, "id": ids[short_code]})
+            self.short_code_filter.add(short_code)
+            self.leaderboard.add(url_db)
+            response = await self._create_url_response(url_db, base_url)
+            first, *duplicates = pending_indexes[short_code]
+            results[first] = URLBatchResult(index=first, status="created", url=response)
+            for index in duplicates:
+                results[index] = URLBatchResult(
+                    index=index, status="existing", url=response
+                )
+
+        return results
+
+    def _new_url_row(
+        self,
+        original_url: str,
+        short_code: str,
+        is_custom: bool,
+        redirect_status: Optional[int] = None,
+        expires_at: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        return {
+            "original_url": original_url,
+            "short_code": short_code,
+            "is_custom": is_custom,
+            "clicks": 0,
+            "created_at": datetime.utcnow(),
+            "is_deleted": False,
+            "redirect_status": redirect_status,
+            "expires_at": expires_at,
+        }
+
     def _is_valid_custom_alias(self, alias: str) -> bool:
         if not 4 <= len(alias) <= 20:
             return False
@@ -77,38 +354,83 @@ class URLService:
         return bool(re.match(r"^[a-zA-Z0-9_]+$", alias))
 
     async def get_short_url(self, short_code: str, request: Request) -> URLResponse:
-        url_db = self._get_url_by_short_code(short_code)
+        url_db = await self._get_url_by_short_code(short_code, replica=True)
         base_url = str(request.base_url)
         return await self._create_url_response(url_db, base_url)
 
     async def update_short_url(
         self, short_code: str, url_update: URLUpdate, request: Request
     ) -> URLResponse:
-        url_db = self._get_url_by_short_code(short_code)
+        url_db = await self._get_url_by_short_code(short_code)
 
         if url_update.original_url:
             url_db.original_url = str(url_update.original_url)
+        if "redirect_status" in url_update.model_fields_set:
+            url_db.redirect_status = url_update.redirect_status
+        if "expires_at" in url_update.model_fields_set:
+            url_db.expires_at = url_update.expires_at
 
-        updated_url = self.url_repository.update(url_db)
+        updated_url = await self.url_repository.update(url_db)
+        self.redirect_cache.invalidate(short_code)
+        self.leaderboard.update(updated_url)
         base_url = str(request.base_url)
         return await self._create_url_response(updated_url, base_url)
 
     async def delete_short_url(self, short_code: str, request: Request) -> URLResponse:
-        url_db = self._get_url_by_short_code(short_code)
-        deleted_url = self.url_repository.delete(url_db)
+        url_db = await self._get_url_by_short_code(short_code)
+        deleted_url = await self.url_repository.delete(url_db)
+        self.redirect_cache.invalidate(short_code)
+        self.leaderboard.discard(short_code)
         base_url = str(request.base_url)
         return await self._create_url_response(deleted_url, base_url)
 
-    def get_original_url(self, short_code: str, request: Request) -> str:
-        url_db = self._get_url_by_short_code(short_code)
+    async def get_original_url(
+        self, short_code: str, request: Request
+    ) -> RedirectTarget:
+        target = await self.redirect_cache.get_or_load(
+            short_code, lambda: self._load_original_url(short_code)
+        )
 
-        url_db.clicks += 1
-        self.url_repository.update(url_db)
+        if target is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="URL not found"
+            )
+        # The expiry is cached with the target: no query to tell it is gone
+        if target.is_expired():
+            raise HTTPException(status_code=status.HTTP_410_GONE, detail="URL expired")
+
+        self.click_buffer.record(short_code)
+        self.click_events.record(short_code)
+        if self.click_buffer.is_flush_due():
+            await self.click_buffer.flush(self.url_repository)
 
-        return url_db.original_url
+        return target
 
-    def _get_url_by_short_code(self, short_code: str) -> URL:
-        url_db = self.url_repository.get_by_short_code(short_code)
+    async def _load_original_url(self, short_code: str) -> Optional[RedirectTarget]:
+        url_db = await self._find_url_by_short_code(short_code, replica=True)
+        if url_db is None:
+            return None
+        return redirect_target(
+            url_db.original_url, url_db.redirect_status, url_db.expires_at
+        )
+
+    async def _find_url_by_short_code(
+        self, short_code: str, replica: bool = False
+    ) -> Optional[URL]:
+        # Codes the filter has never seen are answered without a query
+        if not self.short_code_filter.might_exist(short_code):
+            return None
+        url_db = await self.url_repository.get_by_short_code(
+            short_code, replica=replica
+        )
+        if url_db is None:
+            self.short_code_filter.record_false_positive(short_code)
+        return url_db
+
+    async def _get_url_by_short_code(
+        self, short_code: str, replica: bool = False
+    ) -> URL:
+        url_db = await self._find_url_by_short_code(short_code, replica=replica)
 
         if not url_db:
             raise HTTPException(
@@ -116,17 +438,20 @@ class URLService:
             )
         return url_db
 
-    def _generate_short_code(self) -> str:
+    async def _generate_short_code(self) -> str:
         while True:
-            chars = string.ascii_letters + string.digits
-            short_code = "".join(random.choice(chars) for _ in range(self.code_length))
-
-            exists = self.url_repository.exists_by_short_code(short_code)
-
+            short_code = await self.short_code_generator.next_code(self.url_repository)
+            # Codes unique by construction can only clash with an alias, which
+            # the unique index catches on insert
+            if not self.short_code_generator.needs_existence_check:
+                return short_code
+            exists = self.short_code_filter.might_contain(
+                short_code
+            ) and await self.url_repository.exists_by_short_code(short_code)
             if not exists:
                 return short_code
 
-    def _create_url_response(self, url_db: URL, base_url: str) -> URLResponse:
+    async def _create_url_response(self, url_db: URL, base_url: str) -> URLResponse:
         return URLResponse(
             id=url_db.id,
             original_url=url_db.original_url,
@@ -136,4 +461,6 @@ class URLService:
             clicks=url_db.clicks,
             created_at=url_db.created_at,
             updated_at=url_db.updated_at,
+            redirect_status=url_db.redirect_status,
+            expires_at=url_db.expires_at,
         )
@@ -0,0 +1,305 @@
+"""
+Python benchmark suite for the URL Shortener API.
+
+Runs a set of workload scenarios against a running server (or an in-process
+server on an in-memory SQLite database), reports throughput and latency
+percentiles per scenario, saves them as JSON and compares them with a stored
+baseline.
+
+    python performance_tests/benchmark.py --inmemory
+    python performance_tests/benchmark.py --base-url http://localhost:8000 \\
+        --scenarios redirect,shorten --output results.json --baseline baseline.json
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import platform
+import random
+import sys
+import time
+import uuid
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+# Relative increase in latency (or drop in throughput) flagged as a regression
+DEFAULT_TOLERANCE = 0.2
+COMPARED_METRICS = {
+    "throughput_rps": "higher",
+    "p50_ms": "lower",
+    "p95_ms": "lower",
+    "p99_ms": "lower",
+}
+
+Request = Callable[[httpx.AsyncClient], Awaitable[httpx.Response]]
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def zipf_weights(count: int, exponent: float) -> List[float]:
+    """Cumulative weights of a Zipf distribution over ``count`` ranks"""
+    return list(
+        itertools.accumulate(1 / rank**exponent for rank in range(1, count + 1))
+    )
+
+
+def unique_url() -> str:
+    return f"https://bench.example.com/{uuid.uuid4().hex}"
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    make_request: Request,
+    expected_status: int,
+    requests: int,
+    concurrency: int,
+) -> Dict[str, Any]:
+    """Issue ``requests`` requests from ``concurrency`` workers and time each"""
+    latencies: List[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker() -> None:
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                response = await make_request(client)
+                ok = response.status_code == expected_status
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            if not ok:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+    }
+
+
+async def seed_urls(client: httpx.AsyncClient, count: int) -> List[str]:
+    """Create ``count`` URLs through the batch endpoint and return their codes"""
+    codes = []
+    for start in range(0, count, 1000):
+        batch = [
+            {"original_url": unique_url()} for _ in range(min(1000, count - start))
+        ]
+        response = await client.post("/api/urls/shorten/batch", json=batch)
+        response.raise_for_status()
+        codes.extend(item["url"]["short_code"] for item in response.json())
+    return codes
+
+
+async def scenario_redirect(client, args) -> Dict[str, Any]:
+    """Redirect-heavy traffic with Zipf-distributed popularity"""
+    codes = await seed_urls(client, args.urls)
+    cum_weights = zipf_weights(len(codes), args.zipf_exponent)
+    rng = random.Random(args.seed)
+
+    def make_request(client):
+        (code,) = rng.choices(codes, cum_weights=cum_weights)
+        return client.get(f"/{code}")
+
+    return await run_load(
+        client, make_request, 307, args.requests * 5, args.concurrency
+    )
+
+
+async def scenario_shorten(client, args) -> Dict[str, Any]:
+    """Creation of unique URLs, one per request"""
+
+    def make_request(client):
+        return client.post("/api/urls/shorten", json={"original_url": unique_url()})
+
+    return await run_load(client, make_request, 201, args.requests, args.concurrency)
+
+
+async def scenario_batch(client, args) -> Dict[str, Any]:
+    """Batch creation of unique URLs"""
+
+    def make_request(client):
+        batch = [{"original_url": unique_url()} for _ in range(args.batch_size)]
+        return client.post("/api/urls/shorten/batch", json=batch)
+
+    result = await run_load(
+        client,
+        make_request,
+        200,
+        max(1, args.requests // 10),
+        args.concurrency,
+    )
+    result["urls_per_s"] = round(result["throughput_rps"] * args.batch_size, 1)
+    return result
+
+
+async def scenario_listing(client, args) -> Dict[str, Any]:
+    """Listing pages of 100 URLs, walking the cursor chain"""
+    await seed_urls(client, args.urls)
+    cursor: Optional[str] = None
+
+    async def make_request(client):
+        nonlocal cursor
+        params = {"limit": 100}
+        if cursor:
+            params["cursor"] = cursor
+        response = await client.get("/api/urls/", params=params)
+        cursor = response.headers.get("x-next-cursor")
+        return response
+
+    return await run_load(client, make_request, 200, args.requests, args.concurrency)
+
+
+async def scenario_analytics(client, args) -> Dict[str, Any]:
+    """Dashboard polling of the summary and the most clicked URLs"""
+    paths = itertools.cycle(["/api/analytics/summary", "/api/analytics/urls"])
+
+    def make_request(client):
+        return client.get(next(paths))
+
+    return await run_load(client, make_request, 200, args.requests, args.concurrency)
+
+
+SCENARIOS = {
+    "redirect": scenario_redirect,
+    "shorten": scenario_shorten,
+    "batch": scenario_batch,
+    "listing": scenario_listing,
+    "analytics": scenario_analytics,
+}
+
+
+def compare(
+    results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float
+) -> List[str]:
+    """Describe every metric that regressed by more than ``tolerance``"""
+    regressions = []
+    for name, result in results["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            continue
+        for metric, better in COMPARED_METRICS.items():
+            old, new = base.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (better == "lower" and change > tolerance) or (
+                better == "higher" and change < -tolerance
+            ):
+                regressions.append(f"{name}.{metric}: {old} -> {new} ({change:+.0%})")
+    return regressions
+
+
+def print_table(results: Dict[str, Any]) -> None:
+    columns = ["requests", "errors", "throughput_rps", "p50_ms", "p95_ms", "p99_ms"]
+    print(f"{'scenario':<10}" + "".join(f"{column:>16}" for column in columns))
+    for name, result in results["scenarios"].items():
+        print(f"{name:<10}" + "".join(f"{result[column]:>16}" for column in columns))
+
+
+async def run_benchmarks(args) -> Dict[str, Any]:
+    results = {
+        "started_at": datetime.utcnow().isoformat(),
+        "base_url": args.base_url,
+        "python": platform.python_version(),
+        "settings": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "urls": args.urls,
+            "batch_size": args.batch_size,
+            "zipf_exponent": args.zipf_exponent,
+        },
+        "scenarios": {},
+    }
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=30) as client:
+        for name in args.scenarios:
+            print(f"Running {name}: {SCENARIOS[name].__doc__}")
+            results["scenarios"][name] = await SCENARIOS[name](client, args)
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument(
+        "--inmemory",
+        action="store_true",
+        help="start the app in-process on an in-memory SQLite database",
+    )
+    parser.add_argument(
+        "--scenarios",
+        default=",".join(SCENARIOS),
+        type=lambda value: value.split(","),
+        help=f"comma-separated subset of: {', '.join(SCENARIOS)}",
+    )
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--urls", type=int, default=1000, help="URLs to seed")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--zipf-exponent", type=float, default=1.1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against this results file")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    if args.inmemory:
+        from run_with_inmemory import run_server_with_inmemory
+
+        server = run_server_with_inmemory()
+    else:
+        server = nullcontext()
+
+    with server:
+        results = asyncio.run(run_benchmarks(args))
+
+    print_table(results)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.tolerance)
+        if regressions:
+            print(f"Regressions beyond {args.tolerance:.0%} of {args.baseline}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%} of {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
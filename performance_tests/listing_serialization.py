@@ -0,0 +1,139 @@
+"""
+Serialization cost of URL listings.
+
+Times one page of ``GET /api/urls`` from query to encoded body on an
+in-memory SQLite database, for several page sizes, two ways:
+
+- validated: the previous path, loading URL models, building a URLResponse
+  per row and letting FastAPI re-validate the list against the
+  response_model before encoding it with the standard json module
+- fast: the current path, selecting URL_RESPONSE_COLUMNS as plain rows,
+  building dicts and encoding them once with orjson
+
+    python performance_tests/listing_serialization.py --sizes 10,100,1000,10000
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from datetime import datetime
+from typing import Callable, List
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlmodel import Session, SQLModel, create_engine, insert, select
+from sqlmodel.pool import StaticPool
+
+from app.database.url_repository import URL_RESPONSE_COLUMNS
+from app.models.url import URL, URLResponse
+from app.services.url_service import url_payloads
+
+BASE_URL = "http://bench/"
+RESPONSE_FIELD = create_response_field(name="response", type_=List[URLResponse])
+
+
+def seed(engine, count: int) -> None:
+    now = datetime.utcnow()
+    rows = [
+        {
+            "original_url": f"https://bench.example.com/{i}",
+            "short_code": f"code{i}",
+            "is_custom": False,
+            "clicks": i,
+            "created_at": now,
+            "updated_at": now,
+            "is_deleted": False,
+        }
+        for i in range(count)
+    ]
+    with Session(engine) as session:
+        for start in range(0, count, 1000):
+            session.exec(insert(URL).values(rows[start : start + 1000]))
+        session.commit()
+
+
+async def validated_page(engine, size: int) -> bytes:
+    with Session(engine) as session:
+        urls = session.exec(
+            select(URL)
+            .where(URL.is_deleted == False)  # noqa: E712
+            .order_by(URL.id)
+            .limit(size)
+        ).all()
+    responses = [
+        URLResponse(
+            id=url.id,
+            original_url=url.original_url,
+            short_code=url.short_code,
+            short_url=f"{BASE_URL}{url.short_code}",
+            is_custom=url.is_custom,
+            clicks=url.clicks,
+            created_at=url.created_at,
+            updated_at=url.updated_at,
+            redirect_status=url.redirect_status,
+        )
+        for url in urls
+    ]
+    content = await serialize_response(field=RESPONSE_FIELD, response_content=responses)
+    return JSONResponse(content).body
+
+
+async def fast_page(engine, size: int) -> bytes:
+    with Session(engine) as session:
+        rows = session.exec(
+            select(*URL_RESPONSE_COLUMNS)
+            .where(URL.is_deleted == False)  # noqa: E712
+            .order_by(URL.id)
+            .limit(size)
+        ).all()
+    return ORJSONResponse(url_payloads(rows, BASE_URL)).body
+
+
+async def time_page(page: Callable, engine, size: int, repeats: int) -> float:
+    """Mean milliseconds per page"""
+    await page(engine, size)  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        await page(engine, size)
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+async def run(engine, sizes: List[int]) -> None:
+    # Both paths must produce the same document
+    for size in sizes:
+        fast = json.loads(await fast_page(engine, size))
+        assert fast == json.loads(await validated_page(engine, size))
+
+    print(f"{'rows':>6}{'validated ms':>15}{'fast ms':>10}{'speedup':>10}")
+    for size in sizes:
+        repeats = max(5, 20000 // size)
+        validated = await time_page(validated_page, engine, size, repeats)
+        fast = await time_page(fast_page, engine, size, repeats)
+        print(f"{size:>6}{validated:>15.3f}{fast:>10.3f}{validated / fast:>9.1f}x")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--sizes",
+        default="10,100,1000,10000",
+        type=lambda value: [int(size) for size in value.split(",")],
+        help="comma-separated page sizes",
+    )
+    args = parser.parse_args(argv)
+
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    seed(engine, max(args.sizes))
+
+    asyncio.run(run(engine, args.sizes))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""
+Per-request overhead of the redirect fast path.
+
+Serves ``GET /{short_code}`` in-process (no network, no server) on an
+in-memory SQLite database, once through the regular route and once through
+the fast path, for cache hits and for cache misses, and reports the mean time
+per request in microseconds.
+
+    python performance_tests/redirect_overhead.py --requests 5000
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+from sqlmodel import SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+
+from app.controller import redirect_controller
+from app.database import db
+from app.main import app
+from app.services.redirect_cache import redirect_cache
+from app.services.short_code_filter import short_code_filter
+
+
+async def seed(client: httpx.AsyncClient, count: int) -> List[str]:
+    batch = [{"original_url": f"https://bench.example.com/{i}"} for i in range(count)]
+    response = await client.post("/api/urls/shorten/batch", json=batch)
+    response.raise_for_status()
+    return [item["url"]["short_code"] for item in response.json()]
+
+
+async def time_redirects(
+    client: httpx.AsyncClient, codes: List[str], requests: int, cached: bool
+) -> float:
+    """Mean microseconds per redirect, run sequentially to measure overhead only"""
+    total = 0.0
+    for i in range(requests):
+        code = codes[i % len(codes)]
+        if not cached:
+            redirect_cache.invalidate(code)
+        start = time.perf_counter()
+        response = await client.get(f"/{code}")
+        total += time.perf_counter() - start
+        assert response.status_code == 307, response.status_code
+    return total / requests * 1_000_000
+
+
+async def run(args) -> Dict[str, Dict[str, float]]:
+    results: Dict[str, Dict[str, float]] = {}
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        codes = await seed(client, args.urls)
+        for path, fast_path in (("regular", False), ("fast path", True)):
+            redirect_controller.REDIRECT_FAST_PATH = fast_path
+            redirect_cache.clear()
+            # Warm-up: compile statements, fill the pool and the cache
+            await time_redirects(client, codes, len(codes), cached=True)
+            results[path] = {
+                "cache hit": await time_redirects(
+                    client, codes, args.requests, cached=True
+                ),
+                "cache miss": await time_redirects(
+                    client, codes, args.requests, cached=False
+                ),
+            }
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--urls", type=int, default=100, help="URLs to seed")
+    args = parser.parse_args(argv)
+
+    db.engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(db.engine)
+    # Without the startup hooks the filter never becomes ready and lets
+    # every lookup through, which is what a cache miss should measure
+    short_code_filter.clear()
+
+    results = asyncio.run(run(args))
+
+    print(f"{'us/request':<12}{'regular':>12}{'fast path':>12}{'saved':>10}")
+    for case in ("cache hit", "cache miss"):
+        regular, fast = results["regular"][case], results["fast path"][case]
+        print(
+            f"{case:<12}{regular:>12.1f}{fast:>12.1f}"
+            f"{(regular - fast) / regular:>10.0%}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
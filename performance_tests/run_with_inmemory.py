@@ -7,8 +7,10 @@ import uvicorn
 from sqlmodel import Session, SQLModel, create_engine
 from sqlmodel.pool import StaticPool
 
+from app.database import db
 from app.database.db import get_session
 from app.main import app
+from app.services import admission_control
 
 # Create in-memory SQLite database
 engine = create_engine(
@@ -26,6 +28,10 @@ def get_test_session():
 
 
 app.dependency_overrides[get_session] = get_test_session
+# Startup hooks and background jobs open their own sessions on db.engine
+db.engine = engine
+# Every benchmark request comes from one client: do not rate limit it
+admission_control.shorten_rate_limiter = admission_control.TokenBucketLimiter(rate=0)
 
 
 # Start server in a separate thread with in-memory database
@@ -10,7 +10,7 @@ export default function () {
   const url = 'http://localhost:8000/api/urls/shorten';
   const payload = JSON.stringify({
     original_url: 'https://example.com',
-    custom_code: '', 
+    custom_alias: null,
   });
 
   const params = {
@@ -0,0 +1,155 @@
+"""
+Time from process start until a worker has served its first request.
+
+Starts fresh interpreters against an already migrated SQLite database (as
+on a restart or a scale-out replica) for each DB_SCHEMA_CHECK mode, and
+reports the median import, startup hook and first request times, the wall
+time from spawning the process until it is ready, and the statements the
+startup hook ran.
+
+    python performance_tests/startup_time.py --runs 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from sqlalchemy import text
+from sqlmodel import SQLModel, create_engine
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from app.database.schema import migration_heads  # noqa: E402
+from app.main import app as _app  # noqa: E402,F401  (registers every model)
+
+WORKER = """
+import asyncio, json, time
+start = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+
+from sqlalchemy import event
+from app.database import db
+
+statements = 0
+
+def count(*args):
+    global statements
+    statements += 1
+
+event.listen(db.async_engine.sync_engine, "before_cursor_execute", count)
+
+async def first_request():
+    # Plain ASGI call: a test client would add its own imports to the timing
+    messages = []
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/api/urls/", "raw_path": b"/api/urls/", "root_path": "",
+        "query_string": b"limit=1", "headers": [(b"host", b"bench")],
+        "server": ("bench", 80), "client": ("127.0.0.1", 1),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    assert messages[0]["status"] == 200, messages[0]["status"]
+
+async def main():
+    hooks = time.perf_counter()
+    await app.router.startup()
+    started = time.perf_counter()
+    startup_statements = statements
+    await first_request()
+    served = time.perf_counter()
+    ready_at = time.time()
+    await app.router.shutdown()
+    print(json.dumps({
+        "import_ms": (imported - start) * 1000,
+        "startup_ms": (started - hooks) * 1000,
+        "first_request_ms": (served - started) * 1000,
+        "statements": startup_statements,
+        "ready_at": ready_at,
+    }))
+
+asyncio.run(main())
+"""
+
+
+def prepare_database(path: str) -> None:
+    """Tables plus the Alembic head, as after alembic upgrade head"""
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(
+            text("CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL)")
+        )
+        for head in migration_heads():
+            connection.execute(
+                text("INSERT INTO alembic_version VALUES (:head)"), {"head": head}
+            )
+    engine.dispose()
+
+
+def start_worker(path: str, mode: str) -> Dict[str, float]:
+    env = {
+        **os.environ,
+        "PYTHONPATH": str(ROOT),
+        "DB_ASYNC": "true",
+        "ASYNC_DATABASE_URL": f"sqlite+aiosqlite:///{path}",
+        "DB_SCHEMA_CHECK": mode,
+    }
+    spawned_at = time.time()
+    output = subprocess.run(
+        [sys.executable, "-c", WORKER],
+        env=env,
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["ready_ms"] = (result.pop("ready_at") - spawned_at) * 1000
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--runs", type=int, default=5, help="workers per mode")
+    parser.add_argument(
+        "--modes", default="create,verify,skip", help="DB_SCHEMA_CHECK modes"
+    )
+    args = parser.parse_args(argv)
+
+    columns = ["import_ms", "startup_ms", "first_request_ms", "ready_ms"]
+    print(f"{'mode':<8}" + "".join(f"{c:>18}" for c in columns) + f"{'statements':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "startup.db")
+        prepare_database(path)
+        for mode in args.modes.split(","):
+            start_worker(path, mode)  # warm the bytecode and page caches
+            runs: List[Dict[str, float]] = [
+                start_worker(path, mode) for _ in range(args.runs)
+            ]
+            medians = [statistics.median(run[c] for run in runs) for c in columns]
+            print(
+                f"{mode:<8}"
+                + "".join(f"{value:>18.1f}" for value in medians)
+                + f"{runs[0]['statements']:>12}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
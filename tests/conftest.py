@@ -1,10 +1,43 @@
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel.pool import StaticPool
 
+from app.database import db
 from app.database.db import get_session
+from app.database.read_routing import recent_writes
 from app.main import app
+from app.services.admission_control import admission_controller, shorten_rate_limiter
+from app.services.click_buffer import click_buffer
+from app.services.click_events import click_events
+from app.services.leaderboard import leaderboard
+from app.services.redirect_cache import redirect_cache
+from app.services.redirect_snapshot import click_forwarder, redirect_snapshot
+from app.services.short_code_filter import short_code_filter
+from app.services.short_code_generator import short_code_generator
+from app.services.sql_profiler import sql_profiler
+from app.services.url_compaction import url_compactor
+from app.services.url_expiry import url_reaper
+
+
+def reset_process_state():
+    # Process-wide caches must not leak entries between test databases
+    redirect_cache.clear()
+    redirect_snapshot.clear()
+    click_forwarder.clear()
+    click_buffer.clear()
+    click_events.clear()
+    leaderboard.clear()
+    short_code_generator.reset()
+    url_compactor.clear()
+    url_reaper.clear()
+    short_code_filter.clear()
+    sql_profiler.clear()
+    recent_writes.clear()
+    admission_controller.clear()
+    shorten_rate_limiter.clear()
 
 
 # Create in-memory SQLite database for testing
@@ -25,12 +58,65 @@ def test_session(test_db_engine):
 
 
 @pytest.fixture
-def client(test_db_engine, test_session):
+def client(test_db_engine, test_session, monkeypatch):
     # Override get_session with our test session
     def get_test_session():
         return test_session
 
     app.dependency_overrides[get_session] = get_test_session
+    # Startup hooks and background jobs open their own sessions on db.engine
+    monkeypatch.setattr(db, "engine", test_db_engine)
+    reset_process_state()
+
+    with TestClient(app) as client:
+        yield client
+
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def sharded_client(test_db_engine, test_session, tmp_path, monkeypatch):
+    # Same app with the urls table partitioned across three SQLite files;
+    # the main database keeps the counters and click events
+    shard_engines = [
+        create_engine(f"sqlite:///{tmp_path / f'shard{index}.db'}")
+        for index in range(3)
+    ]
+
+    def get_test_session():
+        return test_session
+
+    app.dependency_overrides[get_session] = get_test_session
+    monkeypatch.setattr(db, "engine", test_db_engine)
+    monkeypatch.setattr(db, "shard_engines", shard_engines)
+    reset_process_state()
+
+    with TestClient(app) as client:
+        yield client
+
+    app.dependency_overrides.clear()
+    for engine in shard_engines:
+        engine.dispose()
+
+
+@pytest.fixture
+def async_client(monkeypatch):
+    # Same app, served through an aiosqlite engine as with DB_ASYNC=true;
+    # the startup hook creates the tables on this engine
+    engine = create_async_engine(
+        "sqlite+aiosqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+
+    async def get_test_session():
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = get_test_session
+    monkeypatch.setattr(db, "async_engine", engine)
+    reset_process_state()
+    short_code_generator.reset()
 
     with TestClient(app) as client:
         yield client
@@ -0,0 +1,102 @@
+import asyncio
+
+from app.controller import metrics_controller
+from app.services import admission_control
+from app.services.admission_control import (
+    ADMISSION_MAX_CONCURRENCY,
+    ROUTE_LIMITS,
+    AdmissionController,
+    TokenBucketLimiter,
+    classify,
+)
+
+
+def test_requests_are_classified_by_route():
+    """Test redirects, API calls, listings and analytics get their own limits"""
+    assert classify("GET", "/abc123") == "redirect"
+    assert classify("GET", "/api/urls/") == "listing"
+    assert classify("POST", "/api/urls/shorten") == "shorten"
+    assert classify("POST", "/api/urls/shorten/batch") == "shorten"
+    assert classify("GET", "/api/urls/abc123") == "urls"
+    assert classify("GET", "/api/analytics/summary") == "analytics"
+    for path in ("/", "/metrics", "/docs", "/openapi.json", "/api/metrics/cache"):
+        assert classify("GET", path) is None
+    # Some slots are left to redirects even with every other class saturated
+    others = sum(limit for name, limit in ROUTE_LIMITS.items() if name != "redirect")
+    assert others < ADMISSION_MAX_CONCURRENCY
+
+
+def test_freed_slots_go_to_redirects_first_and_waits_time_out():
+    """Test queued redirects are admitted before listings, which time out"""
+    controller = AdmissionController(
+        enabled=True, max_concurrency=1, max_queue=1, queue_timeout=0.2
+    )
+
+    async def scenario():
+        assert await controller.acquire("listing") is None
+        listing = asyncio.create_task(controller.acquire("listing"))
+        redirect = asyncio.create_task(controller.acquire("redirect"))
+        await asyncio.sleep(0)
+        # The listing queue holds one request
+        assert await controller.acquire("listing") == "queue_full"
+
+        controller.release("listing")
+        assert await redirect is None
+        assert await listing == "timeout"
+        controller.release("redirect")
+        assert await controller.acquire("listing") is None
+
+    asyncio.run(scenario())
+    stats = controller.stats()
+    assert stats["active"] == 1
+    assert stats["listing_queued"] == stats["redirect_queued"] == 0
+    assert stats["listing_rejected_queue_full"] == 1
+    assert stats["listing_rejected_timeout"] == 1
+    assert stats["redirect_admitted"] == 1
+
+
+def test_overloaded_routes_fail_fast_with_retry_after(client, monkeypatch):
+    """Test a saturated route class gets 503 while redirects are still served"""
+    controller = AdmissionController(
+        enabled=True, route_limits={"listing": 0}, max_queue=0, retry_after=2
+    )
+    monkeypatch.setattr(admission_control, "admission_controller", controller)
+    client.post(
+        "/api/urls/shorten",
+        json={"original_url": "https://example.com", "custom_alias": "shed"},
+    )
+
+    response = client.get("/api/urls/")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "2"
+    assert response.json() == {"detail": "Service overloaded, retry later"}
+    assert client.get("/shed", follow_redirects=False).status_code == 307
+    assert client.get("/api/metrics/cache").status_code == 200
+    assert controller.stats()["listing_rejected_queue_full"] == 1
+    assert controller.stats()["active"] == 0
+
+
+def test_shorten_is_rate_limited_per_client(client, monkeypatch):
+    """Test each client gets its own token bucket, with or without admission control"""
+    limiter = TokenBucketLimiter(rate=0.5, burst=2)
+    monkeypatch.setattr(admission_control, "shorten_rate_limiter", limiter)
+    monkeypatch.setattr(metrics_controller, "shorten_rate_limiter", limiter)
+    monkeypatch.setattr(admission_control, "RATE_LIMIT_CLIENT_HEADER", "x-client")
+
+    def shorten(client_id):
+        return client.post(
+            "/api/urls/shorten",
+            json={"original_url": "https://example.com"},
+            headers={"X-Client": client_id},
+        )
+
+    assert [shorten("a").status_code for _ in range(3)] == [201, 201, 429]
+    limited = shorten("a")
+    assert limited.headers["retry-after"] == "2"
+    assert shorten("b").status_code == 201
+
+    stats = client.get("/api/metrics/admission").json()
+    assert stats["shorten_rate_limited"] == 2
+    assert stats["shorten_rate_clients"] == 2
+    # Admission control itself is off by default
+    assert stats["shorten_admitted"] == 0
@@ -0,0 +1,66 @@
+import asyncio
+
+from sqlmodel import select
+
+from app.database.url_repository import URLRepository
+from app.models.analytics_counter import AnalyticsCounter
+from app.services.click_buffer import click_buffer
+
+
+def test_summary_counters_follow_creates_clicks_and_deletes(client, monkeypatch):
+    """Test the summary is maintained by writes instead of aggregate scans"""
+    client.get("/api/analytics/summary")  # initialises the counters
+
+    async def no_scans(self):
+        raise AssertionError("summary must not scan the urls table")
+
+    for name in ("count_urls", "count_total_clicks", "count_custom_urls"):
+        monkeypatch.setattr(URLRepository, name, no_scans)
+
+    client.post("/api/urls/shorten", json={"original_url": "https://example.com/a"})
+    client.post(
+        "/api/urls/shorten",
+        json={"original_url": "https://example.com/b", "custom_alias": "custom_b"},
+    )
+    client.post(
+        "/api/urls/shorten/batch",
+        json=[
+            {"original_url": "https://example.com/c"},
+            {"original_url": "https://example.com/d", "custom_alias": "custom_d"},
+        ],
+    )
+    for _ in range(3):
+        client.get("/custom_b", follow_redirects=False)
+    client.get("/custom_d", follow_redirects=False)
+    asyncio.run(click_buffer.flush())
+
+    summary = client.get("/api/analytics/summary").json()
+    assert summary == {"total_urls": 4, "total_clicks": 4, "total_custom_urls": 2}
+
+    client.delete("/api/urls/custom_b")
+
+    summary = client.get("/api/analytics/summary").json()
+    assert summary == {"total_urls": 3, "total_clicks": 1, "total_custom_urls": 1}
+
+
+def test_recompute_repairs_counter_drift(client, test_session):
+    """Test the admin recompute rebuilds counters from the urls table"""
+    client.post("/api/urls/shorten", json={"original_url": "https://example.com/a"})
+    client.get("/api/analytics/summary")
+
+    counter = test_session.exec(
+        select(AnalyticsCounter).where(AnalyticsCounter.name == "total_urls")
+    ).one()
+    counter.value = 42
+    test_session.add(counter)
+    test_session.commit()
+    assert client.get("/api/analytics/summary").json()["total_urls"] == 42
+
+    response = client.post("/api/analytics/counters/recompute")
+
+    assert response.json() == {
+        "total_urls": 1,
+        "total_clicks": 0,
+        "total_custom_urls": 0,
+    }
+    assert client.get("/api/analytics/summary").json()["total_urls"] == 1
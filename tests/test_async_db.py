@@ -0,0 +1,37 @@
+from fastapi import status
+
+from app.services.click_buffer import click_buffer
+
+
+def test_create_and_redirect_with_async_session(async_client):
+    """Test the URL flow works end to end on an AsyncSession"""
+    payload = {"original_url": "https://example.com/async", "custom_alias": None}
+    response = async_client.post("/api/urls/shorten", json=payload)
+    assert response.status_code == status.HTTP_201_CREATED
+    short_code = response.json()["short_code"]
+
+    duplicate = async_client.post("/api/urls/shorten", json=payload)
+    assert duplicate.json()["short_code"] == short_code
+
+    redirect = async_client.get(f"/{short_code}", follow_redirects=False)
+    assert redirect.headers["location"] == "https://example.com/async"
+
+
+def test_update_delete_and_analytics_with_async_session(async_client):
+    """Test writes, click flushes and aggregates run on an AsyncSession"""
+    payload = {"original_url": "https://example.com/a", "custom_alias": "async_alias"}
+    async_client.post("/api/urls/shorten", json=payload)
+    async_client.get("/async_alias", follow_redirects=False)
+    async_client.portal.call(click_buffer.flush)
+
+    response = async_client.put(
+        "/api/urls/async_alias", json={"original_url": "https://example.com/b"}
+    )
+    assert response.json()["original_url"] == "https://example.com/b"
+    assert response.json()["clicks"] == 1
+
+    summary = async_client.get("/api/analytics/summary").json()
+    assert summary == {"total_urls": 1, "total_clicks": 1, "total_custom_urls": 1}
+
+    async_client.delete("/api/urls/async_alias")
+    assert async_client.get("/api/urls/async_alias").status_code == 404
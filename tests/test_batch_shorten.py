@@ -0,0 +1,76 @@
+from fastapi import status
+
+from app.services.short_code_generator import encode_id
+
+
+def test_batch_shorten_dedupes_and_keeps_input_order(client):
+    """Test batch creation dedupes URLs and reports results in input order"""
+    existing = client.post(
+        "/api/urls/shorten", json={"original_url": "https://example.com/existing"}
+    ).json()
+    client.post(
+        "/api/urls/shorten",
+        json={"original_url": "https://example.com/x", "custom_alias": "taken"},
+    )
+
+    payload = [
+        {"original_url": "https://example.com/one"},
+        {"original_url": "https://example.com/existing"},
+        {"original_url": "https://example.com/one"},
+        {"original_url": "https://example.com/two", "custom_alias": "my_alias"},
+        {"original_url": "https://example.com/three", "custom_alias": "taken"},
+        {"original_url": "https://example.com/four", "custom_alias": "my_alias"},
+        {"original_url": "https://example.com/five", "custom_alias": "!!"},
+    ]
+    response = client.post("/api/urls/shorten/batch", json=payload)
+
+    assert response.status_code == status.HTTP_200_OK
+    results = response.json()
+    assert [result["index"] for result in results] == list(range(len(payload)))
+    assert [result["status"] for result in results] == [
+        "created",
+        "existing",
+        "existing",
+        "created",
+        "conflict",
+        "conflict",
+        "invalid",
+    ]
+    assert results[1]["url"]["short_code"] == existing["short_code"]
+    assert results[2]["url"]["short_code"] == results[0]["url"]["short_code"]
+    assert results[3]["url"]["short_code"] == "my_alias"
+    assert results[3]["url"]["is_custom"] is True
+
+    created = client.get(f"/api/urls/{results[0]['url']['short_code']}")
+    assert created.json()["original_url"] == "https://example.com/one"
+    assert created.json()["id"] == results[0]["url"]["id"]
+    assert len(client.get("/api/urls/").json()) == 4
+
+
+def test_batch_shorten_rejects_oversized_batches(client, monkeypatch):
+    """Test batches above the configured size are rejected"""
+    monkeypatch.setattr("app.services.url_service.BATCH_SHORTEN_MAX_ITEMS", 2)
+    payload = [{"original_url": f"https://example.com/{i}"} for i in range(3)]
+
+    response = client.post("/api/urls/shorten/batch", json=payload)
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_batch_shorten_replaces_generated_codes_taken_by_aliases(client):
+    """Test a generated code clashing with an existing alias is regenerated"""
+    client.post(
+        "/api/urls/shorten",
+        json={
+            "original_url": "https://example.com/alias",
+            "custom_alias": encode_id(0),
+        },
+    )
+
+    payload = [{"original_url": f"https://example.com/{i}"} for i in range(3)]
+    results = client.post("/api/urls/shorten/batch", json=payload).json()
+
+    assert [result["status"] for result in results] == ["created"] * 3
+    short_codes = {result["url"]["short_code"] for result in results}
+    assert encode_id(0) not in short_codes
+    assert len(short_codes) == 3
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from app.services.click_buffer import ClickBuffer, click_buffer
+
+
+def test_clicks_are_buffered_until_flush(client):
+    """Test redirects accumulate clicks in memory and flush them in one batch"""
+    payload = {"original_url": "https://example.com/clicks"}
+    short_code = client.post("/api/urls/shorten", json=payload).json()["short_code"]
+
+    for _ in range(3):
+        client.get(f"/{short_code}", follow_redirects=False)
+
+    assert click_buffer.pending(short_code) == 3
+    assert client.get(f"/api/urls/{short_code}").json()["clicks"] == 0
+
+    summary = client.get("/api/analytics/summary?include_pending=true").json()
+    assert summary["total_clicks"] == 3
+    top = client.get("/api/analytics/urls?include_pending=true").json()
+    assert top[0]["clicks"] == 3
+
+    assert asyncio.run(click_buffer.flush()) == 3
+    assert click_buffer.pending(short_code) == 0
+    assert client.get(f"/api/urls/{short_code}").json()["clicks"] == 3
+    assert client.get("/api/analytics/summary").json()["total_clicks"] == 3
+
+
+def test_flush_is_due_after_max_staleness():
+    """Test the buffer reports a flush is due once clicks are too old"""
+    buffer = ClickBuffer(flush_interval=0, max_staleness=0, max_pending=100)
+    assert not buffer.is_flush_due()
+
+    buffer.record("aaaa")
+    buffer.record("aaaa")
+
+    assert buffer.pending("aaaa") == 2
+    assert buffer.is_flush_due()
+
+
+def test_failed_flush_keeps_pending_clicks():
+    """Test clicks are re-queued when the batched update fails"""
+
+    class FailingRepository:
+        async def add_clicks(self, deltas):
+            raise RuntimeError("database unavailable")
+
+    buffer = ClickBuffer(flush_interval=0, max_staleness=60, max_pending=100)
+    buffer.record("aaaa", 2)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(buffer.flush(FailingRepository()))
+
+    assert buffer.pending("aaaa") == 2
+    assert buffer.stats()["failed_flushes"] == 1
@@ -0,0 +1,61 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlmodel import select
+
+from app.models.click_event import ClickEvent
+from app.services.click_events import click_events
+
+
+def test_timeseries_reads_hourly_and_daily_rollups(client):
+    """Test queued click events are rolled up into hour and day buckets"""
+    client.post(
+        "/api/urls/shorten",
+        json={"original_url": "https://example.com/ts", "custom_alias": "series"},
+    )
+    now = datetime.utcnow()
+    this_hour = now.replace(minute=0, second=0, microsecond=0)
+    click_events.record("series", this_hour - timedelta(hours=2))
+    click_events.record("series", this_hour - timedelta(hours=2))
+    for _ in range(3):
+        client.get("/series", follow_redirects=False)
+    asyncio.run(click_events.flush())
+
+    hourly = client.get("/api/analytics/series/timeseries").json()
+    clicks = {point["bucket_start"]: point["clicks"] for point in hourly["points"]}
+    assert hourly["granularity"] == "hour"
+    assert len(hourly["points"]) == 7 * 24
+    assert clicks[this_hour.isoformat()] == 3
+    assert clicks[(this_hour - timedelta(hours=2)).isoformat()] == 2
+    assert sum(clicks.values()) == 5
+
+    daily = client.get("/api/analytics/series/timeseries?granularity=day").json()
+    assert sum(point["clicks"] for point in daily["points"]) == 5
+
+
+def test_timeseries_rejects_oversized_ranges(client):
+    """Test ranges with too many buckets are rejected"""
+    response = client.get(
+        "/api/analytics/series/timeseries"
+        "?start=2000-01-01T00:00:00&end=2020-01-01T00:00:00"
+    )
+
+    assert response.status_code == 400
+
+
+def test_prune_removes_old_raw_events_but_keeps_rollups(client, test_session):
+    """Test retention deletes raw events while the rollups keep the history"""
+    old = datetime.utcnow() - timedelta(days=30)
+    click_events.record("series", old)
+    click_events.record("series")
+    asyncio.run(click_events.flush())
+
+    assert asyncio.run(click_events.prune()) == 1
+
+    remaining = test_session.exec(select(ClickEvent)).all()
+    assert len(remaining) == 1
+    daily = client.get(
+        "/api/analytics/series/timeseries?granularity=day"
+        f"&start={(old - timedelta(days=1)).isoformat()}"
+    ).json()
+    assert sum(point["clicks"] for point in daily["points"]) == 2
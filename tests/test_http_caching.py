@@ -0,0 +1,126 @@
+import asyncio
+
+from app.controller import redirect_controller
+from app.services import http_caching
+from app.services.click_buffer import click_buffer
+from app.services.http_caching import redirect_cache_control
+from app.services.redirect_cache import redirect_cache
+
+
+def test_redirect_status_per_link_and_global(client, monkeypatch):
+    """Test links follow the global status unless they set their own"""
+    monkeypatch.setattr(http_caching, "REDIRECT_STATUS_CODE", 302)
+    client.post(
+        "/api/urls/shorten",
+        json={"original_url": "https://example.com/a", "custom_alias": "default"},
+    )
+    client.post(
+        "/api/urls/shorten",
+        json={
+            "original_url": "https://example.com/b",
+            "custom_alias": "moved",
+            "redirect_status": 301,
+        },
+    )
+
+    for fast_path in (True, False):
+        monkeypatch.setattr(redirect_controller, "REDIRECT_FAST_PATH", fast_path)
+        redirect_cache.clear()
+        default = client.get("/default", follow_redirects=False)
+        moved = client.get("/moved", follow_redirects=False)
+        assert default.status_code == 302
+        assert moved.status_code == 301
+        assert moved.headers["location"] == "https://example.com/b"
+        assert moved.headers["cache-control"] == "private, no-store"
+
+    client.put("/api/urls/moved", json={"redirect_status": 307})
+    assert client.get("/moved", follow_redirects=False).status_code == 307
+    response = client.put("/api/urls/moved", json={"redirect_status": None})
+    assert response.json()["redirect_status"] is None
+    assert client.get("/moved", follow_redirects=False).status_code == 302
+
+    response = client.post(
+        "/api/urls/shorten",
+        json={"original_url": "https://example.com/c", "redirect_status": 308},
+    )
+    assert response.status_code == 422
+
+
+def test_links_with_another_status_are_not_deduplicated(client):
+    """Test shortening a URL again only reuses a link with the same status"""
+
+    def shorten(redirect_status):
+        payload = {
+            "original_url": "https://example.com/same",
+            "redirect_status": redirect_status,
+        }
+        return client.post("/api/urls/shorten", json=payload).json()["short_code"]
+
+    assert shorten(None) == shorten(None)
+    assert shorten(301) == shorten(301)
+    assert shorten(301) != shorten(None)
+
+    batch = client.post(
+        "/api/urls/shorten/batch",
+        json=[
+            {"original_url": "https://example.com/same", "redirect_status": 301},
+            {"original_url": "https://example.com/same", "redirect_status": 302},
+        ],
+    ).json()
+    assert [item["status"] for item in batch] == ["existing", "created"]
+    assert batch[0]["url"]["short_code"] == shorten(301)
+
+
+def test_redirect_cache_control_respects_click_tracking():
+    """Test shared caches may only keep redirects when clicks are not tracked"""
+    assert redirect_cache_control(0, True) == "private, no-store"
+    assert redirect_cache_control(0, False) == "private, no-store"
+    assert redirect_cache_control(60, True) == "private, max-age=60"
+    assert redirect_cache_control(60, False) == "public, max-age=60"
+
+
+def test_conditional_get_of_url(client):
+    """Test the ETag validator answers 304 until the URL or its clicks change"""
+    client.post(
+        "/api/urls/shorten",
+        json={"original_url": "https://example.com", "custom_alias": "etag"},
+    )
+    response = client.get("/api/urls/etag")
+    etag = response.headers["etag"]
+    assert "last-modified" not in response.headers
+    assert etag.startswith('W/"')
+    assert response.headers["cache-control"] == "no-cache"
+
+    not_modified = client.get("/api/urls/etag", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["etag"] == etag
+    # Flushed clicks change the body, and with it the ETag
+    client.get("/etag", follow_redirects=False)
+    asyncio.run(click_buffer.flush())
+    response = client.get("/api/urls/etag", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["clicks"] == 1
+
+    etag = response.headers["etag"]
+    client.put("/api/urls/etag", json={"original_url": "https://example.com/new"})
+    response = client.get("/api/urls/etag", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_if_modified_since_does_not_hide_clicks(client):
+    """Test a client revalidating by date alone still sees new clicks"""
+    client.post(
+        "/api/urls/shorten",
+        json={"original_url": "https://example.com", "custom_alias": "dated"},
+    )
+    client.get("/dated", follow_redirects=False)
+    asyncio.run(click_buffer.flush())
+
+    response = client.get(
+        "/api/urls/dated",
+        headers={"If-Modified-Since": "Fri, 01 Jan 2100 00:00:00 GMT"},
+    )
+    assert response.status_code == 200
+    assert response.json()["clicks"] == 1
@@ -0,0 +1,61 @@
+import asyncio
+
+from app.database.url_repository import URLRepository
+from app.services.click_buffer import click_buffer
+
+
+def click(client, short_code, times):
+    for _ in range(times):
+        client.get(f"/{short_code}", follow_redirects=False)
+
+
+def test_leaderboard_serves_top_urls_from_memory(client, monkeypatch):
+    """Test the top-N read is answered by the leaderboard once loaded"""
+    for alias, clicks in (("first", 5), ("second", 3), ("third", 1)):
+        client.post(
+            "/api/urls/shorten",
+            json={
+                "original_url": f"https://example.com/{alias}",
+                "custom_alias": alias,
+            },
+        )
+        click(client, alias, clicks)
+    asyncio.run(click_buffer.flush())
+    client.get("/api/analytics/urls")
+
+    async def no_sort(self, limit=10):
+        raise AssertionError("top-N must be served by the leaderboard")
+
+    monkeypatch.setattr(URLRepository, "get_most_clicked", no_sort)
+
+    click(client, "third", 10)
+    asyncio.run(click_buffer.flush())
+    top = client.get("/api/analytics/urls?limit=2").json()
+
+    assert [url["short_code"] for url in top] == ["third", "first"]
+    assert top[0]["clicks"] == 11
+    assert client.get("/api/metrics/leaderboard").json()["reads"] == 1
+
+
+def test_deleted_urls_drop_out_of_the_leaderboard(client):
+    """Test soft-deleted URLs are excluded from the most clicked ranking"""
+    for alias, clicks in (("first", 5), ("second", 3)):
+        client.post(
+            "/api/urls/shorten",
+            json={
+                "original_url": f"https://example.com/{alias}",
+                "custom_alias": alias,
+            },
+        )
+        click(client, alias, clicks)
+    asyncio.run(click_buffer.flush())
+    assert client.get("/api/analytics/urls").json()[0]["short_code"] == "first"
+
+    client.delete("/api/urls/first")
+    client.post(
+        "/api/urls/shorten",
+        json={"original_url": "https://example.com/new", "custom_alias": "newest"},
+    )
+
+    top = client.get("/api/analytics/urls").json()
+    assert [url["short_code"] for url in top] == ["second", "newest"]
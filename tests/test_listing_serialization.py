@@ -0,0 +1,48 @@
+from app.database.url_repository import URLRepository
+from app.models.url import URL, URLResponse
+
+
+def test_listings_match_the_validated_response(client):
+    """Test unvalidated listing payloads encode exactly like URLResponse"""
+    client.post(
+        "/api/urls/shorten",
+        json={"original_url": "https://example.com/a", "custom_alias": "listed"},
+    )
+    client.post(
+        "/api/urls/shorten",
+        json={"original_url": "https://example.com/b", "redirect_status": 301},
+    )
+    client.put("/api/urls/listed", json={"original_url": "https://example.com/c"})
+    client.get("/listed", follow_redirects=False)
+
+    listing = client.get("/api/urls/").json()
+    most_clicked = client.get(
+        "/api/analytics/urls", params={"include_pending": True}
+    ).json()
+
+    assert len(listing) == 2
+    assert listing[0]["updated_at"] is not None
+    assert listing[1]["redirect_status"] == 301
+    for item in listing:
+        assert item == client.get(f"/api/urls/{item['short_code']}").json()
+        assert item == URLResponse.model_validate(item).model_dump(mode="json")
+    assert most_clicked[0] == {**listing[0], "clicks": 1}
+
+
+def test_listing_reads_plain_rows(client, monkeypatch):
+    """Test the listing query selects columns instead of loading URL models"""
+    client.post("/api/urls/shorten", json={"original_url": "https://example.com"})
+    get_all = URLRepository.get_all
+    pages = []
+
+    async def recording_get_all(self, *args, **kwargs):
+        pages.append(await get_all(self, *args, **kwargs))
+        return pages[-1]
+
+    monkeypatch.setattr(URLRepository, "get_all", recording_get_all)
+
+    response = client.get("/api/urls/", params={"limit": 1})
+    assert response.headers["content-type"] == "application/json"
+    assert "x-next-cursor" in response.headers
+    assert len(pages[0]) == 1
+    assert not isinstance(pages[0][0], URL)
@@ -0,0 +1,49 @@
+from fastapi import status
+
+
+def test_cursor_pagination_walks_all_urls_in_id_order(client):
+    """Test following X-Next-Cursor returns every live URL exactly once"""
+    payload = [{"original_url": f"https://example.com/{i}"} for i in range(7)]
+    client.post("/api/urls/shorten/batch", json=payload)
+    deleted = client.get("/api/urls/?limit=1").json()[0]["short_code"]
+    client.delete(f"/api/urls/{deleted}")
+
+    seen = []
+    response = client.get("/api/urls/?limit=3")
+    while True:
+        seen.extend(url["id"] for url in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        response = client.get(f"/api/urls/?limit=3&cursor={cursor}")
+
+    assert len(seen) == 6
+    assert seen == sorted(seen)
+
+
+def test_offset_pagination_is_still_supported(client):
+    """Test skip/limit keep working and are ordered by id"""
+    payload = [{"original_url": f"https://example.com/{i}"} for i in range(5)]
+    client.post("/api/urls/shorten/batch", json=payload)
+
+    everything = client.get("/api/urls/").json()
+    page = client.get("/api/urls/?skip=2&limit=2").json()
+
+    assert [url["id"] for url in page] == [url["id"] for url in everything[2:4]]
+
+
+def test_invalid_cursor_is_rejected(client):
+    """Test a malformed cursor returns 400"""
+    response = client.get("/api/urls/?cursor=not-a-cursor")
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_empty_page_has_no_cursor(client):
+    """Test limit=0 returns an empty page without a next cursor"""
+    client.post("/api/urls/shorten", json={"original_url": "https://example.com"})
+    response = client.get("/api/urls/?limit=0")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == []
+    assert "X-Next-Cursor" not in response.headers
@@ -0,0 +1,86 @@
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+from sqlmodel import create_engine
+
+from app.database.db import TimedQueuePool
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_requests_are_labelled_by_route_template(client):
+    """Test redirects are aggregated under /{short_code}, not per raw code"""
+    client.post(
+        "/api/urls/shorten",
+        json={"original_url": "https://example.com", "custom_alias": "metric_a"},
+    )
+    before = sample(
+        "http_requests_total", method="GET", route="/{short_code}", status="307"
+    )
+    before_404 = sample(
+        "http_requests_total", method="GET", route="/{short_code}", status="404"
+    )
+
+    for _ in range(3):
+        client.get("/metric_a", follow_redirects=False)
+    client.get("/missing_code", follow_redirects=False)
+
+    body = client.get("/metrics").text
+    assert "metric_a" not in body
+    assert 'route="/{short_code}"' in body
+    assert "http_requests_in_progress" in body
+    assert (
+        sample("http_requests_total", method="GET", route="/{short_code}", status="307")
+        == before + 3
+    )
+    assert (
+        sample("http_requests_total", method="GET", route="/{short_code}", status="404")
+        == before_404 + 1
+    )
+
+
+def test_db_round_trips_are_labelled_by_repository_method(client):
+    """Test query and commit timings are charged to the public repository method"""
+    before = sample(
+        "db_query_duration_seconds_count",
+        operation="URLRepository.create",
+        kind="commit",
+    )
+    client.post("/api/urls/shorten", json={"original_url": "https://example.com/x"})
+
+    assert (
+        sample(
+            "db_query_duration_seconds_count",
+            operation="URLRepository.create",
+            kind="commit",
+        )
+        == before + 1
+    )
+    assert (
+        sample(
+            "db_query_duration_seconds_count",
+            operation="URLRepository.get_by_original_url",
+            kind="query",
+        )
+        > 0
+    )
+    assert (
+        sample(
+            "db_query_duration_seconds_count",
+            operation="URLRepository._save",
+            kind="commit",
+        )
+        == 0
+    )
+
+
+def test_pool_checkout_wait_is_recorded():
+    """Test connections checked out of the pool record their wait time"""
+    engine = create_engine("sqlite://", poolclass=TimedQueuePool)
+    before = sample("db_pool_checkout_wait_seconds_count")
+
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+    assert sample("db_pool_checkout_wait_seconds_count") == before + 1
@@ -0,0 +1,83 @@
+import pytest
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+
+from app.database import db
+from app.database.read_routing import READ_YOUR_WRITES_COOKIE, recent_writes
+from app.models.url import URL
+from app.services.short_code_filter import short_code_filter
+
+
+@pytest.fixture
+def replica_session(client, monkeypatch):
+    # A second database standing in for a replica that has not caught up
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(db, "read_engine", engine)
+    # The filter is built from the primary and would reject replica-only codes
+    monkeypatch.setattr(short_code_filter, "enabled", False)
+    with Session(engine) as session:
+        yield session
+
+
+def test_read_only_lookups_are_served_by_the_replica(client, replica_session):
+    """Test redirects, URL info, listing and rankings read from the replica"""
+    replica_session.add(
+        URL(original_url="https://replica.example.com", short_code="on_replica")
+    )
+    replica_session.commit()
+
+    redirect = client.get("/on_replica", follow_redirects=False)
+    assert redirect.status_code == 307
+    assert redirect.headers["location"] == "https://replica.example.com"
+    assert client.get("/api/urls/on_replica").status_code == 200
+    listing = client.get("/api/urls/").json()
+    assert [url["short_code"] for url in listing] == ["on_replica"]
+    ranking = client.get("/api/analytics/urls").json()
+    assert [url["short_code"] for url in ranking] == ["on_replica"]
+
+    # Writes and the lookups they depend on stay on the primary
+    assert client.delete("/api/urls/on_replica").status_code == 404
+
+
+def test_recent_writes_are_read_from_the_primary(client, replica_session, monkeypatch):
+    """Test a code is read from the primary within the read-your-writes window"""
+    client.post(
+        "/api/urls/shorten",
+        json={"original_url": "https://example.com", "custom_alias": "fresh"},
+    )
+    assert client.get("/fresh", follow_redirects=False).status_code == 307
+    assert client.get("/api/urls/fresh").status_code == 200
+    assert recent_writes.stats()["pinned_reads"] == 2
+
+    # Once the window has passed the lagging replica answers
+    monkeypatch.setattr(recent_writes, "window", 0)
+    client.put("/api/urls/fresh", json={"original_url": "https://example.org"})
+    assert client.get("/api/urls/fresh").status_code == 404
+    assert client.delete("/api/urls/fresh").status_code == 200
+
+    # Counter repair must not copy the replica's stale totals
+    client.post("/api/urls/shorten", json={"original_url": "https://example.net"})
+    summary = client.post("/api/analytics/counters/recompute").json()
+    assert summary["total_urls"] == 1
+
+
+def test_clients_read_their_writes_on_any_worker(client, replica_session):
+    """Test the last-write cookie pins a client's reads without a local pin"""
+    response = client.post(
+        "/api/urls/shorten",
+        json={"original_url": "https://example.com", "custom_alias": "mine"},
+    )
+    assert READ_YOUR_WRITES_COOKIE in response.cookies
+
+    # As seen by another worker, which has no pin for the short code
+    recent_writes.clear()
+    assert client.get("/api/urls/mine").status_code == 200
+    assert client.get("/mine", follow_redirects=False).status_code == 307
+    assert recent_writes.stats()["pinned_reads"] == 2
+
+    # Other clients read the lagging replica
+    client.cookies.clear()
+    assert client.get("/api/urls/mine").status_code == 404
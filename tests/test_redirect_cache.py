@@ -0,0 +1,77 @@
+import asyncio
+
+from fastapi import status
+
+from app.services.redirect_cache import RedirectCache, redirect_cache
+
+
+def test_cache_evicts_least_recently_used():
+    """Test the cache stays bounded and evicts the least recently used entry"""
+    cache = RedirectCache(max_size=2, ttl=60)
+    cache.set("aaaa", "https://a.example/")
+    cache.set("bbbb", "https://b.example/")
+    assert cache.get("aaaa") == "https://a.example/"
+
+    cache.set("cccc", "https://c.example/")
+
+    assert cache.get("bbbb") is None
+    assert cache.get("aaaa") == "https://a.example/"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_expires_entries():
+    """Test entries older than the TTL are treated as misses"""
+    cache = RedirectCache(max_size=10, ttl=0)
+    cache.set("aaaa", "https://a.example/")
+
+    assert cache.get("aaaa") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_cache_coalesces_concurrent_misses():
+    """Test a burst of misses on one key triggers a single load"""
+    cache = RedirectCache(max_size=10, ttl=60)
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "https://a.example/"
+
+    async def burst():
+        return await asyncio.gather(
+            *[cache.get_or_load("aaaa", loader) for _ in range(20)]
+        )
+
+    results = asyncio.run(burst())
+
+    assert calls == 1
+    assert results == ["https://a.example/"] * 20
+    assert cache.stats()["coalesced"] == 19
+
+
+def test_redirect_is_served_from_cache_and_invalidated_on_update(client):
+    """Test redirects populate the cache and updates invalidate it"""
+    payload = {"original_url": "https://example.com/cached"}
+    short_code = client.post("/api/urls/shorten", json=payload).json()["short_code"]
+
+    first = client.get(f"/{short_code}", follow_redirects=False)
+    second = client.get(f"/{short_code}", follow_redirects=False)
+    assert first.headers["location"] == "https://example.com/cached"
+    assert second.headers["location"] == "https://example.com/cached"
+    assert redirect_cache.stats()["hits"] == 1
+
+    client.put(
+        f"/api/urls/{short_code}", json={"original_url": "https://example.com/new"}
+    )
+    response = client.get(f"/{short_code}", follow_redirects=False)
+    assert response.headers["location"] == "https://example.com/new"
+
+    client.delete(f"/api/urls/{short_code}")
+    response = client.get(f"/{short_code}", follow_redirects=False)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    stats = client.get("/api/metrics/cache").json()
+    assert stats["invalidations"] == 2
+    assert client.get(f"/api/urls/{short_code}").status_code == 404
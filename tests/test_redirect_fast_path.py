@@ -0,0 +1,75 @@
+import asyncio
+
+from app.controller import redirect_controller
+from app.services.click_buffer import click_buffer
+from app.services.redirect_cache import redirect_cache
+from app.services.url_service import URLService
+
+
+def test_fast_path_matches_the_regular_route(client, monkeypatch):
+    """Test both paths return the same redirects, 404s and click counts"""
+    client.post(
+        "/api/urls/shorten",
+        json={"original_url": "https://example.com/a b", "custom_alias": "fast"},
+    )
+
+    fast = client.get("/fast", follow_redirects=False)
+    fast_missing = client.get("/missing", follow_redirects=False)
+    monkeypatch.setattr(redirect_controller, "REDIRECT_FAST_PATH", False)
+    redirect_cache.clear()
+    regular = client.get("/fast", follow_redirects=False)
+    regular_missing = client.get("/missing", follow_redirects=False)
+
+    assert fast.status_code == regular.status_code == 307
+    assert fast.headers["location"] == regular.headers["location"]
+    assert fast.headers["location"] == "https://example.com/a%20b"
+    assert fast_missing.status_code == regular_missing.status_code == 404
+    assert fast_missing.json() == regular_missing.json()
+
+    asyncio.run(click_buffer.flush())
+    assert client.get("/api/urls/fast").json()["clicks"] == 2
+
+
+def test_fast_path_skips_dependency_construction(client, monkeypatch):
+    """Test redirects no longer go through URLService"""
+    client.post(
+        "/api/urls/shorten",
+        json={"original_url": "https://example.com", "custom_alias": "direct"},
+    )
+
+    async def no_service(self, short_code, request):
+        raise AssertionError("the fast path must not build a URLService")
+
+    monkeypatch.setattr(URLService, "get_original_url", no_service)
+
+    for _ in range(2):  # a cache miss, then a hit
+        response = client.get("/direct", follow_redirects=False)
+        assert response.status_code == 307
+    assert client.get("/unknown", follow_redirects=False).status_code == 404
+
+
+def test_other_routes_and_cross_origin_requests_fall_through(client):
+    """Test static routes and CORS requests are still served by the app"""
+    assert client.get("/metrics").status_code == 200
+    assert client.get("/docs").status_code == 200
+
+    client.post(
+        "/api/urls/shorten",
+        json={"original_url": "https://example.com", "custom_alias": "cors"},
+    )
+    response = client.get(
+        "/cors", headers={"Origin": "https://app.example"}, follow_redirects=False
+    )
+    assert response.status_code == 307
+    assert "access-control-allow-origin" in response.headers
+
+
+def test_fast_path_with_async_engine(async_client):
+    """Test the fast path runs its lookup on the async engine"""
+    async_client.post(
+        "/api/urls/shorten",
+        json={"original_url": "https://example.com", "custom_alias": "async_fast"},
+    )
+    response = async_client.get("/async_fast", follow_redirects=False)
+    assert response.status_code == 307
+    assert response.headers["location"] == "https://example.com/"
@@ -0,0 +1,178 @@
+import asyncio
+import os
+
+from app.services import analytics_service
+from app.services.click_buffer import click_buffer
+from app.services.click_events import click_events
+from app.services.http_caching import RedirectTarget
+from app.services.redirect_snapshot import (
+    ClickForwarder,
+    RedirectSnapshot,
+    click_forwarder,
+    export_snapshot,
+    redirect_snapshot,
+    write_snapshot,
+)
+
+
+def test_export_and_lookup(client, tmp_path):
+    """Test the export holds every live URL and nothing else"""
+    client.post(
+        "/api/urls/shorten",
+        json={"original_url": "https://example.com/a", "custom_alias": "alpha"},
+    )
+    client.post(
+        "/api/urls/shorten",
+        json={
+            "original_url": "https://example.com/b",
+            "custom_alias": "bravo",
+            "redirect_status": 301,
+        },
+    )
+    client.post(
+        "/api/urls/shorten",
+        json={"original_url": "https://example.com/c", "custom_alias": "gone"},
+    )
+    client.delete("/api/urls/gone")
+    generated = client.post(
+        "/api/urls/shorten", json={"original_url": "https://example.com/d"}
+    ).json()
+
+    path = str(tmp_path / "redirects.snapshot")
+    assert asyncio.run(export_snapshot(path, batch_size=2)) == 3
+
+    snapshot = RedirectSnapshot(path)
+    assert len(snapshot) == 3
+    assert snapshot.max_url_id == generated["id"]
+    assert snapshot.lookup("alpha") == RedirectTarget("https://example.com/a", 307)
+    assert snapshot.lookup("bravo") == RedirectTarget("https://example.com/b", 301)
+    assert snapshot.lookup(generated["short_code"]).original_url == (
+        "https://example.com/d"
+    )
+    for missing in ("gone", "alph", "alphaa", "zzzz", "0", ""):
+        assert snapshot.lookup(missing) is None
+    snapshot.close()
+
+
+def test_snapshot_mode_serves_redirects_and_hot_swaps(client, tmp_path, monkeypatch):
+    """Test both redirect routes read the snapshot and pick up a new file"""
+    path = str(tmp_path / "redirects.snapshot")
+    write_snapshot(path, [("edge", "https://example.com/v1", None, None)])
+    monkeypatch.setattr(redirect_snapshot, "path", path)
+    redirect_snapshot.load()
+
+    # Not in the database at all: served from the snapshot only
+    fast = client.get("/edge", follow_redirects=False)
+    regular = client.get(
+        "/edge", headers={"Origin": "https://a.example"}, follow_redirects=False
+    )
+    assert fast.status_code == regular.status_code == 307
+    assert fast.headers["location"] == regular.headers["location"]
+    assert fast.headers["location"] == "https://example.com/v1"
+    assert client.get("/other", follow_redirects=False).status_code == 404
+
+    write_snapshot(
+        path,
+        [
+            ("edge", "https://example.com/v2", 302, None),
+            ("other", "https://o.example", 0, None),
+            ("ended", "https://e.example", 0, 1.0),
+        ],
+    )
+    # Same second and size would not be noticed by the stat check otherwise
+    os.utime(path, ns=(0, 0))
+    assert redirect_snapshot.load()
+    assert not redirect_snapshot.load()
+
+    response = client.get("/edge", follow_redirects=False)
+    assert response.status_code == 302
+    assert response.headers["location"] == "https://example.com/v2"
+    assert client.get("/other", follow_redirects=False).status_code == 307
+    assert client.get("/ended", follow_redirects=False).status_code == 410
+
+    stats = client.get("/api/metrics/snapshot").json()
+    assert stats["entries"] == 3
+    assert stats["reloads"] == 2
+    assert stats["hits"] == 5
+    assert stats["misses"] == 1
+
+
+def test_clicks_are_forwarded_to_the_service(client, tmp_path, monkeypatch):
+    """Test clicks counted on a snapshot node end up on the URL"""
+    url = client.post(
+        "/api/urls/shorten",
+        json={"original_url": "https://example.com", "custom_alias": "fwd1"},
+    ).json()
+    path = str(tmp_path / "redirects.snapshot")
+    asyncio.run(export_snapshot(path))
+
+    posted = []
+    monkeypatch.setattr(redirect_snapshot, "path", path)
+    monkeypatch.setattr(click_forwarder, "url", "http://service/api/analytics/clicks")
+    monkeypatch.setattr(click_forwarder, "_post", posted.append)
+    redirect_snapshot.load()
+
+    for _ in range(3):
+        client.get("/fwd1", follow_redirects=False)
+    client.get("/nope", follow_redirects=False)
+    # Nothing is written to this node's database
+    assert click_buffer.pending_total() == 0
+    assert asyncio.run(click_forwarder.flush()) == 3
+    assert posted == [{"fwd1": 3}]
+
+    monkeypatch.setattr(redirect_snapshot, "path", None)
+    clicks = {"clicks": {**posted[0], "nosuchcode": 5}}
+    # Refused without the shared token, and when none is configured
+    assert client.post("/api/analytics/clicks", json=clicks).status_code == 403
+    monkeypatch.setattr(analytics_service, "REDIRECT_SNAPSHOT_CLICKS_TOKEN", "s3cret")
+    headers = {"X-Clicks-Token": "s3cret"}
+    assert (
+        client.post(
+            "/api/analytics/clicks", json=clicks, headers={"X-Clicks-Token": "guess"}
+        ).status_code
+        == 403
+    )
+    response = client.post("/api/analytics/clicks", json=clicks, headers=headers)
+    # Unknown short codes are dropped; the clicks are one queued event
+    assert response.json() == {"recorded": 3}
+    assert click_events.stats()["queued"] == 1
+    for invalid, status_code in (
+        ({"fwd1": 0}, 422),
+        ({"fwd1": 3000000}, 400),
+    ):
+        response = client.post(
+            "/api/analytics/clicks", json={"clicks": invalid}, headers=headers
+        )
+        assert response.status_code == status_code
+
+    asyncio.run(click_buffer.flush())
+    assert client.get(f"/api/urls/{url['short_code']}").json()["clicks"] == 3
+
+
+def test_forwarded_clicks_are_split_into_bounded_batches(monkeypatch):
+    """Test large counts are posted in several batches and only failures kept"""
+    forwarder = ClickForwarder(url="http://service", max_codes=2, max_amount=10)
+    assert forwarder.batches({"a": 25, "b": 1, "c": 1}) == [
+        {"a": 10},
+        {"a": 10},
+        {"a": 5, "b": 1},
+        {"c": 1},
+    ]
+
+    posted = []
+
+    def post(batch):
+        if len(posted) == 2:
+            raise OSError("connection refused")
+        posted.append(batch)
+
+    monkeypatch.setattr(forwarder, "_post", post)
+    forwarder.record("a", 25)
+    forwarder.record("b")
+    try:
+        asyncio.run(forwarder.flush())
+    except OSError:
+        pass
+    assert posted == [{"a": 10}, {"a": 10}]
+    assert forwarder.pending("a") == 5
+    assert forwarder.pending_total() == 6
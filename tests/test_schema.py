@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import event, text
+from sqlmodel import SQLModel, create_engine
+
+from app.database import db, schema
+
+
+def _engine_at(tmp_path, revisions):
+    engine = create_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+    if revisions is not None:
+        with engine.begin() as connection:
+            connection.execute(
+                text("CREATE TABLE alembic_version (version_num VARCHAR(32))")
+            )
+            for revision in revisions:
+                connection.execute(
+                    text("INSERT INTO alembic_version VALUES (:revision)"),
+                    {"revision": revision},
+                )
+    return engine
+
+
+def test_migration_heads_match_alembic():
+    """Test the heads read from the scripts are the ones Alembic computes"""
+    script = ScriptDirectory.from_config(Config("alembic.ini"))
+    assert schema.migration_heads() == set(script.get_heads())
+
+
+def test_verify_mode_checks_the_revision_with_one_query(tmp_path, monkeypatch):
+    """Test startup accepts only a database migrated to the head"""
+    monkeypatch.setattr(schema, "DB_SCHEMA_CHECK", "verify")
+    engine = _engine_at(tmp_path, schema.migration_heads())
+    monkeypatch.setattr(db, "engine", engine)
+    statements = []
+    event.listen(
+        engine, "before_cursor_execute", lambda *args: statements.append(args[2])
+    )
+
+    asyncio.run(schema.prepare_schema())
+    assert statements == ["SELECT version_num FROM alembic_version"]
+
+    with engine.begin() as connection:
+        connection.execute(text("UPDATE alembic_version SET version_num = '001'"))
+    with pytest.raises(RuntimeError, match="at revision 001"):
+        asyncio.run(schema.prepare_schema())
+    engine.dispose()
+
+    monkeypatch.setattr(db, "engine", create_engine("sqlite://"))
+    with pytest.raises(RuntimeError, match="alembic upgrade head"):
+        asyncio.run(schema.prepare_schema())
+
+
+def test_create_and_skip_modes(tmp_path, monkeypatch):
+    """Test create makes the tables and skip does not touch the database"""
+    engine = _engine_at(tmp_path, None)
+    monkeypatch.setattr(db, "engine", engine)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(1))
+
+    monkeypatch.setattr(schema, "DB_SCHEMA_CHECK", "skip")
+    asyncio.run(schema.prepare_schema())
+    assert statements == []
+
+    monkeypatch.setattr(schema, "DB_SCHEMA_CHECK", "create")
+    asyncio.run(schema.prepare_schema())
+    with engine.connect() as connection:
+        tables = set(
+            connection.execute(
+                text("SELECT name FROM sqlite_master WHERE type = 'table'")
+            ).scalars()
+        )
+    assert set(SQLModel.metadata.tables) <= tables
+    engine.dispose()
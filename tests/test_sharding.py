@@ -0,0 +1,234 @@
+import asyncio
+from collections import Counter
+
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, SQLModel, create_engine, func, select
+
+from app.database import db
+from app.database.resharding import Resharder
+from app.database.sharding import shard_index
+from app.database.url_repository import URLRepository
+from app.models.url import URL
+from app.services.click_buffer import click_buffer
+
+
+def shard_codes(engine):
+    with engine.connect() as connection:
+        return set(connection.execute(select(URL.short_code)).scalars())
+
+
+def test_urls_are_routed_to_one_shard_and_merged_back(sharded_client, test_db_engine):
+    """Test rows land on their hash shard and reads fan out and merge"""
+    client = sharded_client
+    codes = [
+        client.post(
+            "/api/urls/shorten", json={"original_url": f"https://example.com/{i}"}
+        ).json()["short_code"]
+        for i in range(10)
+    ]
+    batch = client.post(
+        "/api/urls/shorten/batch",
+        json=[{"original_url": f"https://example.com/batch/{i}"} for i in range(20)]
+        + [{"original_url": "https://example.com/alias", "custom_alias": "sharded"}],
+    ).json()
+    codes += [item["url"]["short_code"] for item in batch]
+
+    assert shard_codes(test_db_engine) == set()
+    for index, engine in enumerate(db.shard_engines):
+        stored = shard_codes(engine)
+        assert stored and all(shard_index(code, 3) == index for code in stored)
+    assert set().union(*map(shard_codes, db.shard_engines)) == set(codes)
+
+    # Dedupe and alias checks see every shard
+    again = client.post(
+        "/api/urls/shorten", json={"original_url": "https://example.com/3"}
+    )
+    assert again.json()["short_code"] == codes[3]
+    conflict = client.post(
+        "/api/urls/shorten",
+        json={"original_url": "https://example.com/x", "custom_alias": "sharded"},
+    )
+    assert conflict.status_code == 409
+
+    # Ids are unique across shards and keyset pagination walks all of them
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 7, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/urls/", params=params)
+        seen += [item["id"] for item in response.json()]
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+    assert seen == sorted(set(seen)) and len(seen) == 31
+    offset_page = client.get("/api/urls/", params={"skip": 10, "limit": 5}).json()
+    assert [item["id"] for item in offset_page] == seen[10:15]
+
+    for code, clicks in (("sharded", 3), (codes[0], 2), (codes[15], 1)):
+        for _ in range(clicks):
+            assert client.get(f"/{code}", follow_redirects=False).status_code == 307
+    asyncio.run(click_buffer.flush())
+
+    top = client.get("/api/analytics/urls", params={"limit": 3}).json()
+    assert [(item["short_code"], item["clicks"]) for item in top] == [
+        ("sharded", 3),
+        (codes[0], 2),
+        (codes[15], 1),
+    ]
+    summary = client.get("/api/analytics/summary").json()
+    assert summary == {"total_urls": 31, "total_clicks": 6, "total_custom_urls": 1}
+
+    client.put("/api/urls/sharded", json={"original_url": "https://example.com/new"})
+    client.delete(f"/api/urls/{codes[0]}")
+    assert client.get("/sharded", follow_redirects=False).headers["location"] == (
+        "https://example.com/new"
+    )
+    assert client.get(f"/{codes[0]}", follow_redirects=False).status_code == 404
+    assert client.get("/api/analytics/summary").json()["total_urls"] == 30
+
+
+def test_batch_reports_rows_lost_with_a_failed_shard_commit(
+    sharded_client, monkeypatch
+):
+    """Test a commit failing after other shards committed only fails its rows"""
+    client = sharded_client
+    shard_engines = set(db.shard_engines)
+    commit = URLRepository._commit
+    shard_commits = []
+
+    async def failing_second_shard_commit(self):
+        if self.db.get_bind() in shard_engines:
+            shard_commits.append(self)
+            if len(shard_commits) == 2:
+                raise OperationalError("COMMIT", {}, Exception("connection lost"))
+        await commit(self)
+
+    monkeypatch.setattr(URLRepository, "_commit", failing_second_shard_commit)
+    items = [{"original_url": f"https://example.com/{i}"} for i in range(30)]
+    results = client.post("/api/urls/shorten/batch", json=items).json()
+    statuses = Counter(item["status"] for item in results)
+    assert set(statuses) == {"created", "failed"}
+    stored = set().union(*map(shard_codes, db.shard_engines))
+    assert stored == {
+        item["url"]["short_code"] for item in results if item["status"] == "created"
+    }
+
+    # Retrying the batch reuses the saved rows instead of duplicating them
+    monkeypatch.setattr(URLRepository, "_commit", commit)
+    retried = client.post("/api/urls/shorten/batch", json=items).json()
+    assert Counter(item["status"] for item in retried) == {
+        "existing": statuses["created"],
+        "created": statuses["failed"],
+    }
+    assert sum(len(shard_codes(engine)) for engine in db.shard_engines) == 30
+
+
+def test_adding_a_shard_only_moves_codes_to_it():
+    """Test the jump hash spreads codes evenly and grows with minimal moves"""
+    codes = [f"code{i}" for i in range(10000)]
+    counts = Counter(shard_index(code, 4) for code in codes)
+    assert all(2200 < count < 2800 for count in counts.values())
+
+    for code in codes:
+        before, after = shard_index(code, 4), shard_index(code, 5)
+        assert after in (before, 4)
+    moved = sum(shard_index(code, 4) != shard_index(code, 5) for code in codes)
+    assert 1700 < moved < 2300
+
+
+def test_resharding_copies_then_prunes(sharded_client, test_db_engine, tmp_path):
+    """Test the reshard tool moves rows to a new layout without losing any"""
+    client = sharded_client
+    batch = client.post(
+        "/api/urls/shorten/batch",
+        json=[{"original_url": f"https://example.com/{i}"} for i in range(50)],
+    ).json()
+    codes = {item["url"]["short_code"] for item in batch}
+
+    new_shard = create_engine(f"sqlite:///{tmp_path / 'shard3.db'}")
+    SQLModel.metadata.create_all(new_shard)
+    targets = [*db.shard_engines, new_shard]
+    resharder = Resharder(targets, batch_size=7, batch_pause=0)
+    for source in db.shard_engines:
+        asyncio.run(resharder.copy(source))
+    resharder.raise_id_counter(test_db_engine)
+
+    moved = {code for code in codes if shard_index(code, 4) == 3}
+    assert resharder.copied == len(moved) > 0
+    assert shard_codes(new_shard) == moved
+
+    # Pruning only removes rows the new layout places elsewhere
+    assert asyncio.run(resharder.prune()) == len(moved)
+    for index, engine in enumerate(targets):
+        assert all(shard_index(code, 4) == index for code in shard_codes(engine))
+    assert set().union(*map(shard_codes, targets)) == codes
+    with new_shard.connect() as connection:
+        assert connection.execute(select(func.count(URL.id))).scalar() == len(moved)
+
+    db.shard_engines.append(new_shard)
+    for code in codes:
+        assert client.get(f"/{code}", follow_redirects=False).status_code == 307
+    assert client.get("/api/analytics/summary").json()["total_urls"] == 50
+    created = client.post(
+        "/api/urls/shorten", json={"original_url": "https://example.com/next"}
+    ).json()
+    assert created["id"] > max(item["url"]["id"] for item in batch)
+
+
+def test_async_shards(sharded_client, tmp_path, monkeypatch):
+    """Test shards served through async drivers"""
+    paths = [tmp_path / f"async{index}.db" for index in range(2)]
+    for path in paths:
+        SQLModel.metadata.create_all(create_engine(f"sqlite:///{path}"))
+    monkeypatch.setattr(
+        db,
+        "shard_engines",
+        [db.create_shard_engine(f"sqlite+aiosqlite:///{path}") for path in paths],
+    )
+    client = sharded_client
+
+    batch = client.post(
+        "/api/urls/shorten/batch",
+        json=[{"original_url": f"https://example.com/{i}"} for i in range(10)],
+    ).json()
+    for item in batch:
+        code = item["url"]["short_code"]
+        assert client.get(f"/{code}", follow_redirects=False).status_code == 307
+        assert client.get(f"/api/urls/{code}").json()["id"] == item["url"]["id"]
+    assert len(client.get("/api/urls/").json()) == 10
+
+
+def test_resharding_skips_rows_whose_code_is_taken(tmp_path):
+    """Test copy reports and skips clashing short codes instead of aborting"""
+    source, *targets = [
+        create_engine(f"sqlite:///{tmp_path / f'{name}.db'}")
+        for name in ("source", "target0", "target1")
+    ]
+    for engine in (source, *targets):
+        SQLModel.metadata.create_all(engine)
+    with Session(source) as session:
+        for index in range(1, 11):
+            session.add(
+                URL(
+                    id=index,
+                    original_url=f"https://example.com/{index}",
+                    short_code=f"code{index}",
+                )
+            )
+        session.commit()
+    # An alias created on the new shard in the meantime
+    owner = targets[shard_index("code3", 2)]
+    with Session(owner) as session:
+        session.add(URL(id=100, original_url="https://other.com", short_code="code3"))
+        session.commit()
+
+    resharder = Resharder(targets, batch_size=4, batch_pause=0)
+    assert asyncio.run(resharder.copy(source)) == 9
+    assert resharder.clashes == [(3, "code3")]
+    with owner.connect() as connection:
+        assert connection.execute(
+            select(URL.original_url).where(URL.short_code == "code3")
+        ).all() == [("https://other.com",)]
+    assert set().union(*map(shard_codes, targets)) == {
+        f"code{index}" for index in range(1, 11)
+    }
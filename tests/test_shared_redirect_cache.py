@@ -0,0 +1,130 @@
+import asyncio
+import multiprocessing
+import uuid
+
+import pytest
+
+from app.controller import redirect_controller
+from app.services import url_service
+from app.services.http_caching import RedirectTarget
+from app.services.shared_redirect_cache import SharedRedirectCache
+
+
+@pytest.fixture
+def shared_cache():
+    # A segment of its own per test, removed afterwards
+    cache = SharedRedirectCache(slots=64, name=f"test_{uuid.uuid4().hex[:12]}")
+    yield cache
+    cache.close(unlink=True)
+
+
+def _base_name(cache: SharedRedirectCache) -> str:
+    return cache.name.rsplit("_v", 1)[0]
+
+
+def _worker(name: str, command: str, short_code: str, queue) -> None:
+    # Runs in a separate process attached to the same segment
+    cache = SharedRedirectCache(slots=64, name=name)
+    if command == "set":
+        cache.set(short_code, RedirectTarget("https://example.com/other", 302))
+        queue.put(None)
+    elif command == "get":
+        queue.put(cache.get(short_code))
+    else:
+        cache.invalidate(short_code)
+        queue.put(None)
+    cache.close()
+
+
+def _run_worker(cache: SharedRedirectCache, command: str, short_code: str):
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(
+        target=_worker, args=(_base_name(cache), command, short_code, queue)
+    )
+    process.start()
+    result = queue.get(timeout=30)
+    process.join(timeout=30)
+    assert process.exitcode == 0
+    return result
+
+
+def test_entries_are_shared_between_processes(shared_cache):
+    """Test entries and invalidations of one process are seen by another"""
+    shared_cache.set("abcd", RedirectTarget("https://example.com", 307))
+    assert _run_worker(shared_cache, "get", "abcd") == RedirectTarget(
+        "https://example.com", 307
+    )
+
+    expiring = RedirectTarget("https://example.com/promo", 302, 4102444800.0)
+    shared_cache.set("promo", expiring)
+    assert _run_worker(shared_cache, "get", "promo") == expiring
+
+    _run_worker(shared_cache, "set", "efgh")
+    assert shared_cache.get("efgh") == RedirectTarget("https://example.com/other", 302)
+
+    _run_worker(shared_cache, "invalidate", "abcd")
+    assert shared_cache.get("abcd") is None
+    assert shared_cache.generation() == 1
+
+
+def test_memory_is_bounded_and_evicts_least_recently_read(shared_cache):
+    """Test a full set evicts its least recently read entry"""
+    cache = SharedRedirectCache(slots=8, name=_base_name(shared_cache))
+    try:
+        for index in range(8):
+            cache.set(f"code{index}", RedirectTarget(f"https://e.com/{index}", 307))
+        cache.get("code0")
+        cache.set("code8", RedirectTarget("https://e.com/8", 307))
+
+        assert cache.get("code0") is not None
+        assert cache.get("code1") is None
+        assert cache.get("code8") is not None
+        cache.set("long", RedirectTarget("https://e.com/" + "x" * 1000, 307))
+        assert cache.get("long") is None
+        stats = cache.stats()
+        assert stats["size"] == stats["max_size"] == 8
+        assert stats["evictions"] == 1
+        assert stats["oversized"] == 1
+    finally:
+        cache.close(unlink=True)
+
+
+def test_invalidation_during_a_load_is_not_overwritten(shared_cache):
+    """Test a load in one worker does not store what another worker changed"""
+    other_worker = SharedRedirectCache(slots=64, name=_base_name(shared_cache))
+
+    async def load():
+        other_worker.invalidate("race")
+        return RedirectTarget("https://example.com/stale", 307)
+
+    assert asyncio.run(shared_cache.get_or_load("race", load)) is not None
+    assert shared_cache.get("race") is None
+    other_worker.close()
+
+
+def test_updates_and_deletes_invalidate_the_shared_cache(
+    client, shared_cache, monkeypatch
+):
+    """Test the API serves redirects through the shared cache"""
+    monkeypatch.setattr(url_service, "redirect_cache", shared_cache)
+    monkeypatch.setattr(redirect_controller, "redirect_cache", shared_cache)
+    other_worker = SharedRedirectCache(slots=64, name=_base_name(shared_cache))
+    client.post(
+        "/api/urls/shorten",
+        json={"original_url": "https://example.com/v1", "custom_alias": "shared"},
+    )
+
+    client.get("/shared", follow_redirects=False)
+    assert other_worker.get("shared") == RedirectTarget("https://example.com/v1", 307)
+
+    client.put("/api/urls/shared", json={"original_url": "https://example.com/v2"})
+    assert other_worker.get("shared") is None
+    response = client.get("/shared", follow_redirects=False)
+    assert response.headers["location"] == "https://example.com/v2"
+    assert other_worker.get("shared") is not None
+
+    client.delete("/api/urls/shared")
+    assert other_worker.get("shared") is None
+    assert client.get("/shared", follow_redirects=False).status_code == 404
+    other_worker.close()
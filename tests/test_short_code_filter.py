@@ -0,0 +1,143 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from app.controller import redirect_controller
+from app.database.url_repository import URLRepository
+from app.models.url import URL
+from app.services.short_code_filter import BloomFilter, short_code_filter
+
+
+def wait_for_filter():
+    # The filter is built by a background task started with the app
+    deadline = time.monotonic() + 5
+    while not short_code_filter.ready and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert short_code_filter.ready
+
+
+def test_bloom_filter_has_no_false_negatives():
+    """Test every added item is found and the error rate stays near its target"""
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    codes = [f"code{index}" for index in range(1000)]
+    for code in codes:
+        bloom.add(code)
+
+    assert all(code in bloom for code in codes)
+    false_positives = sum(f"other{index}" in bloom for index in range(10000))
+    assert false_positives < 300
+    assert 0.005 < bloom.estimated_error_rate() < 0.02
+
+
+def test_unknown_codes_are_rejected_without_a_query(client, monkeypatch):
+    """Test redirects to codes that were never created skip the database"""
+    wait_for_filter()
+    client.post(
+        "/api/urls/shorten",
+        json={"original_url": "https://example.com", "custom_alias": "known"},
+    )
+    # A client that just wrote does not trust misses, see the fallback test
+    client.cookies.clear()
+
+    calls = []
+    get_by_short_code = URLRepository.get_by_short_code
+
+    async def counting_get_by_short_code(self, short_code, **kwargs):
+        calls.append(short_code)
+        return await get_by_short_code(self, short_code, **kwargs)
+
+    monkeypatch.setattr(URLRepository, "get_by_short_code", counting_get_by_short_code)
+
+    # Redirects served by the fast path look codes up without the repository
+    fetch_redirect = redirect_controller._fetch_redirect
+
+    async def counting_fetch_redirect(short_code):
+        calls.append(short_code)
+        return await fetch_redirect(short_code)
+
+    monkeypatch.setattr(redirect_controller, "_fetch_redirect", counting_fetch_redirect)
+
+    for index in range(20):
+        response = client.get(f"/unknown{index}", follow_redirects=False)
+        assert response.status_code == 404
+    assert client.get("/api/urls/unknown").status_code == 404
+    assert client.get("/known", follow_redirects=False).status_code == 307
+
+    assert calls == ["known"]
+    stats = client.get("/api/metrics/short-code-filter").json()
+    assert stats["negatives"] == 21
+    assert stats["size_bytes"] > 0
+    assert 0 < stats["estimated_false_positive_rate"] < 0.01
+
+
+def test_codes_created_by_other_workers_are_synced(client, test_session):
+    """Test periodic reads pick up rows inserted behind this process's back"""
+    wait_for_filter()
+    test_session.add(
+        URL(id=500, original_url="https://example.com/other", short_code="other")
+    )
+    test_session.commit()
+    # Missing until the next catch-up read
+    assert client.get("/other", follow_redirects=False).status_code == 404
+
+    asyncio.run(short_code_filter.sync())
+    response = client.get("/other", follow_redirects=False)
+    assert response.status_code == 307
+    assert response.headers["location"] == "https://example.com/other"
+
+    # A row committed after the filter saw higher ids, e.g. the tail of a
+    # batch or a slower worker, is still found
+    test_session.add(
+        URL(
+            id=400,
+            original_url="https://example.com/late",
+            short_code="late",
+            created_at=datetime.utcnow() - timedelta(seconds=2),
+        )
+    )
+    test_session.commit()
+    asyncio.run(short_code_filter.sync())
+    assert client.get("/late", follow_redirects=False).status_code == 307
+    assert client.get("/api/urls/late").status_code == 200
+    assert short_code_filter.stats()["syncs"] == 2
+
+
+def test_untrusted_misses_fall_back_to_a_point_lookup(
+    client, test_session, monkeypatch
+):
+    """Test a stale filter and a client that just wrote check the database"""
+    wait_for_filter()
+    test_session.add(URL(original_url="https://example.com/a", short_code="elsewhere"))
+    test_session.add(URL(original_url="https://example.com/b", short_code="stale"))
+    test_session.commit()
+    assert client.get("/elsewhere", follow_redirects=False).status_code == 404
+
+    # Clients that wrote lately may have created the code on another worker
+    client.post("/api/urls/shorten", json={"original_url": "https://example.com/c"})
+    assert client.get("/elsewhere", follow_redirects=False).status_code == 307
+    client.cookies.clear()
+
+    # Without a recent catch-up read no miss is trusted
+    monkeypatch.setattr(short_code_filter, "max_staleness", 0)
+    assert client.get("/stale", follow_redirects=False).status_code == 307
+    assert client.get("/unknown", follow_redirects=False).status_code == 404
+
+    stats = short_code_filter.stats()
+    assert stats["fallbacks"] == 3
+    assert stats["negatives"] == 1
+    assert stats["false_positives"] == 0
+
+
+def test_alias_check_skips_the_database_for_new_aliases(client, monkeypatch):
+    """Test alias availability checks use the filter for definite misses"""
+    wait_for_filter()
+
+    async def no_exists_check(self, short_code):
+        raise AssertionError("a new alias must not be looked up")
+
+    monkeypatch.setattr(URLRepository, "exists_by_short_code", no_exists_check)
+    response = client.post(
+        "/api/urls/shorten",
+        json={"original_url": "https://example.com", "custom_alias": "fresh"},
+    )
+    assert response.status_code == 201
@@ -0,0 +1,112 @@
+import asyncio
+
+from fastapi import status
+
+from app.database.url_repository import URLRepository
+from app.services import url_service
+from app.services.short_code_generator import (
+    RandomShortCodeGenerator,
+    RangeShortCodeGenerator,
+    SnowflakeShortCodeGenerator,
+    encode_id,
+)
+
+
+class CountingRepository:
+    def __init__(self):
+        self.reservations = 0
+        self.next_value = 0
+
+    async def reserve_ids(self, counter_name, count):
+        self.reservations += 1
+        start, self.next_value = self.next_value, self.next_value + count
+        return start
+
+    async def exists_by_short_code(self, short_code):
+        raise AssertionError("generated codes must not need an existence check")
+
+
+def test_encoded_ids_are_unique_and_grow_with_the_keyspace():
+    """Test ids map to distinct codes and move to longer codes when full"""
+    codes = {encode_id(value, min_length=2) for value in range(62**2 + 100)}
+
+    assert len(codes) == 62**2 + 100
+    assert encode_id(62**2 - 1, min_length=2) in codes
+    assert len(encode_id(62**2 - 1, min_length=2)) == 2
+    assert len(encode_id(62**2, min_length=2)) == 3
+
+
+def test_range_generator_reserves_one_block_per_range():
+    """Test codes come from locally held ranges without per-code queries"""
+    repository = CountingRepository()
+    generator = RangeShortCodeGenerator(range_size=10)
+
+    async def generate():
+        return [await generator.next_code(repository) for _ in range(25)]
+
+    codes = asyncio.run(generate())
+
+    assert len(set(codes)) == 25
+    assert repository.reservations == 3
+
+
+def test_snowflake_generator_produces_unique_codes():
+    """Test Snowflake ids stay unique within a burst on one worker"""
+    generator = SnowflakeShortCodeGenerator(worker_id=7)
+
+    ids = [generator.next_id() for _ in range(10000)]
+
+    assert len(set(ids)) == len(ids)
+    assert all((value >> 12) & 0x3FF == 7 for value in ids)
+
+
+def test_generated_code_skips_existing_custom_alias(client):
+    """Test a generated code that collides with an alias is replaced"""
+    first_code = encode_id(0)
+    alias = {"original_url": "https://example.com/alias", "custom_alias": first_code}
+    assert client.post("/api/urls/shorten", json=alias).status_code == 201
+
+    response = client.post(
+        "/api/urls/shorten", json={"original_url": "https://example.com/generated"}
+    )
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.json()["short_code"] == encode_id(1)
+
+    conflict = client.post(
+        "/api/urls/shorten",
+        json={"original_url": "https://example.com/x", "custom_alias": encode_id(1)},
+    )
+    assert conflict.status_code == status.HTTP_409_CONFLICT
+
+
+def test_only_colliding_generators_are_checked_before_use(client, monkeypatch):
+    """Test random codes are checked against the database and ranges are not"""
+    client.post(
+        "/api/urls/shorten",
+        json={"original_url": "https://example.com/alias", "custom_alias": "taken1"},
+    )
+    checked = []
+    exists_by_short_code = URLRepository.exists_by_short_code
+
+    async def counting_exists(self, short_code):
+        checked.append(short_code)
+        return await exists_by_short_code(self, short_code)
+
+    monkeypatch.setattr(URLRepository, "exists_by_short_code", counting_exists)
+    client.post("/api/urls/shorten", json={"original_url": "https://example.com/1"})
+    assert checked == []
+
+    codes = iter(["taken1", "free01"])
+
+    async def next_code(url_repository):
+        return next(codes)
+
+    generator = RandomShortCodeGenerator()
+    monkeypatch.setattr(generator, "next_code", next_code)
+    monkeypatch.setattr(url_service, "short_code_generator", generator)
+    response = client.post(
+        "/api/urls/shorten", json={"original_url": "https://example.com/2"}
+    )
+    assert response.json()["short_code"] == "free01"
+    assert "taken1" in checked
@@ -0,0 +1,54 @@
+import logging
+
+from app.services.sql_profiler import sql_profiler
+
+
+def test_profiling_is_off_by_default(client):
+    """Test no profiling headers are added unless SQL_PROFILING is enabled"""
+    response = client.post(
+        "/api/urls/shorten", json={"original_url": "https://example.com"}
+    )
+    assert "x-db-query-count" not in response.headers
+
+
+def test_request_summary_headers(client, test_db_engine, monkeypatch):
+    """Test each response reports its queries per repository method"""
+    monkeypatch.setattr(sql_profiler, "enabled", True)
+    sql_profiler.instrument(test_db_engine)
+
+    response = client.post(
+        "/api/urls/shorten", json={"original_url": "https://example.com/a"}
+    )
+
+    assert int(response.headers["x-db-query-count"]) >= 2
+    operations = dict(
+        item.split("=") for item in response.headers["x-db-operations"].split(", ")
+    )
+    assert operations["URLRepository.get_by_original_url"] == "1"
+    assert "URLRepository.create" in operations
+    assert response.headers["server-timing"].startswith("db;dur=")
+
+    stats = client.get("/api/metrics/sql").json()
+    assert stats["operations"]["URLRepository.get_by_original_url"]["queries"] == 1
+
+
+def test_slow_queries_are_logged_without_parameters(
+    client, test_db_engine, monkeypatch, caplog
+):
+    """Test the slow-query log names the method but never the bound values"""
+    monkeypatch.setattr(sql_profiler, "enabled", True)
+    monkeypatch.setattr(sql_profiler, "slow_query_ms", 0)
+    sql_profiler.instrument(test_db_engine)
+
+    with caplog.at_level(logging.WARNING, logger="app.services.sql_profiler"):
+        client.post(
+            "/api/urls/shorten",
+            json={"original_url": "https://secret.example.com/token"},
+        )
+
+    assert "URLRepository.get_by_original_url" in caplog.text
+    assert "parameters redacted" in caplog.text
+    assert "secret.example.com" not in caplog.text
+    slow_queries = client.get("/api/metrics/sql").json()["slow_queries"]
+    assert slow_queries
+    assert all("secret" not in query["statement"] for query in slow_queries)
@@ -0,0 +1,72 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlmodel import select, update
+
+from app.models.url import URL, ArchivedURL
+from app.services.url_compaction import url_compactor
+
+
+def test_deleted_alias_can_be_reused(client):
+    """Test short codes are only unique among live URLs"""
+    client.post(
+        "/api/urls/shorten",
+        json={"original_url": "https://example.com/a", "custom_alias": "reused"},
+    )
+    client.delete("/api/urls/reused")
+
+    response = client.post(
+        "/api/urls/shorten",
+        json={"original_url": "https://example.com/b", "custom_alias": "reused"},
+    )
+    assert response.status_code == 201
+    batch = client.post(
+        "/api/urls/shorten/batch",
+        json=[{"original_url": "https://example.com/c", "custom_alias": "reused"}],
+    ).json()
+    assert batch[0]["status"] == "conflict"
+
+    redirect = client.get("/reused", follow_redirects=False)
+    assert redirect.headers["location"] == "https://example.com/b"
+
+
+def test_compaction_archives_old_deleted_urls_in_batches(
+    client, test_session, monkeypatch
+):
+    """Test only deleted URLs past the archive age are moved, batch by batch"""
+    for index in range(5):
+        client.post(
+            "/api/urls/shorten",
+            json={
+                "original_url": f"https://example.com/{index}",
+                "custom_alias": f"code_{index}",
+            },
+        )
+    for index in range(4):
+        client.delete(f"/api/urls/code_{index}")
+
+    # code_0..code_2 were deleted long ago, code_3 just now, code_4 is live
+    old = datetime.utcnow() - timedelta(days=url_compactor.archive_after_days + 1)
+    test_session.exec(
+        update(URL)
+        .where(URL.short_code.in_(["code_0", "code_1", "code_2"]))
+        .values(updated_at=old)
+    )
+    test_session.commit()
+
+    monkeypatch.setattr(url_compactor, "batch_size", 2)
+    monkeypatch.setattr(url_compactor, "batch_pause", 0)
+    archived = asyncio.run(url_compactor.compact())
+    assert archived == 3
+    assert url_compactor.stats() == {"runs": 1, "batches": 2, "archived": 3}
+
+    test_session.expire_all()
+    remaining = test_session.exec(select(URL.short_code)).all()
+    assert sorted(remaining) == ["code_3", "code_4"]
+    archive = test_session.exec(select(ArchivedURL)).all()
+    assert sorted(row.short_code for row in archive) == ["code_0", "code_1", "code_2"]
+    assert all(row.archived_at is not None for row in archive)
+
+    assert client.get("/code_4", follow_redirects=False).status_code == 307
+    summary = client.get("/api/analytics/summary").json()
+    assert summary["total_urls"] == 1
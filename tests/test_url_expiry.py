@@ -0,0 +1,130 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from sqlmodel import select, update
+
+from app.models.url import URL
+from app.services import http_caching
+from app.services.click_buffer import click_buffer
+from app.services.redirect_cache import redirect_cache
+from app.services.url_expiry import url_reaper
+
+
+def _in(**delta) -> str:
+    return (datetime.utcnow() + timedelta(**delta)).isoformat()
+
+
+def test_expiry_is_validated_and_part_of_deduplication(client):
+    """Test links expire in the future and only dedupe on the same expiry"""
+    past = client.post(
+        "/api/urls/shorten",
+        json={"original_url": "https://example.com", "expires_at": _in(hours=-1)},
+    )
+    assert past.status_code == 422
+
+    expires_at = _in(days=1)
+    first = client.post(
+        "/api/urls/shorten",
+        json={"original_url": "https://example.com", "expires_at": expires_at},
+    ).json()
+    assert first["expires_at"] == expires_at
+    same = client.post(
+        "/api/urls/shorten",
+        json={"original_url": "https://example.com", "expires_at": expires_at},
+    ).json()
+    permanent = client.post(
+        "/api/urls/shorten", json={"original_url": "https://example.com"}
+    ).json()
+    assert same["short_code"] == first["short_code"]
+    assert permanent["short_code"] != first["short_code"]
+    assert permanent["expires_at"] is None
+
+    batch = client.post(
+        "/api/urls/shorten/batch",
+        json=[
+            {"original_url": "https://example.com", "expires_at": expires_at},
+            {"original_url": "https://example.com", "expires_at": _in(days=2)},
+        ],
+    ).json()
+    assert batch[0]["status"] == "existing"
+    assert batch[0]["url"]["short_code"] == first["short_code"]
+    assert batch[1]["status"] == "created"
+
+
+def test_expired_links_are_gone_without_a_query(client, monkeypatch):
+    """Test cached redirects turn into 410 once the link expires"""
+    client.post(
+        "/api/urls/shorten",
+        json={
+            "original_url": "https://example.com",
+            "custom_alias": "promo",
+            "expires_at": _in(hours=1),
+        },
+    )
+    client.post("/api/urls/shorten", json={"original_url": "https://example.org"})
+    assert client.get("/promo", follow_redirects=False).status_code == 307
+    click_buffer.clear()
+
+    # Two hours later, without touching the database or the cache
+    later = time.time() + 7200
+    monkeypatch.setattr(http_caching.time, "time", lambda: later)
+    hits = redirect_cache.stats()["hits"]
+    fast = client.get("/promo", follow_redirects=False)
+    regular = client.get(
+        "/promo", headers={"Origin": "https://a.example"}, follow_redirects=False
+    )
+    assert fast.status_code == regular.status_code == 410
+    assert fast.json() == regular.json() == {"detail": "URL expired"}
+    assert redirect_cache.stats()["hits"] == hits + 2
+    assert click_buffer.pending("promo") == 0
+
+
+def test_expired_links_are_hidden_and_reaped_in_batches(
+    client, test_session, monkeypatch
+):
+    """Test listings and rankings skip expired links until the reaper deletes them"""
+    for index in range(4):
+        client.post(
+            "/api/urls/shorten",
+            json={
+                "original_url": f"https://example.com/{index}",
+                "custom_alias": f"code_{index}",
+                "expires_at": _in(days=1),
+            },
+        )
+        client.get(f"/code_{index}")
+    asyncio.run(click_buffer.flush())
+    client.post("/api/analytics/counters/recompute")
+    # code_0..code_2 have expired; a PUT can also expire a link right away
+    test_session.exec(
+        update(URL)
+        .where(URL.short_code.in_(["code_0", "code_1"]))
+        .values(expires_at=datetime.utcnow() - timedelta(minutes=1))
+    )
+    test_session.commit()
+    client.put("/api/urls/code_2", json={"expires_at": _in(seconds=-1)})
+
+    listing = client.get("/api/urls/").json()
+    assert [url["short_code"] for url in listing] == ["code_3"]
+    ranking = client.get("/api/analytics/urls").json()
+    assert [url["short_code"] for url in ranking] == ["code_3"]
+    assert client.get("/code_2", follow_redirects=False).status_code == 410
+    # Left out of the summary before they are reaped too
+    summary = client.get("/api/analytics/summary").json()
+    assert summary["total_urls"] == summary["total_custom_urls"] == 1
+    assert summary["total_clicks"] == 1
+
+    monkeypatch.setattr(url_reaper, "batch_size", 2)
+    monkeypatch.setattr(url_reaper, "batch_pause", 0)
+    assert asyncio.run(url_reaper.reap()) == 3
+    assert url_reaper.stats() == {"runs": 1, "batches": 2, "expired": 3}
+
+    test_session.expire_all()
+    live = test_session.exec(select(URL.short_code).where(URL.is_deleted == False))
+    assert live.all() == ["code_3"]
+    assert client.get("/code_0", follow_redirects=False).status_code == 404
+    summary = client.get("/api/analytics/summary").json()
+    assert summary["total_urls"] == 1
+    assert summary["total_custom_urls"] == 1
+    assert client.get("/api/metrics/expiry").json()["expired"] == 3
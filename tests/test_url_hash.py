@@ -0,0 +1,99 @@
+from sqlmodel import select
+
+from app.database import url_repository
+from app.database.url_hash import normalize_url, url_hash
+from app.models.url import URL
+
+
+def test_normalize_url():
+    """Test scheme/host case and default ports do not change the hash input"""
+    assert normalize_url("HTTPS://Example.COM:443") == "https://example.com/"
+    assert normalize_url("http://example.com:8080/a?b=1#c") == (
+        "http://example.com:8080/a?b=1#c"
+    )
+    assert normalize_url("https://user@Example.com/Path") == (
+        "https://user@example.com/Path"
+    )
+    assert url_hash("HTTPS://Example.com") == url_hash("https://example.com/")
+    assert -(2**63) <= url_hash("https://example.com") < 2**63
+
+
+def test_shorten_stores_hash_and_dedupes(client, test_session):
+    """Test created rows carry the hash and repeated URLs are deduplicated"""
+    first = client.post(
+        "/api/urls/shorten", json={"original_url": "https://example.com/a"}
+    ).json()
+    second = client.post(
+        "/api/urls/shorten", json={"original_url": "https://example.com/a"}
+    ).json()
+    assert first["short_code"] == second["short_code"]
+
+    batch = client.post(
+        "/api/urls/shorten/batch",
+        json=[
+            {"original_url": "https://example.com/a"},
+            {"original_url": "https://example.com/b"},
+        ],
+    ).json()
+    assert batch[0]["url"]["short_code"] == first["short_code"]
+
+    rows = test_session.exec(select(URL)).all()
+    assert len(rows) == 2
+    assert all(row.original_url_hash == url_hash(row.original_url) for row in rows)
+
+
+def test_hash_collision_does_not_dedupe(client, monkeypatch):
+    """Test different URLs sharing a hash are still stored separately"""
+    monkeypatch.setattr(url_repository, "url_hash", lambda url: 42)
+
+    first = client.post(
+        "/api/urls/shorten", json={"original_url": "https://example.com/a"}
+    ).json()
+    second = client.post(
+        "/api/urls/shorten", json={"original_url": "https://example.com/b"}
+    ).json()
+    assert first["short_code"] != second["short_code"]
+    assert second["original_url"] == "https://example.com/b"
+
+    batch = client.post(
+        "/api/urls/shorten/batch", json=[{"original_url": "https://example.com/c"}]
+    ).json()
+    assert batch[0]["status"] == "created"
+
+
+def test_urls_differing_only_in_normalized_parts_are_deduplicated(client, test_session):
+    """Test stored spellings of the same URL are reused, e.g. imported rows"""
+    for short_code, original_url in (
+        ("upper", "HTTPS://Example.COM:443/Path"),
+        ("noslash", "http://EXAMPLE.com:80"),
+    ):
+        test_session.add(
+            URL(
+                original_url=original_url,
+                original_url_hash=url_hash(original_url),
+                short_code=short_code,
+            )
+        )
+    test_session.commit()
+
+    response = client.post(
+        "/api/urls/shorten", json={"original_url": "https://example.com/Path"}
+    ).json()
+    assert response["short_code"] == "upper"
+    assert response["original_url"] == "HTTPS://Example.COM:443/Path"
+
+    # The path is kept as it is
+    other = client.post(
+        "/api/urls/shorten", json={"original_url": "https://example.com/path"}
+    ).json()
+    assert other["short_code"] != "upper"
+
+    batch = client.post(
+        "/api/urls/shorten/batch",
+        json=[
+            {"original_url": "http://example.com/"},
+            {"original_url": "https://example.com/Path"},
+        ],
+    ).json()
+    assert [item["status"] for item in batch] == ["existing", "existing"]
+    assert [item["url"]["short_code"] for item in batch] == ["noslash", "upper"]